@@ -0,0 +1,214 @@
+""" Joust benchmarks: collisions between the moving objects, platform checks, the
+    Egg/Bird/Jouster updates, and whole frames. Scenes are sized by the number of enemies.
+
+    Like the game itself, this module has to be imported from inside the Joust
+    directory (see Benchmarks/__main__.py).
+"""
+
+import random
+
+import pygame
+
+import Waves
+from Misc import loadImages, Vector2
+from Animation import loadClips
+from Environment import Env, PointDisplay
+from Agents import Bounder, Hunter, ShadowLord, EBJ, Player
+from Input import NullInput
+from Physics import PhysicsCore, BounderView
+
+from Common import Stats
+from Benchmarks.Runner import Benchmark, Budget
+
+SIZES = [4, 16, 64]
+
+# Custom and stress waves can have hundreds of enemies on screen
+COLLISION_SIZES = [4, 16, 64, 256]
+
+# Stress waves (see stressWave() in Joust/Waves.py) are meant for crowds of this size
+STRESS_SIZES = [16, 64, 256, 1024]
+
+SEED = 1
+
+# Frames simulated before a frame scene is handed over, so fonts, digits, etc. are already cached
+WARMUP_FRAMES = 30
+
+BUDGETS = [
+    # Nothing should be loaded, created, flipped or rendered from text in a steady state frame
+    Budget("joust.frame", Stats.IMAGE_LOAD, limit=0),
+    Budget("joust.frame", Stats.FLIP, limit=0),
+    Budget("joust.frame", Stats.FONT_RENDER, limit=0),
+    Budget("joust.frame", Stats.SURFACE, limit=0),
+    # Platform checks cost the same for every enemy, and use the geometry baked when the
+    # platforms changed instead of building Rects (see PlatformGeometry in Joust/Environment.py)
+    Budget("joust.groundCheck", Stats.COLLIDE, growth=1),
+    Budget("joust.groundCheck", Stats.RECT, limit=0),
+    Budget("joust.collisionCheck", Stats.COLLIDE, growth=1),
+    Budget("joust.collisionCheck", Stats.RECT, limit=0),
+    # Crowded waves only test each enemy against the enemies near it (see Joust/SpatialHash.py).
+    # The screen doesn't grow with the scene, so bigger scenes are also more crowded
+    Budget("joust.collision", Stats.COLLIDE, growth=1.5),
+    # The physics core tests every Bounder against the platforms in one go
+    Budget("joust.PhysicsCore.step", Stats.COLLIDE, growth=1),
+    # Eggs, enemies, and point displays are reused from the pools of the Env, not loaded again
+    Budget("joust.recycle", Stats.IMAGE_LOAD, limit=0),
+    Budget("joust.recycle", Stats.SURFACE, limit=0),
+]
+
+def setup():
+    # Load the images and return the benchmarks
+    loadImages()
+    loadClips()
+
+    return [
+        Benchmark("joust.collision", collisionScene, COLLISION_SIZES),
+        Benchmark("joust.groundCheck", groundCheckScene, SIZES, mutates=False),
+        Benchmark("joust.collisionCheck", collisionCheckScene, SIZES),
+        Benchmark("joust.EBJ.update", ebjScene, SIZES),
+        Benchmark("joust.frame", frameScene, SIZES, mutates=False),
+        Benchmark("joust.frame.full", fullFrameScene, SIZES, mutates=False),
+        Benchmark("joust.Bounder.update", bounderScene, STRESS_SIZES, mutates=False),
+        Benchmark("joust.PhysicsCore.step", physicsScene, STRESS_SIZES, mutates=False),
+        Benchmark("joust.recycle", recycleScene, SIZES, mutates=False),
+    ]
+
+def createEnv(size, eggs=0, render=False, dirtyRects=True):
+    """ Env with 'size' enemies spread over the screen and 'eggs' Egg/Bird/Jousters on
+        the platforms. Every second Egg/Bird/Jouster already has its bird on screen
+    """
+    random.seed(SEED + size + eggs)
+    env = Env(Waves.createPlatforms(), Player(), pygame.display.get_surface(), pygame.time.Clock(),
+              NullInput(), render, 0, True, dirtyRects=dirtyRects)
+    platforms = env.platformGroup
+
+    enemyTypes = [Bounder, Hunter, ShadowLord]
+    for i in range(size):
+        position = (random.randint(0, 600), random.randint(30, 420))
+        enemy = enemyTypes[i % 3](position)
+        enemy.grounded = False
+        env.enemyGroup.add(enemy)
+
+    spawnPlatforms = [plat for plat in platforms if plat.rect.left >= 0 and plat.rect.right <= 600]
+    for i in range(eggs):
+        position = Waves.getRandomLocationOnPlatform(spawnPlatforms[i % len(spawnPlatforms)])
+        ebj = EBJ(position, Vector2(random.choice([-2, 0, 2]), 0), i % 3, platforms)
+        for tick in range(random.randint(0, 30)): # Let the egg settle on the platform
+            ebj.update(platforms, env.player)
+        if (i % 2 == 1):
+            ebj.egg.timer = ebj.egg.birdSpawn
+            ebj.update(platforms, env.player)
+        env.eggGroup.add(ebj)
+    return env
+
+def collisionScene(size):
+    # Full collision pass: player, enemies, eggs, and lava
+    env = createEnv(size, size // 2)
+    platforms = env.platformGroup
+    return lambda: Waves.collision(env, platforms)
+
+def groundCheckScene(size):
+    env = createEnv(size)
+    platforms = env.platformGroup
+    enemies = list(env.enemyGroup)
+
+    def groundCheck():
+        for enemy in enemies:
+            enemy.groundCheck(platforms)
+    return groundCheck
+
+def collisionCheckScene(size):
+    env = createEnv(size)
+    platforms = env.platformGroup
+    enemies = list(env.enemyGroup)
+
+    def collisionCheck():
+        for enemy in enemies:
+            enemy.collisionCheck(platforms)
+    return collisionCheck
+
+def ebjScene(size):
+    env = createEnv(0, size)
+    platforms = env.platformGroup
+    player = env.player
+    ebjs = list(env.eggGroup)
+
+    def update():
+        for ebj in ebjs:
+            ebj.update(platforms, player)
+    return update
+
+def frameScene(size, dirtyRects=True):
+    """ One whole frame: a tick of every update and collision check, then rendering.
+        The game keeps running from frame to frame, so the scene is reused
+    """
+    env = createEnv(size, size // 4, True, dirtyRects)
+    platforms = env.platformGroup
+
+    def frame():
+        Waves.updateFrame(env, platforms, env.keys)
+        Waves.renderFrame(env, platforms)
+        env.present()
+
+    for i in range(WARMUP_FRAMES):
+        frame()
+    return frame
+
+def fullFrameScene(size):
+    # frameScene() redrawing and presenting the whole screen every frame, to compare with dirty rects
+    return frameScene(size, False)
+
+def stressPositions(size):
+    # Where the Bounders of a stress scene start
+    random.seed(SEED + size)
+    return [(random.randint(0, 600), random.randint(30, 420)) for i in range(size)]
+
+def bounderScene(size):
+    """ A tick of a crowd of Bounders that move themselves, to compare with physicsScene().
+        The Bounders keep moving from run to run, so the scene is reused
+    """
+    env = createEnv(0)
+    platforms = env.platformGroup
+    player = env.player
+    bounders = [Bounder(position) for position in stressPositions(size)]
+
+    def update():
+        for bounder in bounders:
+            bounder.update(platforms, player)
+    return update
+
+def physicsScene(size):
+    # The same crowd moved by a PhysicsCore, including the animation left to the views
+    env = createEnv(0)
+    platforms = env.platformGroup
+    player = env.player
+    core = PhysicsCore()
+    bounders = [BounderView(position, core) for position in stressPositions(size)]
+
+    def step():
+        core.step(platforms.geometry)
+        for bounder in bounders:
+            bounder.update(platforms, player)
+    return step
+
+def recycleScene(size):
+    """ The churn of a busy wave: every enemy is killed and leaves an egg, every egg hatches,
+        and every egg collected shows its points. Everything goes back to the pools of the Env
+        and the next run takes it out again, so the scene is reused
+    """
+    env = createEnv(0)
+    platforms = env.platformGroup
+    positions = stressPositions(size)
+
+    enemyTypes = [Bounder, Hunter, ShadowLord]
+
+    def churn():
+        for i, position in enumerate(positions):
+            enemy = env.create(enemyTypes[i % 3], position)
+            ebj = env.create(EBJ, position, enemy.velocity, enemy.type, platforms, env.pools)
+            env.recycle(enemy)
+            env.recycle(ebj.spawn())
+            env.recycle(ebj)
+            env.recycle(env.create(PointDisplay, position, 250, 500))
+
+    churn() # Fill the pools
+    return churn
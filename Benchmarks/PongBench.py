@@ -0,0 +1,86 @@
+""" Pong benchmarks: ball/paddle collisions, ball movement, and drawing the background.
+    Scenes are sized by the number of balls.
+
+    This module has to be imported from inside the Pong directory (see
+    Benchmarks/__main__.py).
+"""
+
+import random
+
+import pygame
+
+import Pong_Clone as game
+
+from Common import Stats
+from Benchmarks.Runner import Benchmark, Budget
+
+SIZES = [1, 16, 64]
+
+SEED = 3
+
+BUDGETS = [
+    Budget("pong.collide", Stats.COLLIDE, growth=1),
+    Budget("pong.ball.update", Stats.SURFACE, limit=0),
+    Budget("pong.ball.update", Stats.RECT, limit=0),
+    # The dashed line is drawn once. A frame only blits it and the digits of the two scores
+    Budget("pong.background", Stats.BLIT, limit=3),
+    Budget("pong.background", Stats.SURFACE, limit=0),
+]
+
+def setup():
+    # Return the benchmarks
+    return [
+        Benchmark("pong.collide", collideScene, SIZES, mutates=False),
+        Benchmark("pong.ball.update", updateScene, SIZES, mutates=False),
+        Benchmark("pong.background", backgroundScene, [1], mutates=False),
+    ]
+
+def createBalls(size):
+    """ Balls between the two paddles, half of them touching a paddle. None of them
+        reach the walls behind the paddles, so no score events are posted
+    """
+    random.seed(SEED + size)
+    player = game.player()
+    AI = game.AI()
+    balls = []
+    for i in range(size):
+        ball = game.ball()
+        ball.rect.centery = random.randint(player.rect.top + 10, player.rect.bottom - 10)
+        if (i % 4 == 0):
+            ball.rect.right = player.rect.left
+        elif (i % 4 == 1):
+            ball.rect.left = AI.rect.right
+        else:
+            ball.rect.centerx = random.randint(AI.rect.right + 20, player.rect.left - 20)
+        ball.position.update(ball.rect.centerx, ball.rect.centery)
+        ball.velocity = game.vector2(random.choice([-3, 3]), random.randint(-2, 2))
+        balls.append(ball)
+    player.update()
+    AI.update()
+    return balls, player, AI
+
+def collideScene(size):
+    balls, player, AI = createBalls(size)
+
+    def collide():
+        for ball in balls:
+            game.collide(ball, player, AI)
+    return collide
+
+def updateScene(size):
+    balls, player, AI = createBalls(size)
+
+    def update():
+        for ball in balls:
+            ball.update()
+    return update
+
+def backgroundScene(size):
+    # Clearing the board and drawing the scores, as at the start and end of every frame
+    board = pygame.Surface(game.SCREEN_SIZE)
+    bg = game.background()
+
+    def draw():
+        bg.draw(board)
+        bg.update(board)
+    return draw
@@ -0,0 +1,217 @@
+""" Timing, allocation tracking, and baselines for the benchmarks
+
+    A benchmark is a function that builds a scene of a given size and returns the
+    operation to time (a function with no arguments). Operations that change their
+    scene (removing enemies, eroding barriers, ...) get a fresh scene every time they
+    run. Building the scenes is never timed.
+"""
+
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import pygame
+
+from Common import Stats
+
+# Number of timed batches per measurement. The median batch is reported
+REPEATS = 5
+
+# Most operations timed in a single batch
+MAX_NUMBER = 100000
+
+# Number of runs used to measure allocations
+ALLOCATION_RUNS = 5
+
+BASELINE_VERSION = 1
+
+class Benchmark:
+    def __init__(self, name, makeScene, sizes, mutates=True):
+        self.name = name
+        self.makeScene = makeScene # makeScene(size) -> operation
+        self.sizes = sizes
+        self.mutates = mutates # The operation changes its scene, so it can only run once per scene
+
+    def key(self, size):
+        # Name used for the results of one size in the baseline
+        return f"{self.name}[{size}]"
+
+class Result:
+    def __init__(self, benchmark, size, ns, peak, kept):
+        self.benchmark = benchmark
+        self.size = size
+        self.ns = ns # Time per operation in nanoseconds
+        self.peak = peak # Most memory allocated at once during an operation, in bytes
+        self.kept = kept # Memory still allocated after an operation, in bytes
+
+    def key(self):
+        return self.benchmark.key(self.size)
+
+    def toJSON(self):
+        return {"ns": round(self.ns, 1), "peak": self.peak, "kept": self.kept}
+
+def timeBatch(benchmark, size, number):
+    # Time 'number' operations and return the total time in seconds
+    if (benchmark.mutates):
+        operations = [benchmark.makeScene(size) for i in range(number)]
+    else:
+        operations = [benchmark.makeScene(size)] * number
+
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for operation in operations:
+            operation()
+        elapsed = time.perf_counter() - start
+    finally:
+        if (gcEnabled):
+            gc.enable()
+    return elapsed
+
+def measureTime(benchmark, size, minTime):
+    # Time per operation in nanoseconds. Each batch runs for at least minTime / REPEATS seconds
+    batchTime = minTime / REPEATS
+    number = 1
+    elapsed = timeBatch(benchmark, size, number)
+    while (elapsed < batchTime and number < MAX_NUMBER):
+        # Estimate how many operations fill a batch, growing at most 10x at a time
+        estimate = int(number * batchTime / max(elapsed, 1e-9)) + 1
+        number = min(max(estimate, number * 2), number * 10, MAX_NUMBER)
+        elapsed = timeBatch(benchmark, size, number)
+
+    times = [elapsed / number]
+    for i in range(REPEATS - 1):
+        times.append(timeBatch(benchmark, size, number) / number)
+    times.sort()
+    return times[len(times) // 2] * 1e9
+
+def measureAllocations(benchmark, size):
+    # Average peak and retained memory allocated by a single operation on a fresh scene
+    peak = 0
+    kept = 0
+    for i in range(ALLOCATION_RUNS):
+        operation = benchmark.makeScene(size)
+        tracemalloc.start()
+        operation()
+        current, highest = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak += highest
+        kept += current
+    return peak // ALLOCATION_RUNS, kept // ALLOCATION_RUNS
+
+def run(benchmark, size, minTime):
+    ns = measureTime(benchmark, size, minTime)
+    peak, kept = measureAllocations(benchmark, size)
+    return Result(benchmark, size, ns, peak, kept)
+
+# ============================================================== Budgets ==============================================================
+
+# Slack allowed on top of the expected growth of a count, so small constant terms don't fail a check
+GROWTH_SLACK = 1.25
+
+class Budget:
+    """ Limit on the number of operations (see Common/Stats.py) one run of a benchmark
+        may perform. 'limit' is the most operations allowed at any size. 'growth' limits
+        how the count may grow with the size of the scene: 1 = at most linearly,
+        2 = at most quadratically, ...
+    """
+    def __init__(self, benchmark, counter, limit=None, growth=None):
+        self.benchmark = benchmark
+        self.counter = counter
+        self.limit = limit
+        self.growth = growth
+
+    def describe(self):
+        if (self.limit is not None):
+            return f"{self.counter} <= {self.limit}"
+        return f"{self.counter} grows at most with size^{self.growth}"
+
+def countOperations(benchmark, size, counter):
+    # Number of operations counted during one run of the benchmark on a fresh scene
+    operation = benchmark.makeScene(size)
+    Stats.stats.reset()
+    operation()
+    Stats.stats.endFrame() # The operation may have ended frames of its own
+    return Stats.stats.getWave()["totals"].get(counter, 0)
+
+def checkBudget(budget, benchmark):
+    """ Check a budget against every size of its benchmark. Counting must be enabled.
+        Returns the counts for each size and whether the budget was met
+    """
+    counts = [countOperations(benchmark, size, budget.counter) for size in benchmark.sizes]
+    if (budget.limit is not None and max(counts) > budget.limit):
+        return counts, False
+    if (budget.growth is not None):
+        first = max(counts[0], 1)
+        scale = benchmark.sizes[-1] / benchmark.sizes[0]
+        if (counts[-1] > first * (scale ** budget.growth) * GROWTH_SLACK):
+            return counts, False
+    return counts, True
+
+# ============================================================== Baselines ==============================================================
+
+def loadBaseline(path):
+    # Results stored by saveBaseline(), keyed by benchmark name and size. None if there is no baseline
+    if (not os.path.exists(path)):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if (data.get("version") != BASELINE_VERSION):
+        print(f"Ignoring {path}: it was saved by a different version of the benchmarks")
+        return None
+    return data["results"]
+
+def saveBaseline(path, results, previous=None):
+    """ Save results as the new baseline. Results from a previous baseline are kept for
+        any benchmarks that were not run (e.g. when a filter was used)
+    """
+    data = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.platform(),
+        "results": dict(previous or {}),
+    }
+    for result in results:
+        data["results"][result.key()] = result.toJSON()
+
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return None
+
+def compare(result, baseline, threshold):
+    """ Compare a result to the baseline. Returns the change in time per operation
+        (0.1 = 10% slower) and whether it is a regression. The change is None when
+        the benchmark is not in the baseline
+    """
+    if (baseline is None or result.key() not in baseline):
+        return None, False
+    previous = baseline[result.key()]["ns"]
+    change = (result.ns - previous) / previous
+    return change, change > threshold
+
+# ============================================================== Reports ==============================================================
+
+def formatBytes(count):
+    if (count >= 1024 * 1024):
+        return f"{count / (1024 * 1024):.1f}M"
+    if (count >= 1024):
+        return f"{count / 1024:.1f}K"
+    return f"{count}"
+
+HEADER = f"{'benchmark':<34}{'size':>6}{'ns/op':>14}{'peak/op':>10}{'kept/op':>10}  baseline"
+
+def formatResult(result, change, regressed):
+    if (change is None):
+        versus = "-"
+    else:
+        versus = f"{change * 100:+.1f}%"
+        if (regressed):
+            versus += "  REGRESSION"
+    return (f"{result.benchmark.name:<34}{result.size:>6}{result.ns:>14,.0f}"
+            f"{formatBytes(result.peak):>10}{formatBytes(result.kept):>10}  {versus}")
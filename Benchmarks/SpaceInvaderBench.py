@@ -0,0 +1,163 @@
+""" Space Invader benchmarks: barrier erosion, the enemy grid, and the collision pass.
+    Scenes are sized by the number of projectiles (or the number of enemies left alive
+    or the number of columns for the grid).
+
+    Like the game itself, this module has to be imported from inside the SpaceInvader
+    directory (see Benchmarks/__main__.py).
+"""
+
+import random
+
+import pygame
+
+import Space_Invader_Clone as game
+
+from Common import Stats
+from Benchmarks.Runner import Benchmark, Budget
+
+PROJECTILE_SIZES = [4, 16, 64]
+ALIVE_SIZES = [5, 27, 55]
+COLUMN_SIZES = [11, 44, 176]
+
+SEED = 2
+
+BUDGETS = [
+    # Each projectile is a single mask test against the barrier, and nothing is allocated
+    Budget("si.Barrier.collision", Stats.COLLIDE, growth=1),
+    Budget("si.Barrier.collision", Stats.RECT, limit=0),
+    Budget("si.Barrier.collision", Stats.SURFACE, limit=0),
+    # Player projectiles are only tested against the projectiles near them
+    Budget("si.check_collisions", Stats.COLLIDE, growth=1),
+    Budget("si.check_collisions", Stats.SURFACE, limit=0),
+    Budget("si.check_collisions", Stats.IMAGE_LOAD, limit=0),
+    Budget("si.enemyGrid.update", Stats.RECT, limit=0),
+    # The grid is drawn one row at a time from surfaces made when it was created
+    Budget("si.enemyGrid.draw", Stats.SURFACE, limit=0),
+    Budget("si.enemyGrid.draw", Stats.RECT, limit=0),
+]
+
+def setup():
+    # Load the images and return the benchmarks
+    game.load_assets()
+
+    return [
+        Benchmark("si.Barrier.collision", barrierScene, PROJECTILE_SIZES),
+        Benchmark("si.enemyGrid.update", gridUpdateScene, ALIVE_SIZES),
+        Benchmark("si.enemyGrid.updateEdges", gridEdgesScene, ALIVE_SIZES, mutates=False),
+        Benchmark("si.enemyGrid.updateEnemies", gridEnemiesScene, ALIVE_SIZES, mutates=False),
+        Benchmark("si.enemyGrid.draw", gridDrawScene, ALIVE_SIZES, mutates=False),
+        Benchmark("si.enemyGrid.columns", gridColumnsScene, COLUMN_SIZES, mutates=False),
+        Benchmark("si.check_collisions", collisionScene, PROJECTILE_SIZES),
+        Benchmark("si.projectiles.update", projectileScene, PROJECTILE_SIZES),
+    ]
+
+def createBarriers():
+    tempvalue = game.SCREEN_SIZE[0] // 8
+    barriers = pygame.sprite.Group()
+    for i in [1, 3, 5, 7]:
+        barriers.add(game.Barrier((tempvalue * i, game.SCREEN_SIZE[1] - 140)))
+    return barriers
+
+def createGrid(alive, projectiles):
+    # Enemy grid with only 'alive' enemies left, killed in random order
+    grid = game.enemyGrid(projectiles)
+    for enemy in random.sample(grid.enemies, len(grid.enemies) - alive):
+        grid.kill(enemy)
+    return grid
+
+def createProjectile(pool, x, y, player):
+    # Player projectiles travel up, enemy missiles travel down. Returns the projectile's index
+    if (player):
+        return pool.add(game.PLAYER_SHOT, (x, y), -22)
+    return pool.add(game.ENEMY_SHOT, (x, y), 7)
+
+def barrierScene(size):
+    # Projectiles that hit a single barrier from above and below
+    random.seed(SEED + size)
+    barrier = game.Barrier((300, 460))
+    pool = game.ProjectilePool()
+    projectiles = []
+    for i in range(size):
+        x = random.randint(barrier.rect.left, barrier.rect.right)
+        if (i % 2 == 0):
+            index = createProjectile(pool, x, barrier.rect.bottom, True)
+        else:
+            index = createProjectile(pool, x, barrier.rect.top, False)
+        projectiles.append((pool.rect(index), pool.y_velocity[index]))
+
+    def collision():
+        for rect, y_velocity in projectiles:
+            barrier.collision(rect, y_velocity)
+    return collision
+
+def gridUpdateScene(alive):
+    # Grid update on a frame where the grid moves
+    random.seed(SEED + alive)
+    grid = createGrid(alive, game.ProjectilePool())
+    grid.timer = 0
+    return grid.update
+
+def gridEdgesScene(alive):
+    random.seed(SEED + alive)
+    grid = createGrid(alive, game.ProjectilePool())
+    return grid.updateEdges
+
+def gridEnemiesScene(alive):
+    # Only changes the grid when enough enemies died for it to speed up, so the scene is reused
+    random.seed(SEED + alive)
+    grid = createGrid(alive, game.ProjectilePool())
+    return grid.updateEnemies
+
+def gridColumnsScene(cols):
+    # A second of grid updates for a grid 'cols' columns wide with a few enemies killed
+    random.seed(SEED + cols)
+    grid = game.enemyGrid(game.ProjectilePool(), cols)
+    for enemy in random.sample(grid.enemies, len(grid.enemies) // 4):
+        grid.kill(enemy)
+
+    def update():
+        for i in range(game.FPS):
+            grid.update()
+        grid.proj_group.clear()
+    return update
+
+def gridDrawScene(alive):
+    # Draw the grid on a frame where no enemy died. The row surfaces are already up to date
+    random.seed(SEED + alive)
+    grid = createGrid(alive, game.ProjectilePool())
+    screen = pygame.display.get_surface()
+    grid.draw(screen)
+    return lambda: grid.draw(screen)
+
+def collisionScene(size):
+    """ Full collision pass with a fresh grid, four barriers, and 'size' projectiles spread
+        over the playing area above the player, one frame after they were fired
+    """
+    random.seed(SEED + size)
+    projectiles = game.ProjectilePool()
+    player = game.Player()
+    barriers = createBarriers()
+    grid = game.enemyGrid(projectiles)
+    enemies = pygame.sprite.Group()
+    for e in grid.enemies:
+        enemies.add(e)
+
+    for i in range(size):
+        x = random.randint(10, game.SCREEN_SIZE[0] - 10)
+        y = random.randint(40, player.rect.top - 20)
+        createProjectile(projectiles, x, y, i % 2 == 0)
+    projectiles.update() # Give every projectile a path to sweep
+
+    screen = pygame.display.get_surface()
+    clock = pygame.time.Clock()
+    return lambda: game.check_collisions(projectiles, player, barriers, enemies, grid, screen, clock)
+
+def projectileScene(size):
+    # Move every projectile one frame. Some of them leave the playing area and are removed
+    random.seed(SEED + size)
+    projectiles = game.ProjectilePool()
+    for i in range(size):
+        x = random.randint(10, game.SCREEN_SIZE[0] - 10)
+        y = random.randint(10, game.SCREEN_SIZE[1] - 60)
+        createProjectile(projectiles, x, y, i % 2 == 0)
+    return projectiles.update
@@ -0,0 +1,15 @@
+""" Microbenchmarks for the hot paths of the games.
+
+    Every benchmark builds a synthetic scene of a given size (number of enemies,
+    projectiles, balls, ...) and times one operation on it, such as a full collision
+    pass. Run them from the top level of the repository with:
+        python -m Benchmarks [--save] [--threshold 0.15] [--filter joust]
+
+    Results are compared against a stored baseline (Benchmarks/baseline.json by
+    default) and the run fails if any benchmark got slower than the threshold allows.
+    Use --save to record a new baseline. Baselines depend on the machine they were
+    recorded on, so they are not checked in.
+
+    With --budgets, the benchmarks are not timed. Instead the operations they perform
+    are counted (see Common/Stats.py) and checked against the BUDGETS of each module.
+"""
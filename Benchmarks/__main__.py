@@ -0,0 +1,116 @@
+""" Run the benchmarks: python -m Benchmarks --help """
+
+import argparse
+import importlib
+import os
+import sys
+
+# The games have to run without a window. The dummy drivers have to be selected before
+# pygame is initialized (Space Invader and Pong initialize it when they are imported)
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+
+from Common import Stats
+from Benchmarks import Runner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks for each game: (game directory, benchmark module, screen size)
+GAMES = [
+    ("Joust", "Benchmarks.JoustBench", (600, 600)),
+    ("SpaceInvader", "Benchmarks.SpaceInvaderBench", (600, 600)),
+    ("Pong", "Benchmarks.PongBench", (600, 400)),
+]
+
+def parseArgs():
+    parser = argparse.ArgumentParser(prog="python -m Benchmarks", description="Benchmarks for the games")
+    parser.add_argument("--baseline", default=os.path.join(ROOT, "Benchmarks", "baseline.json"),
+                        help="baseline file to compare against (default: Benchmarks/baseline.json)")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fail if a benchmark is slower than the baseline by more than this fraction (default: 0.15)")
+    parser.add_argument("--filter", default=None,
+                        help="only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", dest="minTime", type=float, default=0.25,
+                        help="seconds spent timing each benchmark size (default: 0.25)")
+    parser.add_argument("--budgets", action="store_true",
+                        help="check the operation budgets (image loads, collision tests, ...) instead of timing")
+    return parser.parse_args()
+
+def loadGame(gameDirectory, module, screenSize):
+    """ Import the benchmarks for a game. The games load their images with paths relative
+        to their own directory and import their modules by bare name, so this changes
+        into the game directory and puts it on sys.path first
+    """
+    directory = os.path.join(ROOT, gameDirectory)
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    pygame.display.set_mode(screenSize)
+    return importlib.import_module(module)
+
+def checkBudgets(args):
+    # Count the operations performed by each benchmark and check them against the budgets
+    Stats.enable()
+    failures = 0
+    for gameDirectory, module, screenSize in GAMES:
+        game = loadGame(gameDirectory, module, screenSize)
+        benchmarks = {benchmark.name: benchmark for benchmark in game.setup()}
+        for budget in game.BUDGETS:
+            if (args.filter is not None and args.filter not in budget.benchmark):
+                continue
+            benchmark = benchmarks[budget.benchmark]
+            counts, met = Runner.checkBudget(budget, benchmark)
+            sizes = ", ".join(f"{size}: {count}" for size, count in zip(benchmark.sizes, counts))
+            print(f"{'ok  ' if met else 'FAIL'}  {budget.benchmark:<28}{budget.describe():<36}({sizes})", flush=True)
+            if (not met):
+                failures += 1
+
+    if (failures > 0):
+        print(f"{failures} budget(s) exceeded")
+        return 1
+    return 0
+
+def main():
+    args = parseArgs()
+    if (args.budgets):
+        pygame.init()
+        return checkBudgets(args)
+
+    baseline = Runner.loadBaseline(args.baseline)
+    if (baseline is None and not args.save):
+        print(f"No baseline found at {args.baseline}. Run with --save to create one")
+
+    pygame.init()
+    results = []
+    regressions = []
+    print(Runner.HEADER)
+    for gameDirectory, module, screenSize in GAMES:
+        game = loadGame(gameDirectory, module, screenSize)
+        for benchmark in game.setup():
+            if (args.filter is not None and args.filter not in benchmark.name):
+                continue
+            for size in benchmark.sizes:
+                result = Runner.run(benchmark, size, args.minTime)
+                change, regressed = Runner.compare(result, baseline, args.threshold)
+                print(Runner.formatResult(result, change, regressed), flush=True)
+                results.append(result)
+                if (regressed):
+                    regressions.append(result)
+    pygame.quit()
+
+    if (args.save):
+        Runner.saveBaseline(args.baseline, results, baseline)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        return 0
+
+    if (len(regressions) > 0):
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold * 100:.0f}%:")
+        for result in regressions:
+            print(f"    {result.key()}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
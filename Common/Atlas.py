@@ -0,0 +1,148 @@
+""" Sprite atlas support
+
+    The build step packs every PNG in a game's Art directory into a single sheet
+    (atlas.png) and writes a manifest (atlas.json) that maps each image path to its
+    rect on the sheet. It can also write the sheet as raw RGBX pixels (atlas.raw), which
+    the game memory-maps and hands straight to pygame without decoding anything.
+
+    Colorkeys are not baked into the atlas. Each game passes its own table of colorkeys
+    to load(), the same one it uses when it loads the PNGs, so the two can't disagree.
+
+    Build the atlases from the top level of the repository with:
+        python Common/Atlas.py [--raw] [game ...]
+"""
+
+import json
+import mmap
+import os
+import sys
+
+import pygame
+
+MANIFEST = "atlas.json"
+SHEET = "atlas.png"
+RAW = "atlas.raw"
+RAW_FORMAT = "RGBX"
+
+BLACK = (0, 0, 0)
+
+# Games that have an Art directory to pack
+GAMES = ["Joust", "SpaceInvader"]
+
+# Space between packed images
+PADDING = 1
+
+# Maximum width of the packed sheet
+MAX_WIDTH = 512
+
+def pack(sizes, maxWidth=MAX_WIDTH):
+    """ Simple shelf packer. Images are placed left to right on shelves, tallest first.
+        Returns a list of (x, y) positions (in the same order as sizes) and the sheet size
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    width = max([maxWidth] + [w + PADDING for w, h in sizes])
+    positions = [None] * len(sizes)
+
+    x = 0
+    y = 0
+    shelfHeight = 0
+    usedWidth = 0
+    for i in order:
+        w, h = sizes[i]
+        if (x + w > width): # Start a new shelf
+            y += shelfHeight + PADDING
+            x = 0
+            shelfHeight = 0
+        positions[i] = (x, y)
+        x += w + PADDING
+        shelfHeight = max(shelfHeight, h)
+        usedWidth = max(usedWidth, x)
+    return positions, (max(usedWidth - PADDING, 1), max(y + shelfHeight, 1))
+
+def build(gameDirectory, writeRaw=False):
+    # Pack the Art directory of a game into atlas.png/atlas.json (and optionally atlas.raw)
+    artDirectory = os.path.join(gameDirectory, "Art")
+    names = sorted(name for name in os.listdir(artDirectory)
+                   if name.endswith(".png") and name != SHEET)
+
+    images = [pygame.image.load(os.path.join(artDirectory, name)) for name in names]
+    positions, size = pack([image.get_size() for image in images])
+
+    sheet = pygame.Surface(size)
+    sheet.fill(BLACK)
+
+    sprites = {}
+    for name, image, position in zip(names, images, positions):
+        sheet.blit(image, position)
+        key = "Art/" + name # Same paths that the games use to load the images
+        sprites[key] = [position[0], position[1], image.get_width(), image.get_height()]
+
+    pygame.image.save(sheet, os.path.join(artDirectory, SHEET))
+
+    rawPath = os.path.join(artDirectory, RAW)
+    if (writeRaw):
+        with open(rawPath, "wb") as f:
+            f.write(pygame.image.tostring(sheet, RAW_FORMAT))
+    elif (os.path.exists(rawPath)): # Don't leave a stale dump behind
+        os.remove(rawPath)
+
+    manifest = {"sheet": SHEET, "raw": RAW if writeRaw else None, "format": RAW_FORMAT,
+                "size": list(size), "sprites": sprites}
+    with open(os.path.join(artDirectory, MANIFEST), "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    return len(sprites), size
+
+def loadSheet(directory, manifest):
+    # Load the packed sheet, preferring the raw pixel dump when one was built
+    size = tuple(manifest["size"])
+    if (manifest.get("raw")):
+        rawPath = os.path.join(directory, manifest["raw"])
+        if (os.path.exists(rawPath) and os.path.getsize(rawPath) == size[0] * size[1] * 4):
+            with open(rawPath, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as buf:
+                    raw = pygame.image.frombuffer(buf, size, manifest["format"])
+                    sheet = raw.convert()
+                    del raw # Release the buffer so the mapping can be closed
+            return sheet
+    return pygame.image.load(os.path.join(directory, manifest["sheet"])).convert()
+
+def load(colorkeys, directory="Art"):
+    """ Load an atlas built by build() and cut it into converted subsurfaces, colorkeyed
+        from the game's table of {image path: colorkey} (None = no colorkey). Returns a
+        dictionary of image path -> surface for the images in the table that are in the
+        atlas, or None if no atlas has been built. Must be called after pygame.display.set_mode()
+    """
+    manifestPath = os.path.join(directory, MANIFEST)
+    if (not os.path.exists(manifestPath)):
+        return None
+    with open(manifestPath) as f:
+        manifest = json.load(f)
+
+    sheet = loadSheet(directory, manifest)
+
+    images = {}
+    sprites = manifest["sprites"]
+    for name, colorkey in colorkeys.items():
+        if (name not in sprites):
+            continue
+        surf = sheet.subsurface(sprites[name][:4]) # Older manifests also stored a colorkey
+        if (colorkey is not None):
+            surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        images[name] = surf
+    return images
+
+def main(args):
+    writeRaw = "--raw" in args
+    games = [arg for arg in args if not arg.startswith("--")] or list(GAMES)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for game in games:
+        if (game not in GAMES):
+            print(f"Unknown game: {game}")
+            return 1
+        count, size = build(os.path.join(root, game), writeRaw)
+        print(f"{game}: packed {count} images into a {size[0]}x{size[1]} atlas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+""" Per-frame phase timings and hitch detection for the game loops
+
+    The game loop calls mark(phase) at the end of each phase of a frame (input,
+    update, collision, render, ...). The time since the previous mark is added to that
+    phase, so a phase that runs several times in a frame (e.g. one update per tick) is
+    summed. endFrame() stores the frame in a ring buffer of the most recent frames,
+    which percentiles() and the on-screen overlay read from.
+
+    Any frame that spends longer than the budget working is logged to stderr as a hitch,
+    with the time spent in each phase and the entity counts at that moment. Idle phases
+    (waiting for the frame rate cap, pauses) don't count towards the budget.
+
+    A disabled timer does nothing, so the loops can always call it.
+"""
+
+import sys
+import time
+from array import array
+
+import pygame
+
+from Common import Stats
+from Common.Text import getFont
+
+# Number of frames kept for the percentiles
+HISTORY = 600
+
+# Number of frames between overlay refreshes
+OVERLAY_REFRESH = 30
+
+OVERLAY_COLOR = (255, 255, 0)
+OVERLAY_BACKGROUND = (0, 0, 0)
+
+class FrameTimer:
+    def __init__(self, phases, idlePhases=(), budget=1/60, enabled=False, overlay=False,
+                 history=HISTORY, log=None):
+        self.phases = list(phases) # Phases in the order they are reported
+        self.idlePhases = set(idlePhases) # Phases that don't count towards the budget
+        self.budget = budget # Seconds of work allowed per frame
+        self.enabled = enabled
+        self.overlay = overlay # Draw the timings on the screen (see drawOverlay())
+        self.log = log # Where hitches are written. Defaults to sys.stderr
+
+        self.history = history
+        self.samples = {phase: array("d", [0.0]) * history for phase in self.phases}
+        self.busy = array("d", [0.0]) * history # Time spent working in each frame
+        self.index = 0 # Where the next frame goes in the ring buffer
+        self.count = 0 # Number of frames in the ring buffer
+
+        self.current = {phase: 0.0 for phase in self.phases} # Phase times for the current frame
+        self.last = None
+        self.frames = 0 # Total number of frames timed
+        self.hitches = 0
+
+        self.overlaySurfaces = []
+
+    def reset(self):
+        # Start a new frame now. Used after menus and other pauses that shouldn't be timed
+        for phase in self.phases:
+            self.current[phase] = 0.0
+        self.last = time.perf_counter()
+        return None
+
+    def mark(self, phase):
+        # End the current phase: the time since the last mark is added to 'phase'
+        if (not self.enabled):
+            return None
+        now = time.perf_counter()
+        if (self.last is not None):
+            self.current[phase] += now - self.last
+        self.last = now
+        return None
+
+    def endFrame(self, counts=None):
+        """ Store the current frame and start the next one. 'counts' is an optional function
+            that returns a dict of entity counts. It is only called to log a hitch
+        """
+        if (not self.enabled):
+            return None
+        busy = 0.0
+        for phase in self.phases:
+            value = self.current[phase]
+            self.samples[phase][self.index] = value
+            if (phase not in self.idlePhases):
+                busy += value
+            self.current[phase] = 0.0
+        self.busy[self.index] = busy
+
+        self.index = (self.index + 1) % self.history
+        self.count = min(self.count + 1, self.history)
+        self.frames += 1
+
+        if (busy > self.budget):
+            self.hitches += 1
+            self.logHitch(busy, counts)
+        return None
+
+    def logHitch(self, busy, counts):
+        # Write the phase breakdown (and entity counts) of the frame that was just stored
+        frame = (self.index - 1) % self.history
+        breakdown = ", ".join(f"{phase} {self.samples[phase][frame] * 1000:.1f}" for phase in self.phases)
+        line = f"hitch: frame {self.frames} took {busy * 1000:.1f} ms (budget {self.budget * 1000:.1f} ms): {breakdown}"
+        if (counts is not None):
+            line += " | " + ", ".join(f"{name} {value}" for name, value in counts().items())
+        print(line, file=self.log or sys.stderr)
+        return None
+
+    def percentiles(self, phase=None, points=(50, 95, 99)):
+        # Percentiles (in seconds) of a phase over the stored frames. phase=None uses the busy time
+        values = self.busy if phase is None else self.samples[phase]
+        if (self.count == 0):
+            return [0.0 for point in points]
+        ordered = sorted(values[:self.count])
+        return [ordered[min(self.count - 1, (self.count * point) // 100)] for point in points]
+
+    def summary(self):
+        # Table of p50/p95/p99 for each phase, in milliseconds
+        lines = [f"{'phase':<12}{'p50':>8}{'p95':>8}{'p99':>8}  ({self.count} frames, {self.hitches} hitches)"]
+        for phase in self.phases + [None]:
+            p50, p95, p99 = self.percentiles(phase)
+            name = "busy" if phase is None else phase
+            lines.append(f"{name:<12}{p50 * 1000:>8.2f}{p95 * 1000:>8.2f}{p99 * 1000:>8.2f}")
+        return "\n".join(lines)
+
+    def drawOverlay(self, screen, position=(4, 4)):
+        # Draw the summary in the corner of the screen. The text is refreshed every OVERLAY_REFRESH frames
+        if (not (self.enabled and self.overlay)):
+            return None
+        if (len(self.overlaySurfaces) == 0 or self.frames % OVERLAY_REFRESH == 0):
+            # Rendered directly instead of through the text cache, since the numbers keep changing
+            font = getFont("Courier New", 12)
+            self.overlaySurfaces = [font.render(line, False, OVERLAY_COLOR, OVERLAY_BACKGROUND)
+                                    for line in self.summary().split("\n")]
+            Stats.count(Stats.FONT_RENDER, len(self.overlaySurfaces))
+        x, y = position
+        for surf in self.overlaySurfaces:
+            screen.blit(surf, (x, y))
+            y += surf.get_height()
+        Stats.count(Stats.BLIT, len(self.overlaySurfaces))
+        return None
@@ -0,0 +1,158 @@
+""" Low overhead sampling profiler
+
+    A background thread wakes up every few milliseconds and records the Python stack
+    of the main thread. Nothing runs on the main thread itself, so the tight per-entity
+    loops are timed as they normally run (unlike cProfile, which slows down every call).
+    When the program exits the samples are written in the collapsed stack format
+    ("outer;inner;innermost count" per line) used by flamegraph.pl and speedscope.
+
+    The games start it with --profile FILE or the GAME_PROFILE environment variable.
+    Sampling can be limited to a range of frames or waves with --profile-range or
+    GAME_PROFILE_RANGE, e.g. "waves:5" or "frames:600-1200". The game loops report
+    their progress with nextFrame() and setWave().
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import threading
+import time
+
+# Seconds between samples
+INTERVAL = 0.005
+
+PROFILE_VARIABLE = "GAME_PROFILE"
+RANGE_VARIABLE = "GAME_PROFILE_RANGE"
+
+def parseRange(text):
+    """ Parse a profile range: "frames:START-END", "waves:START-END", or a single
+        frame/wave like "waves:5". Returns (kind, start, end)
+    """
+    kind, _, numbers = text.partition(":")
+    if (kind not in ("frames", "waves") or numbers == ""):
+        raise ValueError(f"Invalid profile range '{text}'. Expected frames:START-END or waves:START-END")
+    start, _, end = numbers.partition("-")
+    start = int(start)
+    end = int(end) if end != "" else start
+    return kind, start, end
+
+class Sampler:
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self.path = None # Where the samples are written at exit
+        self.range = None # (kind, start, end) or None to sample everything
+        self.counts = {} # Stack (tuple of code objects, outermost first) -> number of samples
+        self.samples = 0
+
+        self.frame = 0
+        self.wave = 0
+        self.active = True # Samples are only recorded while the game is in range
+
+        self.thread = None
+        self.target = None # Id of the thread being sampled
+        self.running = False
+
+    def start(self, path, profileRange=None):
+        # Start sampling the calling thread. The samples are written to 'path' when the program exits
+        if (self.running):
+            return None
+        self.path = path
+        self.range = parseRange(profileRange) if profileRange else None
+        self.updateActive()
+
+        self.target = threading.get_ident()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="Sampler", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        return None
+
+    def run(self):
+        while (self.running):
+            time.sleep(self.interval)
+            if (not self.active):
+                continue
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while (frame is not None):
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if (len(stack) == 0):
+                continue
+            stack = tuple(reversed(stack))
+            self.counts[stack] = self.counts.get(stack, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        # Stop sampling and write the samples
+        if (not self.running):
+            return None
+        self.running = False
+        self.thread.join()
+        self.write()
+        return None
+
+    def write(self):
+        # Write the samples in collapsed stack format. Functions are named file:function
+        lines = {}
+        for stack, count in self.counts.items():
+            line = ";".join(f"{os.path.basename(code.co_filename)}:{code.co_name}" for code in stack)
+            lines[line] = lines.get(line, 0) + count
+
+        with open(self.path, "w") as f:
+            for line, count in sorted(lines.items()):
+                f.write(f"{line} {count}\n")
+        print(f"Wrote {self.samples} samples to {self.path}")
+        return None
+
+    def updateActive(self):
+        if (self.range is None):
+            self.active = True
+            return None
+        kind, start, end = self.range
+        value = self.frame if kind == "frames" else self.wave
+        self.active = start <= value <= end
+        return None
+
+    def nextFrame(self):
+        # Called by the game loop at the end of every frame
+        self.frame += 1
+        if (self.range is not None):
+            self.updateActive()
+        return None
+
+    def setWave(self, wave):
+        # Called by the game loop when a new wave starts
+        self.wave = wave
+        if (self.range is not None):
+            self.updateActive()
+        return None
+
+# Sampler used by the games
+sampler = Sampler()
+
+def rangeArgument(text):
+    # argparse type for --profile-range
+    try:
+        parseRange(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return text
+
+def addArguments(parser):
+    # Add the profiler options to a game's argparse parser
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help=f"sample the game and write collapsed stacks to FILE at exit (or set {PROFILE_VARIABLE})")
+    parser.add_argument("--profile-range", dest="profileRange", type=rangeArgument, default=None, metavar="RANGE",
+                        help=f"only sample frames:START-END or waves:START-END (or set {RANGE_VARIABLE})")
+    return None
+
+def startFromOptions(path=None, profileRange=None):
+    # Start the sampler if a profile was requested on the command line or in the environment
+    path = path or os.environ.get(PROFILE_VARIABLE)
+    if (not path):
+        return None
+    profileRange = profileRange or os.environ.get(RANGE_VARIABLE)
+    sampler.start(path, profileRange)
+    return None
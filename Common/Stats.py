@@ -0,0 +1,165 @@
+""" Counters for expensive engine operations
+
+    The games count the operations that tend to creep into the per-frame loops: image
+    loads, Surface creations, transform.flip calls, font renders, pygame.Rect
+    constructions, rect collision tests, and blits. Counts are rolled up per frame
+    (endFrame()) and per wave (endWave()) and can be read back with getFrame(),
+    getWave(), and getWaves(), which is what the budget checks in Benchmarks use.
+
+    Collision tests, blits, and font renders are counted where they happen with count().
+    The rest are counted by install(), which wraps pygame.image.load,
+    pygame.transform.flip, pygame.Surface, and pygame.Rect. Only code that calls them
+    through the pygame module after install() is counted.
+
+    Counting is off until enable() is called; until then count() does nothing.
+"""
+
+import pygame
+
+# Names of the counters
+IMAGE_LOAD = "image.load"
+SURFACE = "Surface"
+FLIP = "transform.flip"
+FONT_RENDER = "font.render"
+RECT = "Rect"
+COLLIDE = "collide"
+BLIT = "blit"
+
+COUNTERS = [IMAGE_LOAD, SURFACE, FLIP, FONT_RENDER, RECT, COLLIDE, BLIT]
+
+class OperationStats:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        # Forget everything that has been counted
+        self.current = {} # Counts for the frame in progress
+        self.lastFrame = {} # Counts for the last finished frame
+        self.frames = 0 # Frames finished in the current wave
+        self.waveTotals = {} # Counts for the current wave
+        self.wavePeaks = {} # Highest count in any frame of the current wave
+        self.waves = [] # Finished waves: {"name", "frames", "totals", "peaks"}
+        return None
+
+    def count(self, name, n=1):
+        if (not self.enabled):
+            return None
+        self.current[name] = self.current.get(name, 0) + n
+        return None
+
+    def endFrame(self):
+        # Finish the current frame and add it to the current wave
+        if (not self.enabled):
+            return None
+        for name, value in self.current.items():
+            self.waveTotals[name] = self.waveTotals.get(name, 0) + value
+            if (value > self.wavePeaks.get(name, 0)):
+                self.wavePeaks[name] = value
+        self.lastFrame = self.current
+        self.current = {}
+        self.frames += 1
+        return None
+
+    def endWave(self, name=None):
+        # Finish the current wave. Anything counted since the last frame ended belongs to the next wave
+        if (not self.enabled):
+            return None
+        if (name is None):
+            name = f"wave {len(self.waves) + 1}"
+        self.waves.append({"name": name, "frames": self.frames, "totals": self.waveTotals, "peaks": self.wavePeaks})
+        self.frames = 0
+        self.waveTotals = {}
+        self.wavePeaks = {}
+        return None
+
+    def getFrame(self):
+        # Counts for the last finished frame
+        return dict(self.lastFrame)
+
+    def getWave(self):
+        # Totals, peaks and number of frames for the current wave so far
+        return {"frames": self.frames, "totals": dict(self.waveTotals), "peaks": dict(self.wavePeaks)}
+
+    def getWaves(self):
+        return list(self.waves)
+
+    def report(self):
+        # Table of the average and peak counts per frame for each finished wave (and the current one)
+        waves = self.waves + [{"name": "current", "frames": self.frames, "totals": self.waveTotals,
+                               "peaks": self.wavePeaks}]
+        lines = [f"{'wave':<12}{'frames':>8}  " + "".join(f"{name:>20}" for name in COUNTERS),
+                 f"{'':<22}" + "".join(f"{'avg/frame   peak':>20}" for name in COUNTERS)]
+        for wave in waves:
+            if (wave["frames"] == 0):
+                continue
+            cells = ""
+            for name in COUNTERS:
+                average = wave["totals"].get(name, 0) / wave["frames"]
+                cells += f"{average:>12.1f}{wave['peaks'].get(name, 0):>8}"
+            lines.append(f"{wave['name']:<12}{wave['frames']:>8}  {cells}")
+        return "\n".join(lines)
+
+# Counters shared by everything
+stats = OperationStats()
+
+def count(name, n=1):
+    # Count 'n' operations in the current frame. Does nothing unless counting is enabled
+    if (stats.enabled):
+        stats.count(name, n)
+    return None
+
+def enable(hooks=True):
+    # Start counting. hooks=True also counts loads, Surfaces, flips and Rects (see install())
+    stats.enabled = True
+    if (hooks):
+        install()
+    return None
+
+# ============================================================== Hooks ==============================================================
+
+# The functions and classes replaced by install()
+originals = {}
+
+class CountingSurface(pygame.Surface):
+    def __init__(self, *args, **kwargs):
+        count(SURFACE)
+        super(CountingSurface, self).__init__(*args, **kwargs)
+
+class CountingRect(pygame.Rect):
+    def __init__(self, *args):
+        count(RECT)
+        super(CountingRect, self).__init__(*args)
+
+def countingLoad(*args, **kwargs):
+    count(IMAGE_LOAD)
+    return originals["load"](*args, **kwargs)
+
+def countingFlip(*args, **kwargs):
+    count(FLIP)
+    return originals["flip"](*args, **kwargs)
+
+def install():
+    # Replace the pygame functions and classes that are counted. Does nothing if already installed
+    if (len(originals) > 0):
+        return None
+    originals["load"] = pygame.image.load
+    originals["flip"] = pygame.transform.flip
+    originals["Surface"] = pygame.Surface
+    originals["Rect"] = pygame.Rect
+
+    pygame.image.load = countingLoad
+    pygame.transform.flip = countingFlip
+    pygame.Surface = CountingSurface
+    pygame.Rect = CountingRect
+    return None
+
+def uninstall():
+    # Put back everything replaced by install()
+    if (len(originals) == 0):
+        return None
+    pygame.image.load = originals.pop("load")
+    pygame.transform.flip = originals.pop("flip")
+    pygame.Surface = originals.pop("Surface")
+    pygame.Rect = originals.pop("Rect")
+    return None
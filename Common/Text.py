@@ -0,0 +1,81 @@
+""" Font registry and cached text rendering
+
+    pygame.font.SysFont() scans the system fonts every time it is called and
+    Font.render() builds a new surface every time, so the games look fonts up once
+    with getFont() and render text through renderText(), which keeps the most
+    recently used surfaces. Numbers are drawn with drawNumber(), which composes them
+    from cached digit glyphs so a changing score never renders new text.
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+from Common import Stats
+
+# Fonts that have already been created: (name, size, bold, italic) -> Font
+fonts = {}
+
+def getFont(name, size, bold=False, italic=False):
+    # Return the font with the given name and size, creating it the first time it is requested
+    key = (name, size, bold, italic)
+    font = fonts.get(key)
+    if (font is None):
+        font = pygame.font.SysFont(name, size, bold=bold, italic=italic)
+        fonts[key] = font
+    return font
+
+class TextCache:
+    """ Memoizes rendered text surfaces keyed on (font, text, color, antialias).
+        The least recently used surface is evicted once the cache is full.
+    """
+    def __init__(self, maxSize=256):
+        self.maxSize = maxSize
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, color, antialias=False):
+        key = (font, text, color, antialias)
+        surf = self.surfaces.get(key)
+        if (surf is None):
+            surf = font.render(text, antialias, color)
+            Stats.count(Stats.FONT_RENDER)
+            self.surfaces[key] = surf
+            if (len(self.surfaces) > self.maxSize):
+                self.surfaces.popitem(last=False) # Evict the least recently used surface
+        else:
+            self.surfaces.move_to_end(key)
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+
+# Cache shared by everything that draws text
+textCache = TextCache()
+
+def renderText(font, text, color, antialias=False):
+    # Render text through the shared cache. The returned surface is shared and must not be drawn on
+    return textCache.render(font, text, color, antialias)
+
+def drawNumber(screen, font, value, color, antialias=False, digits=0, **position):
+    """ Draw a whole number using cached digit glyphs. 'digits' pads the number with
+        leading zeros. The position is given as a single rect keyword argument
+        (topleft=, topright=, center=, ...). Returns the rect that was drawn over.
+    """
+    text = str(value).zfill(digits)
+    glyphs = [textCache.render(font, digit, color, antialias) for digit in text]
+
+    width = 0
+    height = 0
+    for glyph in glyphs:
+        width += glyph.get_width()
+        height = max(height, glyph.get_height())
+    rect = pygame.Rect(0, 0, width, height)
+    for anchor, point in position.items():
+        setattr(rect, anchor, point)
+
+    x = rect.left
+    for glyph in glyphs:
+        screen.blit(glyph, (x, rect.top))
+        x += glyph.get_width()
+    Stats.count(Stats.BLIT, len(glyphs))
+    return rect
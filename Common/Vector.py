@@ -0,0 +1,86 @@
+""" 2 dimensional vector shared by the games
+
+    Every velocity and position in the physics code is a Vector2, and they are
+    created and changed on every tick, so the class is kept light: it uses __slots__
+    instead of a __dict__, only works out its magnitude when asked for it, and has
+    in-place operators (+=, -=, *=, set(), update()) that change a vector without
+    creating a new one. Multiplying two vectors gives their dot product.
+"""
+
+class Vector2:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+    @property
+    def magnitude(self):
+        return ((self.x**2) + (self.y**2))**(1/2)
+
+    @property
+    def vector(self):
+        # The vector as a list, for code that still reads it that way
+        return [self.x, self.y]
+
+    def __add__(self, other):
+        return Vector2(self.x + other.x, self.y + other.y)
+
+    def __sub__(self, other):
+        return Vector2(self.x - other.x, self.y - other.y)
+
+    def __mul__(self, other):
+        # Scale by a number, or the dot product with another vector
+        if (isinstance(other, Vector2)):
+            return (self.x * other.x) + (self.y * other.y)
+        if (isinstance(other, (int, float))):
+            return Vector2(self.x * other, self.y * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, other):
+        if (isinstance(other, (int, float))):
+            self.x *= other
+            self.y *= other
+            return self
+        return NotImplemented
+
+    def getMagnitude(self):
+        return ((self.x**2) + (self.y**2))**(1/2)
+
+    def normalize(self):
+        # Scale the vector to a length of 1 in place (zero vectors are left alone). Returns the vector
+        magnitude = self.getMagnitude()
+        if (magnitude != 0):
+            invmag = 1 / magnitude
+            self.x = self.x * invmag
+            self.y = self.y * invmag
+        return self
+
+    def dot(self, v):
+        return (self.x * v.x) + (self.y * v.y)
+
+    def __str__(self):
+        return "({}, {})".format(self.x, self.y)
+
+    def update(self, x, y):
+        self.x = x
+        self.y = y
+        return None
+
+    def set(self, new):
+        # Copy another vector
+        self.x = new.x
+        self.y = new.y
+        return None
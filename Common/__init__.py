@@ -0,0 +1,5 @@
+""" Code shared between the games.
+
+    The games are run from inside their own directories, so each game adds the
+    top level of the repository to sys.path before importing anything from here.
+"""
@@ -4,14 +4,35 @@ import sys
 import random
 
 from Misc import *
+from Animation import Animator, getEnemyClips, getPlayerClips
 
 GRAVITY = 0.049
 FRICTION = .15
 
+def platformEdges(rect):
+    # Thin rects along the left, right, and bottom edges of a platform, used to tell which side was hit
+    leftline = pygame.Rect(rect.left, rect.top - 1, 1, rect.height - 1)
+    rightline = pygame.Rect(rect.right - 1, rect.top, 1, rect.height)
+    bottomline = pygame.Rect(rect.left, rect.bottom + 1, rect.width, 1)
+    return leftline, rightline, bottomline
+
 # Linear interpolation
 def lerp(a, b, f):
     return (1-f)*a + (f*b)
 
+def drawPosition(obj, alpha=None):
+    """ Position to draw an object at. If alpha is given (0 - 1), the object is drawn
+        that far between its position on the previous tick and its current position
+    """
+    previous = getattr(obj, "previous", None)
+    if (alpha is None or previous is None):
+        return obj.rect
+    dx = obj.rect.left - previous[0]
+    dy = obj.rect.top - previous[1]
+    if (abs(dx) > SCREEN_SIZE[0] // 2): # Wrapped around the screen. Don't draw it in between
+        return obj.rect
+    return (round(previous[0] + dx * alpha), round(previous[1] + dy * alpha))
+
 # ============================================================================================================= #
 # ====================================================== physics Object ================================================ #
 # Physics object base class for all moving objects.
@@ -25,48 +46,41 @@ class physicsObject(pygame.sprite.Sprite):
         self.velocity = Vector2()
         self.grounded = True
 
-    def collidePlatform(self, other):
-        # Change object velocity based on collision with platform
-        leftline = pygame.Rect(other.rect.left, other.rect.top - 1, 1, other.rect.height - 1)
-        rightline = pygame.Rect(other.rect.right - 1, other.rect.top, 1, other.rect.height)
-        bottomline = pygame.Rect(other.rect.left, other.rect.bottom + 1, other.rect.width, 1)
+        self.previous = None # Position on the previous tick (see drawPosition())
+
+    def collidePlatform(self, other, edges=None):
+        # Change object velocity based on collision with platform. 'edges' are the platform's edge rects, if already known
+        if (edges is None):
+            edges = platformEdges(other.rect)
+        leftline, rightline, bottomline = edges
 
         collideleft = leftline.colliderect(self.rect)
         collideright = rightline.colliderect(self.rect)
         collidebottom = bottomline.colliderect(self.rect)
+        Stats.count(Stats.COLLIDE, 3)
 
         magnitude = (abs(self.velocity.x) / 3)
         offset = random.randint(1, 4)
 
         if (collideleft):
-            d = Vector2(-1 * magnitude - offset, 0)
+            self.velocity.update(-1 * magnitude - offset, 0)
             self.rect.right = other.rect.left
         elif (collideright):
-            d = Vector2(magnitude + offset, 0)
+            self.velocity.update(magnitude + offset, 0)
             self.rect.left = other.rect.right
         elif (collidebottom):
-            d = Vector2(self.velocity.x, 1)
+            self.velocity.y = 1
             self.rect.top = other.rect.bottom
-        else:
-            d = self.velocity
-                
-        self.velocity = d
 
     def groundCheck(self, platforms):
         # Check if object is standing on platform or is in the air
         
-        groundcheck = pygame.Rect(self.rect.centerx, self.rect.bottom, 1, 3)
-
-        surfaces = []
-        for p in platforms:
-            surfaces.append(p.rect)
-        surfaces.append(pygame.Rect(0, SCREEN_SIZE[0], SCREEN_SIZE[0], 100))
-
-        ind = groundcheck.collidelist(surfaces)
-        if (ind != -1):
+        ground = platforms.geometry.groundUnder(self.rect.centerx, self.rect.bottom)
+        Stats.count(Stats.COLLIDE)
+        if (ground is not None):
             self.velocity.y = 0
-            if (self.rect.bottom >= surfaces[ind].top):
-                self.rect.bottom = surfaces[ind].top - 1
+            if (self.rect.bottom >= ground.top):
+                self.rect.bottom = ground.top - 1
             self.grounded = True
         else:
             self.grounded = False
@@ -76,10 +90,13 @@ class physicsObject(pygame.sprite.Sprite):
             - If on top of platform, object will be grounded
             - If object collides with any other side of the platform, it will 'bounce'
         """
-        for p in platforms:
-            if (self.rect.colliderect(p)):
-                # Determine type of collision and modify velocity accordingly
-                self.collidePlatform(p)
+        geometry = platforms.geometry
+        Stats.count(Stats.COLLIDE, len(geometry.rects))
+        if (self.rect.collidelist(geometry.rects) != -1): # Most of the time nothing is touched
+            for i, rect in enumerate(geometry.rects):
+                if (self.rect.colliderect(rect)):
+                    # Determine type of collision and modify velocity accordingly
+                    self.collidePlatform(geometry.platforms[i], geometry.edges[i])
 
         # A collision with the top of the screen (rect.top <= 0) will cause the object to
         # 'bounce' off the top with a magnitude that is relative to the speed at which the object
@@ -87,7 +104,7 @@ class physicsObject(pygame.sprite.Sprite):
         if (self.rect.top <= 0):
             bounce = (abs(self.velocity.y) / 3) + 1
             self.rect.top = 0
-            self.velocity = Vector2(self.velocity.x, bounce)
+            self.velocity.y = bounce
 
         # Check if the object is on the ground or in the air
         self.groundCheck(platforms)
@@ -98,34 +115,25 @@ class physicsObject(pygame.sprite.Sprite):
 # Enemy base class
 # Defines most of the basic behavior shared by the enemies
 class Enemy(physicsObject):
+    """ Enemies are reused once they are unseated (see Misc.Pool). __init__() only sets up what
+        never changes. Everything else is set by reset(), which every subclass calls at the end
+        of its own __init__()
+    """
     def __init__(self, position, eType):
         super(Enemy, self).__init__()
-        if (eType == 0): # Bounder
-            self.groundImage = BOUNDER_IDLE_G
-            self.airImage = BOUNDER_IDLE_A
-            self.flapImage = BOUNDER_FLAP
-        elif (eType == 1): # Hunter
-            self.groundImage = HUNTER_IDLE_G
-            self.airImage = HUNTER_IDLE_A
-            self.flapImage = HUNTER_FLAP
-        elif (eType == 2): # Shadow Lord
-            self.groundImage = SHADOWLORD_IDLE_G
-            self.airImage = SHADOWLORD_IDLE_A
-            self.flapImage = SHADOWLORD_FLAP
-        elif (eType == 3): # Pterodactyl
-            self.groundImage = SHADOWLORD_IDLE_G
-            self.airImage = SHADOWLORD_IDLE_A
-            self.flapImage = SHADOWLORD_FLAP
-        elif (eType == 4): # Bird
-            self.groundImage = BIRD_IDLE_G
-            self.airImage = BIRD_IDLE_A
-            self.flapImage = BIRD_FLAP
-        self.surf = pygame.image.load(self.groundImage).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
-        self.rect = self.surf.get_rect(center=position)
+        # Animations for this type of enemy (see Animation.ENEMY_IMAGES)
+        self.clips = getEnemyClips(eType)
+        self.animator = Animator(self.clips["ground"])
 
         self.type = eType
 
+    def reset(self, position):
+        self.animator.play(self.clips["ground"], True)
+        self.surf = self.animator.frame()
+        self.rect = self.surf.get_rect(center=position)
+        self.grounded = True
+        self.previous = None
+
         direction = random.choice([-1, 1])
         self.velocity = Vector2(direction * 2, 0)
 
@@ -142,8 +150,7 @@ class Enemy(physicsObject):
         self.counter = 0
 
         self.facing = direction # 1 = facing right, -1 = facing left
-        if (self.facing == -1):
-            self.surf = pygame.transform.flip(self.surf, True, False)
+        self.surf = self.animator.frame(self.facing == -1)
 
     def flap(self):
         # Determines how enemies flap
@@ -153,73 +160,68 @@ class Enemy(physicsObject):
             if (self.rect.centery > self.target.y):
                 self.rect.centery -= 1
                 self.velocity.y -= 0.72
-                self.surf = pygame.image.load(self.flapImage).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
                 self.state = 2
-                if (self.facing == -1):
-                    self.surf = pygame.transform.flip(self.surf, True, False)
+                self.animator.play(self.clips["flap"])
+                self.surf = self.animator.frame(self.facing == -1)
                 self.counter = 0
                 self.flapChance = random.randint(8, 16)
                 
         self.flapCounter = (self.flapCounter + 1) % self.flapChance # Evaluate flap every 'flapChance' frames
 
-    def die(self):
-        # Enemy death
+    def die(self, eggs=None):
+        # Enemy death. The egg is taken from 'eggs' (a Misc.Pool of Eggs), if given
         self.alive = 0
-        return Egg(self.rect.center, Vector2(self.facing * 2, 0), self.type)
+        if (eggs is None):
+            return Egg(self.rect.center, Vector2(self.facing * 2, 0), self.type)
+        return eggs.get(self.rect.center, Vector2(self.facing * 2, 0), self.type)
 
     def animate(self):
         # Animate the enemy based on current state
         if (self.grounded):
-            self.surf = pygame.image.load(self.groundImage).convert()
-            self.surf.set_colorkey(WHITE, RLEACCEL)
-            if (self.facing == -1):
-                self.surf = pygame.transform.flip(self.surf, True, False)
+            if (self.velocity.x != 0):
+                self.animator.play(self.clips["walk"])
+            else:
+                self.animator.play(self.clips["ground"])
         else:
             if (self.state == 1):
-                self.surf = pygame.image.load(self.airImage).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-                if (self.facing == -1):
-                    self.surf = pygame.transform.flip(self.surf, True, False)
-            else:
+                self.animator.play(self.clips["air"])
+            else: # Keep showing the flap (or ground) frame for a moment after leaving the ground
                 if (self.counter == (self.flapChance // 2)):
                     self.state = 1
                     self.counter = 0
                 self.counter += 1
 
         if (self.velocity.x < 0 and self.facing == 1):
-            self.surf = pygame.transform.flip(self.surf, True, False)
             self.facing = -1
         if (self.velocity.x > 0 and self.facing == -1):
-            self.surf = pygame.transform.flip(self.surf, True, False)
             self.facing = 1
 
-    def collide(self, other):
+        self.surf = self.animator.frame(self.facing == -1)
+        self.animator.advance()
+
+    def collide(self, other, edges=None):
         # Override parent collide function. Change enemy velocity based on collision with platform
-        leftline = pygame.Rect(other.rect.left, other.rect.top - 1, 1, other.rect.height - 1)
-        rightline = pygame.Rect(other.rect.right - 1, other.rect.top, 1, other.rect.height)
-        bottomline = pygame.Rect(other.rect.left, other.rect.bottom + 1, other.rect.width, 1)
+        if (edges is None):
+            edges = platformEdges(other.rect)
+        leftline, rightline, bottomline = edges
 
         collideleft = leftline.colliderect(self.rect)
         collideright = rightline.colliderect(self.rect)
         collidebottom = bottomline.colliderect(self.rect)
+        Stats.count(Stats.COLLIDE, 3)
 
         magnitude = (abs(self.velocity.x) / 3)
         offset = random.randint(1, 4)
 
         if (collideleft):
-            d = Vector2(-1 * self.velocity.x, 0)
+            self.velocity.update(-1 * self.velocity.x, 0)
             self.rect.right = other.rect.left
         elif (collideright):
-            d = Vector2(-1 * self.velocity.x, 0)
+            self.velocity.update(-1 * self.velocity.x, 0)
             self.rect.left = other.rect.right
         elif (collidebottom):
-            d = Vector2(self.velocity.x, 1)
+            self.velocity.y = 1
             self.rect.top = other.rect.bottom
-        else:
-            d = self.velocity
-                
-        self.velocity = d
 
     def groundCheck(self, platforms):
         # Overwriting parent groundCheck() function. Enemies hitbox is updated based on whether
@@ -229,20 +231,14 @@ class Enemy(physicsObject):
         else:
             bottom = self.rect.bottom + 12
         
-        groundcheck = pygame.Rect(self.rect.centerx, bottom, 1, 3)
-
-        surfaces = []
-        for p in platforms:
-            surfaces.append(p.rect)
-        surfaces.append(pygame.Rect(0, SCREEN_SIZE[0], SCREEN_SIZE[0], 100))
-
-        ind = groundcheck.collidelist(surfaces)
-        if (ind != -1):
+        ground = platforms.geometry.groundUnder(self.rect.centerx, bottom)
+        Stats.count(Stats.COLLIDE)
+        if (ground is not None):
             self.velocity.y = 0
             if (not self.grounded):
                 self.rect.height += 12
-            if (self.rect.bottom >= surfaces[ind].top):
-                self.rect.bottom = surfaces[ind].top - 1
+            if (self.rect.bottom >= ground.top):
+                self.rect.bottom = ground.top - 1
             self.grounded = True
         else:
             if (self.grounded):
@@ -266,6 +262,7 @@ def findPath(actor, target, platformGroup):
 
     rectH.normalize()
 
+    Stats.count(Stats.COLLIDE, len(platformGroup))
     for plat in platformGroup:
         if (plat.rect.colliderect(rectH)):
             if (plat.rect.centery > target.y):
@@ -287,6 +284,10 @@ def findPath(actor, target, platformGroup):
 class Bird(Enemy):
     def __init__(self, platformGroup, egg):
         super(Bird, self).__init__((10, 100), 4)
+        self.reset(platformGroup, egg)
+
+    def reset(self, platformGroup, egg):
+        super(Bird, self).reset((10, 100))
         self.target = Vector2(egg.rect.centerx, egg.rect.centery)
         if (self.target.x > SCREEN_SIZE[1] // 2):
             x_spawn = 0
@@ -363,11 +364,9 @@ class Bird(Enemy):
         # Flap
         self.rect.centery -= 1
         self.velocity.y -= 0.72
-        self.surf = pygame.image.load(self.flapImage).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
         self.state = 2
-        if (self.facing == -1):
-            self.surf = pygame.transform.flip(self.surf, True, False)
+        self.animator.play(self.clips["flap"])
+        self.surf = self.animator.frame(self.facing == -1)
 
     def flap(self):
         # Attempt to flap
@@ -448,15 +447,19 @@ class Bird(Enemy):
 class Jouster(pygame.sprite.Sprite):
     def __init__(self, position, jType):
         super(Jouster, self).__init__()
+        self.reset(position, jType)
+
+    def reset(self, position, jType):
         if jType == 0:
             image = RED_JOUSTER
         elif jType == 1:
             image = GREY_JOUSTER
         elif jType == 2:
             image = BLUE_JOUSTER
-        self.surf = pygame.image.load(image).convert()
+        self.surf = getImage(image)
         self.rect = self.surf.get_rect(center=position)
         self.type = jType
+        self.previous = None
 
     def update(self):
         return
@@ -465,9 +468,12 @@ class Jouster(pygame.sprite.Sprite):
 class Egg(physicsObject):
     def __init__(self, position, velocity, eType):
         super(Egg, self).__init__()
-        self.surf = pygame.image.load(EGG).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
+        self.surf = getImage(EGG)
+        self.reset(position, velocity, eType)
+
+    def reset(self, position, velocity, eType):
         self.rect = self.surf.get_rect(center=position)
+        self.previous = None
 
         self.type = eType
 
@@ -475,10 +481,10 @@ class Egg(physicsObject):
         self.grounded = False
 
         self.timer = 0
-        self.hatchTime = FPS * random.randint(12,16)
+        self.hatchTime = TICK_RATE * random.randint(12,16)
 
         randNum = random.randint(7, 12)
-        self.birdSpawn = randNum * FPS 
+        self.birdSpawn = randNum * TICK_RATE 
 
     def __move__(self):
         # Move the egg
@@ -523,9 +529,14 @@ class Egg(physicsObject):
     Note: This implementation is somewhat messy and could probably be cleaned up, but works for now
 """
 class EBJ(pygame.sprite.Sprite):
-    def __init__(self, position, velocity, enemyType, platformGroup):
+    def __init__(self, position, velocity, enemyType, platformGroup, pools=None):
         super(EBJ, self).__init__()
-        self.egg = Egg(position, velocity, enemyType)
+        self.reset(position, velocity, enemyType, platformGroup, pools)
+
+    def reset(self, position, velocity, enemyType, platformGroup, pools=None):
+        # The eggs, birds, jousters, and enemies are taken from 'pools' (class -> Misc.Pool), if given
+        self.pools = pools
+        self.egg = self.create(Egg, position, velocity, enemyType)
         self.jouster = None
         # We cannot create the bird instance here because it could cause the bird to target the
         # position of the egg when it was first created. This is an issue because the egg can
@@ -550,14 +561,20 @@ class EBJ(pygame.sprite.Sprite):
         self.state = 0
 
 
+    def create(self, cls, *args):
+        # New instance of an egg/bird/jouster/enemy class, reused from the pools if possible
+        if (self.pools is None):
+            return cls(*args)
+        return self.pools[cls].get(*args)
+
     def spawn(self):
         # Spawn an enemy based on the egg type
         if (self.type == 0):
-            return Bounder((self.egg.rect.centerx, self.egg.rect.centery - 3))
+            return self.create(Bounder, (self.egg.rect.centerx, self.egg.rect.centery - 3))
         elif (self.type == 1):
-            return Hunter((self.egg.rect.centerx, self.egg.rect.centery - 3))
+            return self.create(Hunter, (self.egg.rect.centerx, self.egg.rect.centery - 3))
         elif (self.type == 2):
-            return ShadowLord((self.egg.rect.centerx, self.egg.rect.centery - 3))
+            return self.create(ShadowLord, (self.egg.rect.centerx, self.egg.rect.centery - 3))
 
     def collideAny(self, group):
         # Check if there is a collision between the egg and any object in a sprite group
@@ -583,10 +600,11 @@ class EBJ(pygame.sprite.Sprite):
             self.state = 5
         return None
 
-    def render(self, screen):
+    def render(self, screen, alpha=None):
         # Render appropriate object based on state
+        Stats.count(Stats.BLIT, len(self.renderList))
         for item in self.renderList:
-            screen.blit(item.surf, item.rect)
+            screen.blit(item.surf, drawPosition(item, alpha))
 
         return None
 
@@ -596,13 +614,13 @@ class EBJ(pygame.sprite.Sprite):
             if (ret == 2): # If egg update returned 2
                 self.state = 1 # Change state to 1: Bird and egg are active
                 if (self.bird is None): # If bird is None
-                    self.bird = Bird(platforms, self.egg) # Create bird instance
+                    self.bird = self.create(Bird, platforms, self.egg) # Create bird instance
                 self.renderList.append(self.bird)
                     
             elif (ret == 1): # If egg update returned 1
                 self.state = 2 # Change state to 2: Bird and jouster are active
                 if (self.jouster is None): # If jouster is None
-                    self.jouster = Jouster((self.egg.rect.centerx, self.egg.rect.centery - 2), self.type) # Create jouster instance
+                    self.jouster = self.create(Jouster, (self.egg.rect.centerx, self.egg.rect.centery - 2), self.type) # Create jouster instance
                 self.renderList.remove(self.egg)
                 self.renderList.append(self.jouster)
                     
@@ -611,7 +629,7 @@ class EBJ(pygame.sprite.Sprite):
             if (ret1 == 2):
                 self.state = 2 # Change state to 2: Bird and jouster are active
                 if (self.jouster is None): # If jouster is None
-                    self.jouster = Jouster(self.egg.rect.center, self.type) # Create jouster instance
+                    self.jouster = self.create(Jouster, self.egg.rect.center, self.type) # Create jouster instance
                 self.renderList.remove(self.egg)
                 self.renderList.append(self.jouster)
             
@@ -619,7 +637,7 @@ class EBJ(pygame.sprite.Sprite):
             if (ret2 == 1): # If egg update returned 1
                 self.state = 2 # Change state to 2: Bird and jouster are active
                 if (self.jouster is None): # If jouster is None
-                    self.jouster = Jouster(self.egg.rect.center, self.type) # Create jouster instance
+                    self.jouster = self.create(Jouster, self.egg.rect.center, self.type) # Create jouster instance
                 self.renderList.remove(self.egg)
                 self.renderList.append(self.jouster)
                     
@@ -645,6 +663,10 @@ class EBJ(pygame.sprite.Sprite):
 class ShadowLord(Enemy):
     def __init__(self, position):
         super(ShadowLord, self).__init__(position, 2)
+        self.reset(position)
+
+    def reset(self, position):
+        super(ShadowLord, self).reset(position)
 
         direction = random.choice([-1, 1])
 
@@ -670,6 +692,10 @@ class ShadowLord(Enemy):
 class Hunter(Enemy):
     def __init__(self, position):
         super(Hunter, self).__init__(position, 1)
+        self.reset(position)
+
+    def reset(self, position):
+        super(Hunter, self).reset(position)
 
         direction = random.choice([-1, 1])
 
@@ -709,6 +735,10 @@ class Hunter(Enemy):
 class Bounder(Enemy):
     def __init__(self, position):
         super(Bounder, self).__init__(position, 0)
+        self.reset(position)
+
+    def reset(self, position):
+        super(Bounder, self).reset(position)
 
         direction = random.choice([-1, 1])
 
@@ -739,11 +769,11 @@ class Player(physicsObject):
     def __init__(self):
         super(Player, self).__init__()
         # overwrite parent self.surf and self.rect
-        # Default animation state
-        self.idleGroundAnim = PLAYER_IDLE_GROUND
+        # Animations for each state (see Animation.PLAYER_CLIPS)
+        self.clips = getPlayerClips()
+        self.animator = Animator(self.clips[0]) # Default animation state
 
-        self.surf = pygame.image.load(self.idleGroundAnim).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
+        self.surf = self.animator.frame()
 
         self.rect = self.surf.get_rect(center=(SCREEN_SIZE[0]//2, 354))
 
@@ -755,22 +785,14 @@ class Player(physicsObject):
         self.facing = 0 # 0 for right, 1 for left
 
         self.counter = 0 # general counter/timer
-        self.animct = 0 # animation counter
 
         self.lives = 4
         self.points = 0
 
-        # Default animations:
-        self.idleAirAnim = PLAYER_IDLE_AIR
-        self.flapAnim = PLAYER_FLAP
-        self.slideAnim = PLAYER_SLIDE
-        self.walkAnim = PLAYER_WALK
-        self.respawnAnim = PLAYER_RESPAWN
-
     def flap(self):
         # Prevent player from moving for the first (1/4) second after death
         # to prevent accidental movements
-        if (self.state == 5 and self.counter < (FPS / 4)):
+        if (self.state == 5 and self.counter < (TICK_RATE / 4)):
             return None
         if (self.grounded): # Taking off the ground
             self.velocity.y -= 1.5
@@ -778,6 +800,7 @@ class Player(physicsObject):
             self.velocity.y -= 0.9
             self.state = 4
             self.counter = 0
+            self.animator.play(self.clips[4], restart=True)
         self.rect.move_ip(self.velocity.x, self.velocity.y)
         return None
 
@@ -789,7 +812,7 @@ class Player(physicsObject):
         """
         # Prevent player from moving for the first (1/4) second after death
         # to prevent accidental movements
-        if (self.state == 5 and self.counter < (FPS / 4)):
+        if (self.state == 5 and self.counter < (TICK_RATE / 4)):
             return None
         moving = False
         if (inputs[K_RIGHT]): # Moving to the right
@@ -828,7 +851,7 @@ class Player(physicsObject):
         loc = random.randint(0, numlocations)
         self.rect.center = locations[loc]
         self.counter = 0
-        self.animct = 0
+        self.animator.play(self.clips[5], restart=True)
         return None
 
     def die(self, locs):
@@ -855,9 +878,6 @@ class Player(physicsObject):
             if (abs(self.velocity.x) >= 1): # Moving
                 if (self.accelerating):
                     curState = 1 # Walking/Running
-                    if (self.state != 1):
-                        self.counter = 0
-                        self.animct = 3
                 else:
                     curState = 2 # Sliding
             else: # Not moving
@@ -877,56 +897,26 @@ class Player(physicsObject):
         state = self.getState()
 
         self.state = state
-        if (state == 0): # Idle Ground
-            self.surf = pygame.image.load(self.idleGroundAnim).convert()
-            self.surf.set_colorkey(WHITE, RLEACCEL)
-        elif (state == 1): # Running
-            # Update speed determines the speed of the transition. It is based on the
-            # speed at which the player is moving
-            updateSpeed = lerp(16, 4, abs(self.velocity.x) // self.max_x)
-            updateSpeed = int(updateSpeed)
-            if (self.counter % updateSpeed == 0): # Update current image
-                self.animct = (self.animct + 1) % 4
-                self.surf = pygame.image.load(self.walkAnim[self.animct]).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-            else:
-                self.surf = pygame.image.load(self.walkAnim[self.animct]).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-            self.counter += 1
-        elif (state == 2): # Sliding
-            self.surf = pygame.image.load(self.slideAnim).convert()
-            self.surf.set_colorkey(WHITE, RLEACCEL)
-        elif (state == 3): # Idle Air
-            self.surf = pygame.image.load(self.idleAirAnim).convert()
-            self.surf.set_colorkey(WHITE, RLEACCEL)
+        step = 1
+        if (state == 1): # Running
+            # The walk cycle plays faster when the player is moving at full speed
+            step = 16 // int(lerp(16, 4, min(abs(self.velocity.x) // self.max_x, 1)))
         elif (state == 4): # Flapping
-            if (self.counter == 5): # Flapping is over = Transition to idle air
+            if (self.animator.finished): # Flapping is over = Transition to idle air
                 self.state = 3
-                self.surf = pygame.image.load(self.idleAirAnim).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-                self.counter = 0
-            else: # Display flap image
-                self.surf = pygame.image.load(self.flapAnim).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-                self.counter += 1
         elif (state == 5): # Respawning
-            if (self.counter <= (FPS * 5)): # Respawn state lasts for 5 seconds
-                # update current image and counter
-                self.surf = pygame.image.load(self.respawnAnim[self.animct]).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
-                if (self.counter % 10 == 0):
-                    self.animct = (self.animct + 1) % 3
-            else: # After 5 seconds, return to idle ground image
+            if (self.counter > (TICK_RATE * 5)): # Respawn state lasts for 5 seconds
+                # After 5 seconds, return to idle ground
                 self.state = 0
-                self.surf = pygame.image.load(self.idleGroundAnim).convert()
-                self.surf.set_colorkey(WHITE, RLEACCEL)
                 self.counter = 0
                 self.invincible = False
-            self.counter += 1
+            else:
+                self.counter += 1
 
+        self.animator.play(self.clips[self.state])
         # Flip image based on the direction the player is facing
-        if (self.facing == 1):
-            self.surf = pygame.transform.flip(self.surf, True, False)
+        self.surf = self.animator.frame(self.facing == 1)
+        self.animator.advance(step)
         return None
 
     def groundCheck(self, platforms):
@@ -937,20 +927,14 @@ class Player(physicsObject):
         else:
             bottom = self.rect.bottom + 12
         
-        groundcheck = pygame.Rect(self.rect.centerx, bottom, 1, 3)
-
-        surfaces = []
-        for p in platforms:
-            surfaces.append(p.rect)
-        surfaces.append(pygame.Rect(0, SCREEN_SIZE[0], SCREEN_SIZE[0], 100))
-
-        ind = groundcheck.collidelist(surfaces)
-        if (ind != -1):
+        ground = platforms.geometry.groundUnder(self.rect.centerx, bottom)
+        Stats.count(Stats.COLLIDE)
+        if (ground is not None):
             self.velocity.y = 0
             if (not self.grounded):
                 self.rect.height += 12
-            if (self.rect.bottom >= surfaces[ind].top):
-                self.rect.bottom = surfaces[ind].top - 1
+            if (self.rect.bottom >= ground.top):
+                self.rect.bottom = ground.top - 1
             self.grounded = True
         else:
             if (self.grounded):
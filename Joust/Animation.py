@@ -0,0 +1,118 @@
+""" Animation clips for the Joust actors
+
+    A clip is a sequence of frames with a duration (in frames) for each one. Every
+    frame is stored facing right and pre-flipped facing left when the clip is built,
+    so playing an animation only advances an index and picks an existing surface.
+"""
+import pygame
+
+from Misc import *
+
+# Player clips for each player state: state -> (images, duration of each image, loop)
+PLAYER_CLIPS = {0: ([PLAYER_IDLE_GROUND], [1], True),   # Idle (standing)
+                1: (PLAYER_WALK, [16, 16, 16, 16], True),  # Walking/Running
+                2: ([PLAYER_SLIDE], [1], True),         # Sliding
+                3: ([PLAYER_IDLE_AIR], [1], True),      # Idle (in air)
+                4: ([PLAYER_FLAP], [5], False),         # Flapping
+                5: (PLAYER_RESPAWN, [10, 10, 10], True) # Respawning
+               }
+
+# Images used by each type of enemy: eType -> (idle ground, idle air, flap)
+ENEMY_IMAGES = {0: (BOUNDER_IDLE_G, BOUNDER_IDLE_A, BOUNDER_FLAP),           # Bounder
+                1: (HUNTER_IDLE_G, HUNTER_IDLE_A, HUNTER_FLAP),              # Hunter
+                2: (SHADOWLORD_IDLE_G, SHADOWLORD_IDLE_A, SHADOWLORD_FLAP),  # Shadow Lord
+                3: (SHADOWLORD_IDLE_G, SHADOWLORD_IDLE_A, SHADOWLORD_FLAP),  # Pterodactyl
+                4: (BIRD_IDLE_G, BIRD_IDLE_A, BIRD_FLAP)                     # Bird
+               }
+
+# Number of frames each step of the enemy walk cycle is displayed
+ENEMY_WALK_SPEED = 8
+
+class Clip:
+    def __init__(self, surfaces, durations, loop=True):
+        self.right = list(surfaces)
+        self.left = [pygame.transform.flip(surf, True, False) for surf in self.right]
+        self.durations = list(durations)
+        self.loop = loop
+        self.length = len(self.right)
+
+class Animator:
+    """ Plays a clip. Call frame() to get the surface for the current frame and
+        advance() once per update to move the animation forward.
+    """
+    def __init__(self, clip):
+        self.clip = None
+        self.play(clip)
+
+    def play(self, clip, restart=False):
+        # Switch to a different clip. Playing the current clip again does nothing unless restart is set
+        if (clip is not self.clip or restart):
+            self.clip = clip
+            self.index = 0
+            self.elapsed = 0
+            self.finished = False
+        return None
+
+    def advance(self, step=1):
+        # Move the animation forward by 'step' frames
+        if (self.finished):
+            return None
+        self.elapsed += step
+        while (self.elapsed >= self.clip.durations[self.index]):
+            self.elapsed -= self.clip.durations[self.index]
+            self.index += 1
+            if (self.index == self.clip.length):
+                if (self.clip.loop):
+                    self.index = 0
+                else: # Hold the last frame
+                    self.index = self.clip.length - 1
+                    self.finished = True
+                    break
+        return None
+
+    def frame(self, flipped=False):
+        # Surface for the current frame, facing left if flipped
+        if (flipped):
+            return self.clip.left[self.index]
+        return self.clip.right[self.index]
+
+# Clips are built the first time they are requested, after the images have been loaded
+clipCache = {}
+
+def bob(image):
+    # Copy of an image shifted up by one pixel. Used for the walk cycle of the enemies
+    # until they get their own walking art
+    source = getImage(image)
+    surf = pygame.Surface(source.get_size()).convert()
+    surf.fill(WHITE)
+    surf.blit(source, (0, -1))
+    surf.set_colorkey(WHITE, RLEACCEL)
+    return surf
+
+def getPlayerClips():
+    # Clips for each of the player states
+    if ("player" not in clipCache):
+        clips = {}
+        for state, (images, durations, loop) in PLAYER_CLIPS.items():
+            clips[state] = Clip([getImage(image) for image in images], durations, loop)
+        clipCache["player"] = clips
+    return clipCache["player"]
+
+def getEnemyClips(eType):
+    # Clips for an enemy type: idle ground, walk, idle air, and flap
+    if (eType not in clipCache):
+        ground, air, flap = ENEMY_IMAGES[eType]
+        clipCache[eType] = {
+            "ground": Clip([getImage(ground)], [1]),
+            "walk": Clip([getImage(ground), bob(ground)], [ENEMY_WALK_SPEED, ENEMY_WALK_SPEED]),
+            "air": Clip([getImage(air)], [1]),
+            "flap": Clip([getImage(flap)], [1]),
+        }
+    return clipCache[eType]
+
+def loadClips():
+    # Build every clip ahead of time so nothing is created during gameplay
+    getPlayerClips()
+    for eType in ENEMY_IMAGES:
+        getEnemyClips(eType)
+    return None
@@ -0,0 +1,84 @@
+""" Dirty rectangle tracking for the Joust renderer
+
+    Most of the screen never changes: black sky, the platforms, and the lava. Instead of
+    redrawing all of it and sending the whole window to the display every frame, the
+    renderer only touches the parts of the screen where something moved:
+        - Everything drawn through blit() on the last frame is covered up again with the
+          same part of the background (see Env.background())
+        - The moving objects are drawn at their new positions through blit()
+        - Only the rects covered up or drawn over are sent to the display
+
+    Things that stay on screen for more than a frame without being redrawn (the HUD)
+    are drawn straight onto the screen and reported with update(). They have to be
+    redrawn when damaged() says an erased rect touched them.
+
+    When the background changes (new platforms or higher lava) or something else drew over
+    the screen, invalidate() makes the next frame draw the whole background and send the
+    whole screen to the display.
+"""
+
+import pygame
+
+from Misc import *
+
+class DirtyRects:
+    def __init__(self, screen):
+        self.screen = screen
+        self.background = None # Background the screen was last drawn on
+        self.drawn = [] # Rects drawn through blit() this frame. Erased at the start of the next one
+        self.updates = [] # Rects to send to the display this frame
+        self.full = True # The whole screen has to be sent to the display
+
+    def begin(self, background):
+        """ Start a frame on 'background': erase what was drawn on the last frame, or draw
+            the whole background if it changed. Returns whether the whole background was drawn
+        """
+        if (background is not self.background):
+            self.screen.blit(background, (0, 0))
+            Stats.count(Stats.BLIT)
+            self.background = background
+            self.full = True
+        else:
+            for rect in self.drawn:
+                self.screen.blit(background, rect, rect)
+            Stats.count(Stats.BLIT, len(self.drawn))
+        self.updates = self.drawn
+        self.drawn = []
+        return self.full
+
+    def invalidate(self):
+        # Start the next frame from the whole background
+        self.background = None
+        return None
+
+    def blit(self, surf, position, area=None):
+        # Draw a surface for this frame only. Same arguments as Surface.blit()
+        rect = self.screen.blit(surf, position, area)
+        self.drawn.append(rect)
+        self.updates.append(rect)
+        return rect
+
+    def erase(self, rect):
+        # Cover a rect with the background right away, e.g. where the HUD was
+        self.screen.blit(self.background, rect, rect)
+        Stats.count(Stats.BLIT)
+        self.updates.append(rect)
+        return None
+
+    def update(self, rect):
+        # Something was drawn straight onto the screen over 'rect'
+        self.updates.append(rect)
+        return None
+
+    def damaged(self, rect):
+        # Whether the background was drawn over any of 'rect' this frame
+        return self.full or rect.collidelist(self.updates) != -1
+
+    def present(self):
+        # Send the changed parts of the screen to the display
+        if (self.full):
+            pygame.display.update()
+            self.full = False
+        else:
+            pygame.display.update(self.updates)
+        return None
@@ -4,7 +4,20 @@ import sys
 import random
 
 from Misc import *
-from Agents import Bounder, Hunter, ShadowLord, EBJ
+from Agents import Bounder, Hunter, ShadowLord, Bird, Jouster, Egg, EBJ, platformEdges
+from Input import Keys, KeyboardInput
+from Timestep import FixedTimestep
+from SpatialHash import SpatialHash
+from DirtyRects import DirtyRects
+from Common.FrameTimer import FrameTimer
+
+# Phases of a frame, as timed by Env.timer. Waiting for the frame rate cap is not work
+FRAME_PHASES = ["wave", "input", "update", "collision", "render", "present", "wait"]
+IDLE_PHASES = ["wait"]
+
+def createFrameTimer(enabled=False, overlay=False, budget=1/TICK_RATE):
+    # Frame timer for the Joust loop (see Common/FrameTimer.py)
+    return FrameTimer(FRAME_PHASES, IDLE_PHASES, budget, enabled, overlay)
 
 # Class to display and manage platforms
 class Platform(pygame.sprite.Sprite):
@@ -14,8 +27,7 @@ class Platform(pygame.sprite.Sprite):
             self.surf = pygame.Surface(size)
             self.surf.fill((140, 60, 10))
         else:
-            self.surf = pygame.image.load(image).convert()
-            self.surf.set_colorkey(WHITE, RLEACCEL)
+            self.surf = getImage(image)
         self.rect = self.surf.get_rect(center=position)
 
         self.isSpawnLocation = False
@@ -25,24 +37,78 @@ class Platform(pygame.sprite.Sprite):
         self.spawnPos = location
         self.isSpawnLocation = True
 
+# Depth (in pixels) of the probe below an object's feet that checks if it is standing on something
+GROUND_PROBE = 3
+
+class PlatformGeometry:
+    """ Collision geometry for a set of platforms, baked once when the platforms change
+        instead of being rebuilt by every object on every tick:
+            - The rects of the platforms and the floor below the screen, in platform order
+            - The edge rects of each platform (see platformEdges() in Agents.py)
+            - For every column of pixels, the surfaces that cover it, in platform order. This
+              makes finding the ground under an object a lookup instead of a test against
+              every platform
+    """
+    def __init__(self, platforms):
+        self.platforms = list(platforms)
+        self.rects = [p.rect for p in self.platforms]
+        self.edges = [platformEdges(rect) for rect in self.rects]
+
+        # Anything that falls off the platforms lands on the floor below the screen
+        self.floor = pygame.Rect(0, SCREEN_SIZE[0], SCREEN_SIZE[0], 100)
+        self.surfaces = self.rects + [self.floor]
+
+        # Columns run from the left edge of the leftmost surface to the right edge of the rightmost.
+        # Each one is a tuple of (top, bottom, rect). Identical columns share the same tuple
+        self.left = min(rect.left for rect in self.surfaces)
+        right = max(rect.right for rect in self.surfaces)
+        shared = {} # Indices of the surfaces covering a column -> its tuple
+        self.columns = []
+        for x in range(self.left, right):
+            covering = tuple(i for i, rect in enumerate(self.surfaces) if rect.left <= x < rect.right)
+            if (covering not in shared):
+                shared[covering] = tuple((self.surfaces[i].top, self.surfaces[i].bottom, self.surfaces[i]) for i in covering)
+            self.columns.append(shared[covering])
+
+    def groundUnder(self, x, y):
+        """ The first surface (in platform order) that a probe GROUND_PROBE pixels deep at
+            (x, y) touches, or None. Same as testing the probe against every surface
+        """
+        column = x - self.left
+        if (column < 0 or column >= len(self.columns)):
+            return None
+        for top, bottom, rect in self.columns[column]:
+            if (top < y + GROUND_PROBE and bottom > y):
+                return rect
+        return None
+
+class PlatformGroup(pygame.sprite.Group):
+    # Sprite group of the active platforms along with their collision geometry
+    def __init__(self, platforms):
+        super(PlatformGroup, self).__init__(*platforms)
+        self.geometry = PlatformGeometry(platforms)
+
 # Container for an object that is temporarily rendered to the screen
 # to display points where eggs are destroyed
 class PointDisplay:
     def __init__(self, position, points, bonusPoints):
-        self.font = pygame.font.SysFont("Courier New", 14, bold=False)
+        self.font = getFont("Courier New", 14, bold=False)
+        self.reset(position, points, bonusPoints)
 
-        self.points_text = self.font.render(f"{points}", False, YELLOW)
+    def reset(self, position, points, bonusPoints):
+        self.points_text = renderText(self.font, f"{points}", YELLOW)
         self.points_rect = self.points_text.get_rect(center=(position))
         
-        self.bonus_text = self.font.render(f"{bonusPoints}", False, GREEN)
+        self.bonus_text = renderText(self.font, f"{bonusPoints}", GREEN)
         self.bonus_rect = self.bonus_text.get_rect(center=(position[0], position[1] -15))
 
         self.counter = 0
-        self.duration = FPS * 1.5
+        self.duration = TICK_RATE * 1.5
 
     def render(self, screen):
         screen.blit(self.points_text, self.points_rect)
         screen.blit(self.bonus_text, self.bonus_rect)
+        Stats.count(Stats.BLIT, 2)
 
     def update(self):
         if (self.counter >= self.duration):
@@ -52,8 +118,9 @@ class PointDisplay:
 
 # Class to manage the displaying of points on the screen
 class PointManager:
-    def __init__(self):
+    def __init__(self, pool=None):
         self.pointDisplays = []
+        self.pool = pool # Pool the point displays go back to when they are done (see Misc.Pool)
         self.pointsPerEgg = 250
         self.bonusPointsPerEgg = 500
 
@@ -78,25 +145,25 @@ class PointManager:
             retval = display.update()
             if (retval == 1):
                 self.pointDisplays.remove(display)
+                if (self.pool is not None):
+                    self.pool.release(display)
         return None
 
 # Container to hold an object that displays a mount icon on the screen
 class MountIcon:
     def __init__(self, position):
-        self.surf = pygame.image.load(MOUNT_ICON).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
+        self.surf = getImage(MOUNT_ICON)
 
         self.rect = self.surf.get_rect(topleft=(position))
 
 # Class to manage and render the total points and remaining mounts
 class MainDisplay:
     def __init__(self, mountDisplayPosition, points=0):
-        self.font = pygame.font.SysFont("QuickType 2", 26, bold=False)
+        self.font = getFont("QuickType 2", 26, bold=False)
 
         self.textposition = (mountDisplayPosition[0] - 3, mountDisplayPosition[1] + 2)
 
-        self.points_text = self.font.render(f"{points}", False, BRIGHT_YELLOW)
-        self.points_rect = self.points_text.get_rect(topright=(self.textposition))
+        self.points = points
 
         self.remainingMounts = 4
 
@@ -108,17 +175,18 @@ class MainDisplay:
         return None
 
     def render(self, screen):
-        # Render mounts and points
+        # Render mounts and points. Returns the rect that was drawn over
+        rect = drawNumber(screen, self.font, self.points, BRIGHT_YELLOW, topright=self.textposition)
         for i in range(self.remainingMounts):
             curIcon = self.mountIcons[i]
             screen.blit(curIcon.surf, curIcon.rect)
-
-        screen.blit(self.points_text, self.points_rect)
+            rect.union_ip(curIcon.rect)
+        Stats.count(Stats.BLIT, self.remainingMounts)
+        return rect
 
     def update(self, points, mounts):
         # Update points and mounts
-        self.points_text = self.font.render(f"{points}", False, BRIGHT_YELLOW)
-        self.points_rect = self.points_text.get_rect(topright=(self.textposition))
+        self.points = points
 
         self.remainingMounts = mounts
         return None
@@ -139,7 +207,7 @@ class Lava(pygame.sprite.Sprite):
         self.counter = 0
 
         self.moveCounter = 0
-        self.lavaMoveSpeed = FPS // 3
+        self.lavaMoveSpeed = TICK_RATE // 3
 
     def moveUp(self):
         # Increases the height of the lava
@@ -163,9 +231,11 @@ class Lava(pygame.sprite.Sprite):
 
 # Stores and manages everything related to the game loop
 class Env:
-    def __init__(self, listOfPlatforms, Player, Screen, Clock):
+    def __init__(self, listOfPlatforms, Player, Screen, Clock, inputSource=None, render=True, fps=FPS, headless=False,
+                 timeScale=1.0, interpolate=False, timer=None, dirtyRects=True):
         self.platformList = listOfPlatforms
         self.activePlatforms = listOfPlatforms
+        self.platformGroup = PlatformGroup(listOfPlatforms) # Active platforms, passed to the agents
 
         self.player = Player
         self.screen = Screen
@@ -174,7 +244,17 @@ class Env:
         self.enemyGroup = pygame.sprite.Group()
         self.eggGroup = pygame.sprite.Group()
 
-        self.pointManager = PointManager()
+        # Used by the collision pass to find the enemies near each enemy (see SpatialHash.py)
+        self.enemyCells = SpatialHash()
+
+        # Moves the enemies of a stress wave all at once (see Physics.py). None in every other wave
+        self.physics = None
+
+        # Eggs, birds, jousters, enemies, and point displays are reused instead of created
+        # for every kill (see Misc.Pool). Get them with create() and hand them back with recycle()
+        self.pools = {cls: Pool(cls) for cls in (EBJ, Egg, Bird, Jouster, Bounder, Hunter, ShadowLord, PointDisplay)}
+
+        self.pointManager = PointManager(self.pools[PointDisplay])
 
         Plat9 = listOfPlatforms[8]
         self.mainDisplay = MainDisplay((Plat9.rect.left + 106, Plat9.rect.top + 15))
@@ -183,6 +263,36 @@ class Env:
 
         self.wave = 1
 
+        # Where the input comes from (see Input.py) and the keys currently held down
+        if (inputSource is None):
+            inputSource = KeyboardInput()
+        self.input = inputSource
+        self.keys = Keys()
+
+        self.rendering = render # Draw each frame
+
+        # Only redraw and present the parts of the screen that changed (see DirtyRects.py).
+        # None redraws the whole screen every frame
+        self.dirty = DirtyRects(Screen) if dirtyRects else None
+        self.backgroundSurf = None # The platforms and lava (see background())
+        self.backgroundKey = None
+        self.hud = None # Points and mounts on the HUD, and the rect they were drawn over
+        self.hudRect = None
+        self.fps = fps # Frame rate cap. 0 runs as fast as possible
+        self.headless = headless # No menus. The game ends instead of showing the game over screen
+
+        # The simulation runs at a fixed tick rate. Headless runs simulate one tick per frame
+        self.timestep = FixedTimestep(timeScale=timeScale, lockstep=headless)
+        self.interpolate = interpolate # Draw moving objects between their last two positions
+
+        self.frames = 0 # Number of frames played
+
+        # Times each phase of a frame and logs hitches. Disabled unless one is passed in
+        if (timer is None):
+            timer = createFrameTimer()
+        self.timer = timer
+        self.timer.reset()
+
     def updatePlatforms(self, indices):
         # Update active platforms
         temp = []
@@ -190,6 +300,7 @@ class Env:
             temp.append(self.platformList[index])
 
         self.activePlatforms = temp
+        self.platformGroup = PlatformGroup(temp)
         return None
 
     def get(self):
@@ -197,15 +308,32 @@ class Env:
         values = self.screen, self.clock, self.player, self.enemyGroup, self.eggGroup, self.pointManager, self.mainDisplay
         return values
 
+    def create(self, cls, *args):
+        # New instance of one of the pooled classes, reused if possible
+        return self.pools[cls].get(*args)
+
+    def recycle(self, instance):
+        # Hand an instance that is no longer used back to its pool. An EBJ's egg, bird, and jouster go with it.
+        # Anything that isn't pooled (e.g. the BounderViews of a stress wave) is left alone
+        pool = self.pools.get(type(instance))
+        if (pool is None):
+            return None
+        if (isinstance(instance, EBJ)):
+            for part in (instance.egg, instance.bird, instance.jouster):
+                if (part is not None):
+                    self.recycle(part)
+        pool.release(instance)
+        return None
+
     def addEnemy(self, eType, position):
         # Add an enemy of a particular type
         temp = None
         if eType == 2:
-            temp = ShadowLord(position)
+            temp = self.create(ShadowLord, position)
         elif eType == 1:
-            temp = Hunter(position)
+            temp = self.create(Hunter, position)
         else:
-            temp = Bounder(position)
+            temp = self.create(Bounder, position)
 
         if temp is not None:
             self.enemyGroup.add(temp)
@@ -219,17 +347,95 @@ class Env:
                 loc.append(plat.spawnPos)
         return loc
 
-    def render(self):
-        # Render each of the platforms and lava
-        self.screen.fill(self.lava.color, self.lava.rect)
+    def poll(self):
+        # Read the input for the current frame and return it as a bitmask
+        mask = self.input.poll()
+        self.keys.mask = mask
+        self.timer.mark("input")
+        return mask
+
+    def savePositions(self):
+        # Remember where every moving object was before the current tick. Used for interpolation
+        self.player.previous = self.player.rect.topleft
+        for enemy in self.enemyGroup:
+            enemy.previous = enemy.rect.topleft
+        for ebj in self.eggGroup:
+            for item in ebj.renderList:
+                item.previous = item.rect.topleft
+        return None
 
-        for plat in self.activePlatforms:
-            self.screen.blit(plat.surf, plat.rect)
+    def present(self):
+        # Display the current frame and wait for the next one
+        self.timer.mark("render")
+        if (self.rendering):
+            if (self.dirty is None):
+                self.timer.drawOverlay(self.screen)
+                pygame.display.update()
+            else:
+                self.timer.drawOverlay(self.dirty)
+                self.dirty.present()
+        self.timer.mark("present")
+        self.clock.tick(self.fps)
+        self.timer.mark("wait")
+        self.frames += 1
+        self.timer.endFrame(self.counts)
+        Stats.stats.endFrame()
+        Sampler.sampler.nextFrame()
+        return None
+
+    def counts(self):
+        # Number of entities on screen. Logged with hitches
+        return {"wave": self.wave, "enemies": len(self.enemyGroup), "eggs": len(self.eggGroup),
+                "points": len(self.pointManager.pointDisplays)}
+
+    def render(self):
+        # Render the platforms and lava in one go from the background, then the HUD and point displays
+        self.screen.blit(self.background(), (0, 0))
+        Stats.count(Stats.BLIT)
 
         self.mainDisplay.render(self.screen)
 
         self.pointManager.render(self.screen)
 
+    def background(self):
+        """ The platforms and lava on a black screen. Drawn again only when the platforms
+            change or the lava rises
+        """
+        key = (self.platformGroup, self.lava.rect.top)
+        if (self.backgroundKey is None or key[0] is not self.backgroundKey[0] or key[1] != self.backgroundKey[1]):
+            if (self.backgroundSurf is None):
+                self.backgroundSurf = pygame.Surface(self.screen.get_size(), 0, self.screen)
+            self.backgroundSurf.fill(BLACK)
+            self.backgroundSurf.fill(self.lava.color, self.lava.rect)
+            for plat in self.activePlatforms:
+                self.backgroundSurf.blit(plat.surf, plat.rect)
+            Stats.count(Stats.BLIT, len(self.activePlatforms))
+            self.backgroundKey = key
+            if (self.dirty is not None):
+                self.dirty.invalidate()
+        return self.backgroundSurf
+
+    def canvas(self):
+        # What the moving objects are drawn on: the screen, or the dirty rects that draw on it
+        return self.screen if self.dirty is None else self.dirty
+
+    def renderDirty(self):
+        # Same as render() for dirty rect rendering. The moving objects are drawn with self.dirty afterwards
+        dirty = self.dirty
+        dirty.begin(self.background())
+
+        # The HUD stays on screen until the points or mounts change or something moves over it
+        hud = (self.mainDisplay.points, self.mainDisplay.remainingMounts)
+        if (hud != self.hud or dirty.damaged(self.hudRect)):
+            if (self.hudRect is not None):
+                dirty.erase(self.hudRect)
+            self.hudRect = self.mainDisplay.render(self.screen)
+            dirty.update(self.hudRect)
+            self.hud = hud
+
+        self.pointManager.render(dirty)
+        return None
+
     def update(self):
         # Update the env
 
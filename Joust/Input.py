@@ -0,0 +1,192 @@
+""" Input sources for Joust
+
+    The wave loops read one frame of input at a time from an input source. The input
+    for a frame is a bitmask of the actions below, so the same loops can be driven by
+    the keyboard, by a script, or by nothing at all (headless runs).
+
+    Since every agent uses the global random module, a run can be reproduced exactly
+    from its seed, starting wave, and the input mask of every frame. Recordings store
+    exactly that (see saveRecording() and loadRecording()).
+"""
+import pygame
+import struct
+import sys
+import time
+import zlib
+
+from Misc import *
+
+# Input bits
+LEFT = 1
+RIGHT = 2
+FLAP = 4
+ESCAPE = 8
+
+class Keys:
+    """ Stands in for pygame.key.get_pressed() so the player can be moved by any input source """
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        if (key == K_LEFT):
+            return (self.mask & LEFT) != 0
+        if (key == K_RIGHT):
+            return (self.mask & RIGHT) != 0
+        return False
+
+class KeyboardInput:
+    # Reads input from the keyboard
+    def poll(self):
+        mask = 0
+        for ev in pygame.event.get():
+            if ev.type == KEYDOWN:
+                if (ev.key == K_SPACE):
+                    mask |= FLAP
+                if (ev.key == K_ESCAPE):
+                    mask |= ESCAPE
+            if ev.type == QUIT:
+                pygame.quit()
+                sys.exit()
+
+        pressed = pygame.key.get_pressed()
+        if (pressed[K_LEFT]):
+            mask |= LEFT
+        if (pressed[K_RIGHT]):
+            mask |= RIGHT
+        return mask
+
+def quitRequested():
+    """ Read the pending window events and return whether one of them asks to quit. SDL
+        also turns SIGINT and SIGTERM into a QUIT event, so input sources that don't read
+        the keyboard still have to call this for the game to stop when it is told to
+    """
+    if (not pygame.display.get_init()):
+        return False
+    return any(ev.type == QUIT for ev in pygame.event.get())
+
+class NullInput:
+    # No input at all. The player just stands there until the game is told to quit
+    def __init__(self):
+        self.quit = False
+
+    def poll(self):
+        if (self.quit or quitRequested()):
+            self.quit = True
+            return ESCAPE
+        return 0
+
+class ScriptedInput:
+    """ Plays back a list of input masks, one per frame. Once the script runs out
+        no more input is given. Quits early if the game is told to quit.
+    """
+    def __init__(self, frames, endWithEscape=False):
+        self.frames = frames
+        self.index = 0
+        self.endWithEscape = endWithEscape # Quit the game when the script runs out
+        self.quit = False
+
+    def poll(self):
+        if (self.quit or quitRequested()):
+            self.quit = True
+            return ESCAPE
+        if (self.index >= len(self.frames)):
+            if (self.endWithEscape):
+                return ESCAPE
+            return 0
+        mask = self.frames[self.index]
+        self.index += 1
+        return mask
+
+def loadScript(path, endWithEscape=False):
+    """ Load an input script. Each line holds an input mask and optionally the number of
+        frames to repeat it for, e.g. "2 60" holds right for one second. Blank lines and
+        lines starting with '#' are ignored. With endWithEscape the game quits once the
+        script runs out.
+    """
+    frames = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#")[0].split()
+            if (len(line) == 0):
+                continue
+            count = int(line[1]) if len(line) > 1 else 1
+            frames.extend([int(line[0])] * count)
+    return ScriptedInput(frames, endWithEscape)
+
+class LimitedInput:
+    """ Passes through the input from another source until a number of frames or seconds
+        have passed, then keeps sending escape so the game ends. The seconds are counted
+        from the first frame
+    """
+    def __init__(self, source, frames=None, seconds=None):
+        self.source = source
+        self.frames = frames
+        self.seconds = seconds
+        self.polled = 0
+        self.deadline = None
+
+    def poll(self):
+        if (self.polled == 0 and self.seconds is not None):
+            self.deadline = time.perf_counter() + self.seconds
+        self.polled += 1
+        if (self.frames is not None and self.polled > self.frames):
+            return ESCAPE
+        if (self.deadline is not None and time.perf_counter() >= self.deadline):
+            return ESCAPE
+        return self.source.poll()
+
+class RecordingInput:
+    # Passes through the input from another source and records the mask of every frame
+    def __init__(self, source, path=None, seed=None, startWave=1, stress=0):
+        self.source = source
+        self.frames = bytearray()
+        # Where the recording is saved (see save())
+        self.path = path
+        self.seed = seed
+        self.startWave = startWave
+        self.stress = stress
+        self.saved = False
+
+    def poll(self):
+        mask = self.source.poll()
+        self.frames.append(mask)
+        return mask
+
+    def save(self):
+        # Save the recording to its file. Only the first call writes it, so it can be saved both when the game ends and at exit
+        if (self.saved or self.path is None):
+            return None
+        saveRecording(self.path, self.seed, self.startWave, self.stress, self.frames)
+        self.saved = True
+        return None
+
+# Recording file: header (magic, version, seed, starting wave, stress wave size, number of frames)
+# followed by one zlib compressed byte per frame
+RECORDING_MAGIC = b"JSTR"
+RECORDING_VERSION = 2
+RECORDING_HEADER = struct.Struct("<4sHQHII")
+
+def saveRecording(path, seed, startWave, stress, frames):
+    # Save a recorded run. 'stress' is the --stress wave size, 0 for normal waves
+    with open(path, "wb") as f:
+        f.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, seed, startWave, stress, len(frames)))
+        f.write(zlib.compress(bytes(frames), 9))
+    return None
+
+def loadRecording(path):
+    """ Load a run saved by saveRecording(). Returns the seed, the starting wave, the stress
+        wave size, and an input source that replays the recorded input and then quits
+    """
+    with open(path, "rb") as f:
+        header = f.read(RECORDING_HEADER.size)
+        data = f.read()
+    if (len(header) != RECORDING_HEADER.size):
+        raise ValueError(f"{path} is not a Joust recording")
+    magic, version, seed, startWave, stress, count = RECORDING_HEADER.unpack(header)
+    if (magic != RECORDING_MAGIC or version != RECORDING_VERSION):
+        raise ValueError(f"{path} is not a Joust recording (or was made by a different version)")
+
+    frames = zlib.decompress(data)
+    if (len(frames) != count):
+        raise ValueError(f"{path} is truncated")
+    return seed, startWave, stress, ScriptedInput(frames, endWithEscape=True)
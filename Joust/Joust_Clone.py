@@ -6,22 +6,201 @@
         - Lava Troll
         - Enemy walking animation
         - More waves
+
+    Run with --headless to simulate the game without a window, menus, or frame cap:
+        python Joust_Clone.py --headless --seed 7 --wave 1 --waves 5
+    Use --help to see all of the options. --frames and --max-seconds end a run early,
+    and so does Ctrl+C (or SIGTERM) in a headless run.
+
+    Stress waves fill the screen with Bounders to see how the game copes with hundreds of
+    enemies, e.g.
+        python Joust_Clone.py --headless --stress 300 --waves 1
+
+    A run can be recorded with --record and played back exactly with --replay, e.g.
+        python Joust_Clone.py --record run.jst
+        python Joust_Clone.py --headless --replay run.jst
 """
 
+import argparse
+import atexit
+import os
+import random
+import signal
+import time
+
 from Waves import *
 from Menus import *
 from Misc import *
-from Environment import Platform
+from Environment import Platform, createFrameTimer
+from Animation import loadClips
+from Input import KeyboardInput, NullInput, loadScript, LimitedInput, RecordingInput, loadRecording
+
+# ============================================================== Options ==============================================================
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Joust")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window, menus, or frame cap")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument("--wave", type=int, default=1, help="wave to start on (1-21)")
+    parser.add_argument("--waves", type=int, default=None, help="number of waves to play")
+    parser.add_argument("--frames", type=int, default=None, metavar="N",
+                        help="end the game after N frames of input")
+    parser.add_argument("--max-seconds", dest="maxSeconds", type=float, default=None, metavar="S",
+                        help="end the game after S seconds")
+    parser.add_argument("--stress", type=int, default=0, metavar="N",
+                        help="make every wave a stress wave of N Bounders. Large ones are moved all at once by the physics core (needs NumPy)")
+    parser.add_argument("--no-render", dest="render", action="store_false",
+                        help="don't draw anything (headless only)")
+    parser.add_argument("--script", default=None,
+                        help="play an input script instead of reading the keyboard (see Input.loadScript)")
+    parser.add_argument("--fps", type=int, default=None,
+                        help=f"frame rate cap, 0 for uncapped (default: {FPS}, uncapped when headless)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="simulation speed relative to real time, e.g. 0.5 for half speed")
+    parser.add_argument("--full-redraw", dest="dirtyRects", action="store_false",
+                        help="redraw and present the whole screen every frame instead of only what changed")
+    parser.add_argument("--interpolate", action="store_true",
+                        help="draw moving objects between simulation ticks")
+    parser.add_argument("--timings", action="store_true",
+                        help="time each phase of every frame, log hitches to stderr, and print percentiles at exit")
+    parser.add_argument("--overlay", action="store_true", help="draw the frame timings on screen (implies --timings)")
+    parser.add_argument("--hitch", type=float, default=1000 / TICK_RATE, metavar="MS",
+                        help=f"log frames that spend more than MS milliseconds working (default: {1000 / TICK_RATE:.1f})")
+    parser.add_argument("--stats", action="store_true",
+                        help="count expensive operations (image loads, blits, collision tests, ...) and print them per wave at exit")
+    Sampler.addArguments(parser)
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="record the seed and the input of every frame to FILE")
+    parser.add_argument("--replay", default=None, metavar="FILE",
+                        help="play back a run recorded with --record (sets the seed, starting wave, and --stress)")
+    args = parser.parse_args()
+
+    if (args.wave < 1 or args.wave > 21):
+        parser.error("--wave must be between 1 and 21")
+    if (args.stress < 0):
+        parser.error("--stress can't be negative")
+    if (args.speed <= 0):
+        parser.error("--speed must be greater than 0")
+    if (args.frames is not None and args.frames <= 0):
+        parser.error("--frames must be greater than 0")
+    if (args.maxSeconds is not None and args.maxSeconds <= 0):
+        parser.error("--max-seconds must be greater than 0")
+    if (args.replay is not None and (args.script is not None or args.record is not None)):
+        parser.error("--replay can't be combined with --script or --record")
+    return args
+
+def getInputSource(args, default):
+    """ Build the input source for the game from the options. Replays also set the seed,
+        starting wave, and stress wave size, and recordings are saved when the program exits. --frames and
+        --max-seconds end the game by sending escape, which is recorded like any other input.
+    """
+    if (args.replay is not None):
+        args.seed, args.wave, args.stress, inputSource = loadRecording(args.replay)
+        random.seed(args.seed)
+        return limitInput(args, inputSource)
+
+    inputSource = default
+    if (args.script is not None):
+        # A recording is only saved once the game ends, so a script being recorded ends the game when it runs out
+        inputSource = loadScript(args.script, endWithEscape=args.record is not None)
+    inputSource = limitInput(args, inputSource)
+
+    if (args.record is not None):
+        if (args.seed is None): # A recording is useless without the seed
+            args.seed = random.randrange(2**32)
+        random.seed(args.seed)
+        inputSource = RecordingInput(inputSource, args.record, args.seed, args.wave, args.stress)
+        # Saved when the game ends (see saveInput()). The game can also exit from several places
+        # (menus, window close), so it is saved at exit as well
+        atexit.register(inputSource.save)
+    return inputSource
+
+def saveInput(inputSource):
+    # Save the recording when the recorded game ends
+    if (isinstance(inputSource, RecordingInput)):
+        inputSource.save()
+    return None
 
-pygame.init()
+def limitInput(args, inputSource):
+    # Wrap an input source so the game ends after --frames or --max-seconds
+    if (args.frames is None and args.maxSeconds is None):
+        return inputSource
+    return LimitedInput(inputSource, args.frames, args.maxSeconds)
 
-# ============================================================== Main Menu ==============================================================   
+def getFrameTimer(args):
+    # Frame timer for the options. The percentiles are printed when the program exits
+    timer = createFrameTimer(args.timings or args.overlay, args.overlay, args.hitch / 1000)
+    if (timer.enabled):
+        atexit.register(lambda: print(timer.summary()))
+    return timer
+
+# ============================================================== Headless ==============================================================
+
+def runHeadless(args):
+    # Play the requested waves without a window or menus and report how fast they ran
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    loadImages()
+    loadClips()
+
+    inputSource = getInputSource(args, NullInput())
+    fps = args.fps if args.fps is not None else 0
+    timer = getFrameTimer(args)
+
+    start = time.perf_counter()
+    env = gameLoop(screen, pygame.time.Clock(), args.wave, args.waves, inputSource, args.render, fps, True,
+                   timer=timer, stress=args.stress, dirtyRects=args.dirtyRects)
+    saveInput(inputSource)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    result = "Game over" if env.player.lives < 0 else "Finished"
+    print(f"{result} on wave {env.wave}: {env.frames} frames in {elapsed:.2f}s "
+          f"({env.frames / elapsed:.0f} frames/s), score {env.player.points}")
+    return None
+
+# ============================================================== Main Menu ==============================================================
 
 def main():
+    args = parseArgs()
+    if (args.seed is not None):
+        random.seed(args.seed)
+    if (args.stats):
+        Stats.enable()
+        atexit.register(lambda: print(Stats.stats.report()))
+    Sampler.startFromOptions(args.profile, args.profileRange)
+
+    if (args.headless):
+        # The dummy drivers have to be selected before pygame is initialized
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        # Let SDL turn Ctrl+C into a QUIT event, like SIGTERM, so the run ends with its summary
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        pygame.init()
+        runHeadless(args)
+        pygame.quit()
+        return
+
+    pygame.init()
     screen = pygame.display.set_mode(SCREEN_SIZE)
+    loadImages() # Images can only be converted after the display mode is set
+    loadClips()
     clock = pygame.time.Clock()
 
-    main_menu(screen, clock, gameLoop)
+    inputSource = getInputSource(args, KeyboardInput())
+    fps = args.fps if args.fps is not None else FPS
+    timer = getFrameTimer(args)
+    gamesStarted = []
+
+    def startGame(screen, clock):
+        # Scripts, recordings and replays only cover the first game. Later games from the menu use the keyboard
+        source = inputSource if len(gamesStarted) == 0 else KeyboardInput()
+        gamesStarted.append(True)
+        env = gameLoop(screen, clock, args.wave, args.waves, source, True, fps, False,
+                       args.speed, args.interpolate, timer, args.stress, args.dirtyRects)
+        saveInput(source)
+        return env
+
+    main_menu(screen, clock, startGame)
     return
 
 if __name__ == "__main__":
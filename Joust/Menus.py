@@ -9,8 +9,8 @@ def main_menu(screen, clock, startGameFunction):
     # This function displays the main menu
     screen.fill(BLACK)
 
-    title_font = pygame.font.SysFont("Corbel", 48)
-    title_text = title_font.render("Joust", False, WHITE)
+    title_font = getFont("Corbel", 48)
+    title_text = renderText(title_font, "Joust", WHITE)
     title_rect = title_text.get_rect(center=(SCREEN_SIZE[0] //2 , SCREEN_SIZE[1] //2))
 
     counter = 1
@@ -39,12 +39,12 @@ def gameOver(screen, clock, score, startGameFunction):
     # This function displays the game over menu
     screen.fill(BLACK)
 
-    title_font = pygame.font.SysFont("Corbel", 48)
-    title_text = title_font.render("NICE JOUSTING!", False, WHITE)
+    title_font = getFont("Corbel", 48)
+    title_text = renderText(title_font, "NICE JOUSTING!", WHITE)
     title_rect = title_text.get_rect(center=(SCREEN_SIZE[0] //2 , SCREEN_SIZE[1] //2 - 50))
 
-    score_font = pygame.font.SysFont("Corbel", 48)
-    score_text = score_font.render(f"SCORE: {score}", False, WHITE)
+    score_font = getFont("Corbel", 48)
+    score_text = renderText(score_font, f"SCORE: {score}", WHITE)
     score_rect = score_text.get_rect(center=(SCREEN_SIZE[0] //2 , SCREEN_SIZE[1] //2 + 50))
     
     while True:
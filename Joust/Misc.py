@@ -6,6 +6,22 @@ SCREEN_SIZE = (600,600)
 # Framerate for game
 FPS = 60
 
+# Rate that the simulation runs at (ticks per second). All movement and timers in the
+# game are measured in ticks, independent of how often the screen is drawn
+TICK_RATE = 60
+
+import os
+import sys
+
+import pygame
+
+# Every Joust module imports Misc, so this is where Common/ (one level up) becomes importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from Common import Atlas, Sampler, Stats
+from Common.Text import getFont, renderText, drawNumber
+from Common.Vector import Vector2
+
 # Pygame constants
 from pygame.locals import (
     RLEACCEL,
@@ -75,6 +91,78 @@ BLUE_JOUSTER = "Art/Shadow_Lord_J.png"
 # Mount icon
 MOUNT_ICON = "Art/MountIcon.png"
 
+# Every image used by the game. These are loaded once by loadImages()
+ALL_IMAGES = ([PLATFORM1, PLATFORM23, PLATFORM4, PLATFORM5, PLATFORM6, PLATFORM7, PLATFORM8,
+               PLAYER_IDLE_GROUND, PLAYER_IDLE_AIR, PLAYER_FLAP, PLAYER_SLIDE] + PLAYER_RESPAWN + PLAYER_WALK +
+              [EGG, BIRD_IDLE_G, BIRD_IDLE_A, BIRD_FLAP,
+               BOUNDER_IDLE_A, BOUNDER_IDLE_G, BOUNDER_FLAP, RED_JOUSTER,
+               HUNTER_IDLE_A, HUNTER_IDLE_G, HUNTER_FLAP, GREY_JOUSTER,
+               SHADOWLORD_IDLE_A, SHADOWLORD_IDLE_G, SHADOWLORD_FLAP, BLUE_JOUSTER,
+               MOUNT_ICON])
+
+# Images that are drawn without a colorkey. Everything else uses WHITE as the colorkey
+NO_COLORKEY = [RED_JOUSTER, GREY_JOUSTER, BLUE_JOUSTER]
+
+def getColorkey(path):
+    # Colorkey of an image, or None
+    return None if path in NO_COLORKEY else WHITE
+
+# Cache of converted images. Filled by loadImages() after pygame.display.set_mode() is called
+imageCache = {}
+
+def loadImage(path):
+    # Load a single image from disk and convert it to the display format
+    surf = pygame.image.load(path).convert()
+    colorkey = getColorkey(path)
+    if (colorkey is not None):
+        surf.set_colorkey(colorkey, RLEACCEL)
+    imageCache[path] = surf
+    return surf
+
+def loadImages():
+    # Load every image used by the game into the image cache. Images are cut from the
+    # packed atlas when one has been built (see Common/Atlas.py)
+    atlas = Atlas.load({path: getColorkey(path) for path in ALL_IMAGES}, "Art")
+    for path in ALL_IMAGES:
+        if (atlas is not None and path in atlas):
+            imageCache[path] = atlas[path]
+        else:
+            loadImage(path)
+    return None
+
+def getImage(path):
+    """ Retrieve a converted image from the image cache. The returned surface is shared
+        between every object that uses it, so it must never be drawn on. 
+    """
+    surf = imageCache.get(path)
+    if (surf is None): # Image was not preloaded
+        surf = loadImage(path)
+    return surf
+
+class Pool:
+    """ Instances of a class that are no longer in use, kept so they can be reused instead of
+        created again. The class sets up what never changes in __init__() and everything else
+        in reset(), which takes the same arguments as the constructor. A reused instance is
+        reset exactly like a new one is created (drawing the same random numbers), so reusing
+        an instance never changes how the game plays
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+
+    def get(self, *args):
+        # A reset instance if there is one, otherwise a new one
+        if (len(self.free) > 0):
+            instance = self.free.pop()
+            instance.reset(*args)
+            return instance
+        return self.cls(*args)
+
+    def release(self, instance):
+        # The instance must not be used again until get() hands it out
+        self.free.append(instance)
+        return None
+
 # enemy spawns per wave. 0 = bounder, 1 = hunter, 2 = shadow lord
 waveSpawns = [[0, 0, 0],               # Wave 1
               [0, 0, 0, 0],            # Wave 2
@@ -134,60 +222,3 @@ platforms = [[0, 1, 2, 3, 4, 5, 6, 7, 8], # Wave 1
              [3, 5, 6, 8],                # Wave 29
              [0, 1, 2, 3, 4, 5, 6, 8]     # Wave 25
             ]
-
-# 2 dimensional vector class 
-class Vector2:
-    def __init__(self, x=0, y=0):
-        self.x = x
-        self.y = y
-
-        self.vector = [x, y]
-
-        sqrMag = ((self.x**2) + (self.y**2))
-        self.magnitude = sqrMag**(1/2)
-
-    def __add__(self, other):
-        x = self.x + other.x
-        y = self.y + other.y
-        return Vector2(x, y)
-
-    def __sub__(self, other):
-        return Vector2(self.x - other.x, self.y - other.y)
-
-    def __mul__(self, other):
-        if (isinstance(other, int)):
-            x = self.x * other
-            y = self.y * other
-            return Vector2(x, y)
-        elif (isinstance(other, float)):
-            x = self.x * other
-            y = self.y * other
-            return Vector2(x, y)
-        elif (isinstance(other, self.__class__)):
-            print("dot product")
-        return 
-
-    def getMagnitude(self):
-        sqrMag = ((self.x**2) + (self.y**2))
-        return sqrMag**(1/2)
-
-    def normalize(self):
-        self.magnitude = self.getMagnitude()
-        if (self.magnitude != 0):
-            invmag = 1 / self.magnitude
-        else:
-            invmag = 1
-        self.x = self.x * invmag
-        self.y = self.y * invmag
-        return self.__mul__(invmag)
-
-    def dot(self, v):
-        return (self.x * v.x) + (self.y * v.y)
-
-    def __str__(self):
-        return "({}, {})".format(self.x, self.y)
-
-    def update(self, x, y):
-        self.x = x
-        self.y = y
-        return None
@@ -0,0 +1,288 @@
+""" Struct-of-arrays physics core for crowds of Bounders
+
+    Every actor normally moves itself: flapping, gravity, screen wrap, and platform checks
+    all run in Python, one object at a time. That is fine for a dozen enemies, but not for
+    the hundreds in a stress wave. PhysicsCore keeps the state of its Bounders in NumPy
+    arrays (one row each) and does all of that for every row at once.
+
+    The Bounders themselves are BounderViews. They keep a rect and a velocity like any
+    other enemy, so the collision pass, the eggs, and the rendering work on them
+    unchanged. The rows are what gets simulated: step() moves every row and copies the
+    results out to the views, and the collision pass hands the few views it moves back
+    to the core with pull(). A view's own update() only animates it.
+
+    Below about a hundred Bounders the fixed cost of the NumPy calls is more than the core
+    saves, so smaller stress waves use plain Bounders instead (see PHYSICS_BOUNDERS in Waves.py).
+
+    The core follows the same rules as Bounder.update(), but it is only statistically
+    equivalent to it, not identical. New flap chances come from the core's own NumPy
+    generator, which is seeded from random, so seeded stress waves still repeat. The
+    actors draw random numbers in a different order. A view animates after its platform
+    collisions instead of before them. A seeded stress wave therefore plays out
+    differently from the same Bounders moving themselves.
+
+    NumPy is only needed when a stress wave is played (see stressWave() in Waves.py).
+"""
+
+import random
+from operator import itemgetter
+
+import numpy as np
+import pygame
+
+from Misc import *
+from Agents import Bounder, GRAVITY
+from Environment import GROUND_PROBE
+
+# Number of rows the core has room for before it has to grow
+CAPACITY = 256
+
+# Enemies' hitboxes are this much taller on the ground than in the air (see Enemy.groundCheck())
+GROUND_HEIGHT = 12
+
+class GroundTable:
+    """ The columns of a PlatformGeometry as arrays, so the ground under many objects can be
+        found at once. Row x holds the tops and bottoms of the surfaces covering column x,
+        in platform order, padded with surfaces that can never be touched
+    """
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.left = geometry.left
+        depth = max(len(column) for column in geometry.columns)
+        self.tops = np.full((len(geometry.columns), depth), np.iinfo(np.int64).max, np.int64)
+        self.bottoms = np.full((len(geometry.columns), depth), np.iinfo(np.int64).min, np.int64)
+        for x, column in enumerate(geometry.columns):
+            for i, (top, bottom, rect) in enumerate(column):
+                self.tops[x, i] = top
+                self.bottoms[x, i] = bottom
+        # Bounds of every platform, for the side collisions
+        self.platformLeft = np.array([rect.left for rect in geometry.rects])
+        self.platformTop = np.array([rect.top for rect in geometry.rects])
+        self.platformRight = np.array([rect.right for rect in geometry.rects])
+        self.platformBottom = np.array([rect.bottom for rect in geometry.rects])
+
+    def groundUnder(self, x, y):
+        """ Vectorized PlatformGeometry.groundUnder(). Returns whether each probe found the
+            ground, and the top of the ground it found
+        """
+        column = x - self.left
+        inside = (column >= 0) & (column < len(self.tops))
+        column = np.where(inside, column, 0)
+        tops = self.tops[column]
+        hits = (tops < (y + GROUND_PROBE)[:, None]) & (self.bottoms[column] > y[:, None]) & inside[:, None]
+        first = hits.argmax(axis=1)
+        return hits.any(axis=1), tops[np.arange(len(column)), first]
+
+class PhysicsCore:
+    def __init__(self, capacity=CAPACITY):
+        self.table = None # GroundTable for the platforms of the last step
+        self.random = np.random.default_rng(random.getrandbits(32)) # Seeded from the game's generator
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # (Re)create empty arrays
+        self.left = np.zeros(capacity, np.int64)
+        self.top = np.zeros(capacity, np.int64)
+        self.width = np.zeros(capacity, np.int64)
+        self.height = np.zeros(capacity, np.int64)
+        self.vx = np.zeros(capacity, np.float64)
+        self.vy = np.zeros(capacity, np.float64)
+        self.grounded = np.zeros(capacity, np.bool_)
+        self.flapCounter = np.zeros(capacity, np.int64)
+        self.flapChance = np.ones(capacity, np.int64)
+        self.targetY = np.zeros(capacity, np.int64)
+        self.active = np.zeros(capacity, np.bool_)
+        self.actors = [None] * capacity # The view for each row
+        self.free = list(range(capacity - 1, -1, -1)) # Unused rows. The lowest is used first
+
+    def grow(self):
+        # Double the capacity, keeping every row where it is
+        capacity = len(self.active)
+        for name in ["left", "top", "width", "height", "vx", "vy", "grounded", "flapCounter", "flapChance",
+                     "targetY", "active"]:
+            old = getattr(self, name)
+            new = np.zeros(capacity * 2, old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        self.actors += [None] * capacity
+        self.free = list(range(capacity * 2 - 1, capacity - 1, -1)) + self.free
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def add(self, actor):
+        # Give an actor a row, starting from its current state. Returns the row
+        if (len(self.free) == 0):
+            self.grow()
+        row = self.free.pop()
+        self.left[row] = actor.rect.left
+        self.top[row] = actor.rect.top
+        self.width[row] = actor.rect.width
+        self.height[row] = actor.rect.height
+        self.vx[row] = actor.velocity.x
+        self.vy[row] = actor.velocity.y
+        self.grounded[row] = actor.grounded
+        self.flapCounter[row] = actor.flapCounter
+        self.flapChance[row] = actor.flapChance
+        self.targetY[row] = actor.target.y
+        self.active[row] = True
+        self.actors[row] = actor
+        return row
+
+    def remove(self, row):
+        if (self.active[row]):
+            self.active[row] = False
+            self.actors[row] = None
+            self.free.append(row)
+
+    def pull(self, actors):
+        """ Copy the rects and velocities of actors that were moved between steps (by the
+            collision pass) into their rows. Actors that aren't live views of this core are skipped
+        """
+        for actor in actors:
+            if (not isinstance(actor, BounderView) or actor.core is not self or not self.active[actor.row]):
+                continue
+            row = actor.row
+            self.left[row] = actor.rect.left
+            self.top[row] = actor.rect.top
+            self.vx[row] = actor.velocity.x
+            self.vy[row] = actor.velocity.y
+        return None
+
+    def step(self, geometry):
+        """ One tick for every actor: flap, gravity, movement, screen wrap, the sides and tops
+            of the platforms, and the ground. The rules of Bounder.update() without the
+            animation (see the top of this file for how the results differ)
+        """
+        rows = np.flatnonzero(self.active)
+        if (len(rows) == 0):
+            return None
+        actors = itemgetter(*rows.tolist())(self.actors) if len(rows) > 1 else [self.actors[rows[0]]]
+        if (self.table is None or self.table.geometry is not geometry):
+            self.table = GroundTable(geometry)
+
+        left = self.left[rows]
+        top = self.top[rows]
+        startVx = self.vx[rows]
+        vx = startVx.copy()
+        vy = self.vy[rows]
+        width = self.width[rows]
+        height = self.height[rows]
+        grounded = self.grounded[rows]
+        flapCounter = self.flapCounter[rows]
+        flapChance = self.flapChance[rows]
+
+        # Flap (see Enemy.flap())
+        vy[top + height // 2 > SCREEN_SIZE[1] - 50] = 0
+        flapped = (flapCounter == 0) & (top + height // 2 > self.targetY[rows])
+        top[flapped] -= 1
+        vy[flapped] -= 0.72
+        flapChance[flapped] = self.random.integers(8, 17, np.count_nonzero(flapped))
+        flapCounter = (flapCounter + 1) % flapChance
+
+        # Gravity and movement. Rect.move_ip() drops the fractions of a pixel
+        vy[~grounded] += GRAVITY
+        left += np.trunc(vx).astype(np.int64)
+        top += np.trunc(vy).astype(np.int64)
+
+        # Screen wrap
+        left[left + width < 0] = SCREEN_SIZE[0]
+        left[left > SCREEN_SIZE[0]] = -width[left > SCREEN_SIZE[0]]
+
+        # Sides of the platforms (see physicsObject.collidePlatform()). Few actors touch a platform
+        # on any tick, so the ones that do are resolved one at a time
+        rects = geometry.rects
+        table = self.table
+        Stats.count(Stats.COLLIDE, len(rects))
+        touching = ((left[:, None] < table.platformRight) & ((left + width)[:, None] > table.platformLeft)
+                    & (top[:, None] < table.platformBottom) & ((top + height)[:, None] > table.platformTop))
+        for i in np.flatnonzero(touching.any(axis=1)).tolist():
+            rect = pygame.Rect(int(left[i]), int(top[i]), int(width[i]), int(height[i]))
+            for platform, (leftline, rightline, bottomline) in zip(rects, geometry.edges):
+                Stats.count(Stats.COLLIDE)
+                if (not rect.colliderect(platform)):
+                    continue
+                Stats.count(Stats.COLLIDE, 3)
+                magnitude = abs(vx[i]) / 3
+                offset = random.randint(1, 4)
+                if (leftline.colliderect(rect)):
+                    vx[i] = -magnitude - offset
+                    vy[i] = 0
+                    rect.right = platform.left
+                elif (rightline.colliderect(rect)):
+                    vx[i] = magnitude + offset
+                    vy[i] = 0
+                    rect.left = platform.right
+                elif (bottomline.colliderect(rect)):
+                    vy[i] = 1
+                    rect.top = platform.bottom
+            left[i] = rect.left
+            top[i] = rect.top
+
+        # Bounce off the top of the screen
+        bounced = top <= 0
+        vy[bounced] = np.abs(vy[bounced]) / 3 + 1
+        top[bounced] = 0
+
+        # Ground (see Enemy.groundCheck()). The hitbox grows when landing and shrinks when taking off
+        Stats.count(Stats.COLLIDE)
+        probe = top + height + np.where(grounded, 0, GROUND_HEIGHT)
+        found, ground = self.table.groundUnder(left + width // 2, probe)
+        landing = found & ~grounded
+        leaving = ~found & grounded
+        height[landing] += GROUND_HEIGHT
+        height[leaving] -= GROUND_HEIGHT
+        vy[found] = 0
+        sunk = found & (top + height >= ground)
+        top[sunk] = ground[sunk] - 1 - height[sunk]
+        grounded = found
+
+        self.left[rows] = left
+        self.top[rows] = top
+        self.height[rows] = height
+        self.vx[rows] = vx
+        self.vy[rows] = vy
+        self.grounded[rows] = grounded
+        self.flapCounter[rows] = flapCounter
+        self.flapChance[rows] = flapChance
+
+        # Hand the results back to the views. Only a few actors change direction or land on a tick
+        for actor, x, y, w, h, dy in zip(actors, left.tolist(), top.tolist(), width.tolist(), height.tolist(),
+                                         vy.tolist()):
+            actor.rect.update(x, y, w, h)
+            actor.velocity.y = dy
+        for i in np.flatnonzero(vx != startVx).tolist():
+            actors[i].velocity.x = float(vx[i])
+        for i in np.flatnonzero(landing | leaving).tolist():
+            actors[i].grounded = bool(grounded[i])
+        for i in np.flatnonzero(flapped).tolist():
+            actors[i].flapped(int(flapChance[i]))
+        return None
+
+class BounderView(Bounder):
+    """ A Bounder moved by a PhysicsCore instead of by itself. Its rect, velocity, and
+        grounded flag are copies of its row, refreshed on every step. Whatever moves it
+        between steps has to hand it back with PhysicsCore.pull()
+    """
+    def __init__(self, position, core):
+        super(BounderView, self).__init__(position)
+        self.core = core
+        self.row = core.add(self)
+
+    def die(self, eggs=None):
+        # Give the row back to the core
+        self.core.remove(self.row)
+        return super(BounderView, self).die(eggs)
+
+    def flapped(self, flapChance):
+        # The core made the bounder flap on this tick (see Enemy.flap())
+        self.state = 2
+        self.animator.play(self.clips["flap"])
+        self.surf = self.animator.frame(self.facing == -1)
+        self.counter = 0
+        self.flapChance = flapChance
+
+    def update(self, platforms, player):
+        # Already moved by PhysicsCore.step(). Only the animation is left, which runs after the collisions
+        self.animate()
+        return None
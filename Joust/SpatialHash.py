@@ -0,0 +1,116 @@
+""" Uniform grid spatial hash for the collisions between the moving objects
+
+    The screen is split into square cells and every object is stored in each cell its
+    rect overlaps. Two objects can only collide if they share a cell, so a collision
+    pass only tests the objects found in the cells around a rect instead of every object.
+    Building the hash costs more than a few rect tests per object, so it only pays off
+    once there are dozens of objects.
+
+    Objects wrap around the sides of the screen (see the __move__ methods in Agents.py),
+    so for a tick they can hang off either edge. Columns are taken modulo the number of
+    columns across the screen and rows are clamped to the screen, which keeps the grid a
+    fixed size. An object past an edge lands in the cells at the other side of the screen
+    as well, which only adds candidates: colliderect() still decides what touches.
+"""
+
+from bisect import insort
+
+from Misc import *
+
+# Width and height of a cell in pixels. About the size of an enemy
+CELL_SIZE = 50
+
+class SpatialHash:
+    def __init__(self, cellSize=CELL_SIZE, size=SCREEN_SIZE):
+        self.cellSize = cellSize
+        self.columns = -(-size[0] // cellSize)
+        self.rows = -(-size[1] // cellSize)
+        # Each cell is a list of (order, object), sorted by the order the objects were inserted in
+        self.cells = [[] for i in range(self.columns * self.rows)]
+        self.locations = {} # Object -> (order, indices of the cells it is in)
+        self.inserted = 0
+
+    def clear(self):
+        # Remove everything. Used to rebuild the hash each tick
+        for order, indices in self.locations.values():
+            for index in indices:
+                self.cells[index].clear()
+        self.locations.clear()
+        self.inserted = 0
+        return None
+
+    def cellsFor(self, rect):
+        # Indices of the cells a rect overlaps
+        size = self.cellSize
+        left = rect.left // size
+        right = (rect.right - 1) // size
+        top = rect.top // size
+        bottom = (rect.bottom - 1) // size
+        if (left >= 0 and right < self.columns and top >= 0 and bottom < self.rows):
+            if (left == right and top == bottom): # Most objects are smaller than a cell
+                return (top * self.columns + left,)
+            columns = range(left, right + 1)
+        else:
+            if (rect.width <= 0 or rect.height <= 0):
+                return ()
+            if (right - left + 1 >= self.columns):
+                columns = range(self.columns)
+            else:
+                columns = [column % self.columns for column in range(left, right + 1)]
+            top = min(max(top, 0), self.rows - 1)
+            bottom = min(max(bottom, 0), self.rows - 1)
+        return tuple(row * self.columns + column for row in range(top, bottom + 1) for column in columns)
+
+    def insert(self, obj, rect):
+        # Add an object at 'rect'. Objects are queried back in the order they were inserted
+        entry = (self.inserted, obj)
+        indices = self.cellsFor(rect)
+        for index in indices:
+            self.cells[index].append(entry)
+        self.locations[obj] = (self.inserted, indices)
+        self.inserted += 1
+        return None
+
+    def remove(self, obj):
+        if (obj not in self.locations):
+            return None
+        order, indices = self.locations.pop(obj)
+        for index in indices:
+            self.cells[index].remove((order, obj))
+        return None
+
+    def move(self, obj, rect):
+        """ Update the cells of an object whose rect has changed. It keeps its place in the
+            order. Returns True if it changed cells
+        """
+        order, old = self.locations[obj]
+        indices = self.cellsFor(rect)
+        if (indices == old):
+            return False
+        entry = (order, obj)
+        for index in old:
+            self.cells[index].remove(entry)
+        for index in indices:
+            insort(self.cells[index], entry)
+        self.locations[obj] = (order, indices)
+        return True
+
+    def orderOf(self, obj):
+        # Position an object was inserted in, or None if it isn't in the hash
+        if (obj not in self.locations):
+            return None
+        return self.locations[obj][0]
+
+    def query(self, rect, after=-1):
+        """ Objects sharing a cell with 'rect', in the order they were inserted.
+            after=N skips the objects inserted at or before position N
+        """
+        indices = self.cellsFor(rect)
+        if (len(indices) == 1):
+            entries = self.cells[indices[0]]
+        else:
+            found = set()
+            for index in indices:
+                found.update(self.cells[index])
+            entries = sorted(found)
+        return [obj for order, obj in entries if order > after]
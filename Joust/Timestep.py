@@ -0,0 +1,60 @@
+""" Fixed timestep for the Joust game loop
+
+    The simulation always advances in ticks of the same length (1 / TICK_RATE seconds),
+    no matter how long each rendered frame takes. Every frame the loop asks ticks() how
+    many ticks to simulate to catch up with real time, then renders once. If the game
+    falls too far behind, the extra time is dropped instead of simulating more and more
+    ticks every frame (which would only make it fall further behind).
+"""
+import time
+
+from Misc import *
+
+# Most ticks that will be simulated in a single frame
+MAX_TICKS_PER_FRAME = 5
+
+class FixedTimestep:
+    def __init__(self, tickRate=TICK_RATE, maxTicks=MAX_TICKS_PER_FRAME, timeScale=1.0, lockstep=False):
+        self.tickTime = 1 / tickRate
+        self.maxTicks = maxTicks
+        self.timeScale = timeScale # > 1 runs the simulation faster than real time, < 1 slower
+        self.lockstep = lockstep # Simulate exactly one tick per frame (used for headless runs)
+
+        self.accumulator = 0 # Time that has passed but has not been simulated yet
+        self.last = None
+        self.alpha = 0 # How far (0 - 1) real time is between the last tick and the next one
+
+        self.ticksRun = 0 # Total number of ticks simulated
+
+    def reset(self):
+        # Forget any time that has passed. Used after pauses, menus, and wave transitions
+        self.last = None
+        self.accumulator = 0
+        self.alpha = 0
+        return None
+
+    def ticks(self):
+        # Return the number of ticks that need to be simulated this frame
+        if (self.lockstep): # Every frame is drawn right on a tick, so interpolation draws the current positions
+            self.alpha = 1
+            self.ticksRun += 1
+            return 1
+
+        now = time.perf_counter()
+        if (self.last is None): # First frame: simulate a single tick
+            elapsed = self.tickTime
+        else:
+            elapsed = (now - self.last) * self.timeScale
+        self.last = now
+
+        self.accumulator += elapsed
+        ticks = int(self.accumulator // self.tickTime)
+        if (ticks > self.maxTicks): # Too far behind. Drop the time we can't catch up on
+            ticks = self.maxTicks
+            self.accumulator = 0
+        else:
+            self.accumulator -= ticks * self.tickTime
+
+        self.alpha = self.accumulator / self.tickTime
+        self.ticksRun += ticks
+        return ticks
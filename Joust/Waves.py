@@ -7,10 +7,18 @@ import sys
 from Environment import Env, PointManager, PointDisplay, Platform
 from Menus import main_menu, gameOver
 
-from Agents import Player, EBJ
+from Agents import Player, Bounder, EBJ, Egg, drawPosition
+from Input import FLAP, ESCAPE
 
 from Misc import *
 
+# Enemy collisions use a spatial hash from this many enemies on. With fewer, testing every pair is cheaper
+SPATIAL_HASH_ENEMIES = 48
+
+# Stress waves of this many Bounders or more are moved by a physics core (see Physics.py). Smaller ones
+# move themselves, which is cheaper: the joust.Bounder.update and joust.PhysicsCore.step benchmarks break even at about 90
+PHYSICS_BOUNDERS = 128
+
 def killAllEnemies(env):
     for e in env.enemyGroup:
         env.enemyGroup.remove(e)
@@ -32,17 +40,31 @@ def getRandomLocationOnPlatform(platform):
 
 
 def collision(env, platformGroup):
-    """ This function is responsible for handling collisions between all moving game objects
+    """ This function is responsible for handling collisions between all moving game objects.
+        In crowded waves the enemies are put in a spatial hash (see SpatialHash.py) so each
+        enemy is only tested against the enemies near it
     """
     screen, clock, player, enemies, eggGroup, pointManager, mainDisplay = env.get()
 
+    useCells = len(enemies) >= SPATIAL_HASH_ENEMIES
+    enemyCells = env.enemyCells
+    enemyCells.clear()
+    if (useCells):
+        for e in enemies:
+            enemyCells.insert(e, e.rect)
+
     # Check enemy collisions
+    tests = 0
+    moved = [] # Enemies moved or turned around here. Handed back to the physics core of a stress wave
     for e1 in enemies:
         if (e1.alive == 1): # If enemy is alive
             if (player.state != 5): # If player in not invincible (respawning)
+                tests += 1
                 if e1.rect.colliderect(player.rect): # Enemy collision with player
-                    dist = Vector2(e1.rect.centerx - player.rect.centerx, e1.rect.centery - player.rect.centery) * (1/12)
-                    
+                    dist = Vector2(e1.rect.centerx - player.rect.centerx, e1.rect.centery - player.rect.centery)
+                    dist *= (1/12)
+                    moved.append(e1)
+
                     if (dist.y < 0): # Enemy is above player
                         e1.velocity.y = dist.y
                         e1.velocity.x *= -1
@@ -50,31 +72,43 @@ def collision(env, platformGroup):
                         pointManager.reset()
                         
                     elif (dist.y > 0): # Player is above enemy
-                        player.velocity = dist * -1
+                        player.velocity.update(-1 * dist.x, -1 * dist.y)
                         if (e1.type == 0):
                             player.points += 500
                         elif (e1.type == 1):
                             player.points += 750
                         elif (e1.type == 2):
                             player.points += 1500
-                        e1.die()
-                        newEgg = EBJ(e1.rect.center, e1.velocity, e1.type, platformGroup)
+                        env.recycle(e1.die(env.pools[Egg])) # The EBJ has an egg of its own
+                        newEgg = env.create(EBJ, e1.rect.center, e1.velocity, e1.type, platformGroup, env.pools)
                         eggGroup.add(newEgg)
                         enemies.remove(e1)
+                        if (useCells):
+                            enemyCells.remove(e1)
+                        env.recycle(e1)
                         
                     else: # Enemy and Player are at the same height
-                        e1.velocity = dist
-                        e1.velocity.x *= 1.5
-                        player.velocity = dist * -1
-            # Check collisions between other enemies
-            for e2 in enemies:
+                        e1.velocity.update(dist.x * 1.5, dist.y)
+                        player.velocity.update(-1 * e1.velocity.x, -1 * e1.velocity.y)
+            # Check collisions between other enemies. Only the enemies sharing a cell with e1 can touch it
+            if (useCells):
+                others = enemyCells.query(e1.rect)
+            else:
+                others = enemies.sprites()
+            i = 0
+            while (i < len(others)):
+                e2 = others[i]
+                i += 1
                 if (e2 != e1):
+                    tests += 1
                     if (e1.rect.colliderect(e2.rect)):
-                        dist = Vector2(e1.rect.centerx - e2.rect.centerx, e1.rect.centery - e2.rect.centery)
+                        moved.append(e1)
+                        moved.append(e2)
+                        dx = e1.rect.centerx - e2.rect.centerx # Only the horizontal distance is needed
                         if e1.velocity.x * e2.velocity.x > 0: # If enemies are moving in the same direction
                             if e1.velocity.x > 0: # Both enemies moving to the right
                                 # Left most enemy will change direction
-                                if dist.x > 0:
+                                if dx > 0:
                                     e2.rect.right = e1.rect.left - 1
                                     e1.rect.left = e2.rect.right + 1
                                     e2.velocity.x *= -1
@@ -84,7 +118,7 @@ def collision(env, platformGroup):
                                     e1.velocity.x *= -1
                             else: # Both enemies moving to the left
                                 # Right most enemy will change direction
-                                if dist.x > 0:
+                                if dx > 0:
                                     e2.rect.right = e1.rect.left - 1
                                     e1.rect.left = e2.rect.right + 1
                                     e1.velocity.x *= -1
@@ -94,7 +128,7 @@ def collision(env, platformGroup):
                                     e2.velocity.x *= -1
                         else: # Head on collision
                             # Both enemies change direction
-                            if dist.x > 0:
+                            if dx > 0:
                                 e2.rect.right = e1.rect.left - 1
                                 e1.rect.left = e2.rect.right + 1
                             else:
@@ -104,9 +138,20 @@ def collision(env, platformGroup):
                             e2.velocity.x *= -1
                         e2.velocity.y = 0
                         e1.velocity.y = 0
-                        pass
+
+                        # Both enemies moved. If e1 changed cells it may now touch enemies it
+                        # couldn't before, so look again at the enemies that come after e2
+                        if (useCells):
+                            enemyCells.move(e2, e2.rect)
+                            if (e1.alive == 1 and enemyCells.move(e1, e1.rect)):
+                                others = enemyCells.query(e1.rect, after=enemyCells.orderOf(e2))
+                                i = 0
+    Stats.count(Stats.COLLIDE, tests)
+    if (env.physics is not None):
+        env.physics.pull(moved)
 
     # Check egg collisions
+    Stats.count(Stats.COLLIDE, 2 * len(eggGroup) + 1)
     for e in eggGroup:
         if e.egg.rect.colliderect(player.rect): # Egg collision with player
             # award player points
@@ -119,12 +164,13 @@ def collision(env, platformGroup):
             player.points += pointsToAdd
             points = pointManager.pointsPerEgg
             displayPosition = (e.egg.rect.centerx, e.egg.rect.top)
-            d = PointDisplay((displayPosition), points, bonus)
+            d = env.create(PointDisplay, (displayPosition), points, bonus)
             pointManager.add(d)
             e.destroy()
 
         if (e.egg.rect.colliderect(env.lava.rect)): # Egg collision with lava
             eggGroup.remove(e)
+            env.recycle(e)
 
     # Player collision with lava
     if (player.rect.colliderect(env.lava.rect)):
@@ -140,24 +186,39 @@ def renderFrame(env, platformGroup):
     """
     screen, clock, player, enemyGroup, eggGroup, pointManager, mainDisplay = env.get()
 
-    env.render()
+    if (not env.rendering):
+        return None
+
+    # With interpolation, moving objects are drawn between where they were on the last two ticks
+    alpha = env.timestep.alpha if env.interpolate else None
+
+    if (env.dirty is None):
+        env.render()
+    else: # Only the parts of the screen that changed are drawn (see DirtyRects.py)
+        env.renderDirty()
+    canvas = env.canvas()
 
     for egg in eggGroup: # Render Egg/Birds/Jousters
-            egg.render(screen)
+            egg.render(canvas, alpha)
 
     for enemy in enemyGroup: # Render enemies
-            screen.blit(enemy.surf, enemy.rect)
+            canvas.blit(enemy.surf, drawPosition(enemy, alpha))
 
-    screen.blit(player.surf, player.rect) # Render the player
+    canvas.blit(player.surf, drawPosition(player, alpha)) # Render the player
+    Stats.count(Stats.BLIT, len(enemyGroup) + 1)
     return None
 
 def updateFrame(env, platformGroup, pressedKeys):
     """ This function is used to update all of the game objects during the current frame. 
     """
     screen, clock, player, enemyGroup, eggGroup, pointManager, mainDisplay = env.get()
+    env.savePositions()
+
     player.update(pressedKeys, platformGroup) # Update the player
 
     if player.lives < 0:
+        if (env.headless): # No game over screen, just end the game
+            return -1
         gameOver(screen, clock, player.points, gameLoop)
 
     for egg in eggGroup: # Update each Egg/Bird/Jouster
@@ -166,16 +227,23 @@ def updateFrame(env, platformGroup, pressedKeys):
             enemy = egg.spawn()
             enemyGroup.add(enemy)
             eggGroup.remove(egg)
+            env.recycle(egg)
 
         elif (retVal == 2):
             eggGroup.remove(egg)
+            env.recycle(egg)
 
+    if (env.physics is not None): # Move the enemies of a stress wave all at once
+        env.physics.step(platformGroup.geometry)
     for e in enemyGroup: # Update each enemy
         e.update(platformGroup, player)
+    env.timer.mark("update")
 
     collision(env, platformGroup) # Collisions between player and enemies
+    env.timer.mark("collision")
 
     env.update()
+    env.timer.mark("update")
     return None
 
 def displayCurrentWave(env, wave):
@@ -185,15 +253,13 @@ def displayCurrentWave(env, wave):
     # Displays current wave for 3 seconds
     screen, clock, player, enemyGroup, eggGroup, pointManager, mainDisplay = env.get()
 
-    platformGroup = pygame.sprite.Group()
-    for plat in env.activePlatforms:
-        platformGroup.add(plat)
+    platformGroup = env.platformGroup
 
     timer = 0
-    threeSeconds = FPS * 3
+    threeSeconds = TICK_RATE * 3
 
-    display_font = pygame.font.SysFont("Courier New", 24, bold=False)
-    current_wave_text = display_font.render(f"WAVE {wave}", False, WHITE)
+    display_font = getFont("Courier New", 24, bold=False)
+    current_wave_text = renderText(display_font, f"WAVE {wave}", WHITE)
     current_wave_rect = current_wave_text.get_rect(center=((SCREEN_SIZE[0] //2) - 20, (SCREEN_SIZE[1] //2) - 70))
 
     bonus_string1 = ""
@@ -213,47 +279,47 @@ def displayCurrentWave(env, wave):
             bonus_string1 = "PREPARE TO JOUST"
             bonus_string2 = "BUZZARD BAIT!"
     
-    bonus_text1 = display_font.render(bonus_string1, False, WHITE)
+    bonus_text1 = renderText(display_font, bonus_string1, WHITE)
     bonus_rect1 = bonus_text1.get_rect(center=((SCREEN_SIZE[0] //2) - 20, (SCREEN_SIZE[1] //2) - 30))
 
-    bonus_text2 = display_font.render(bonus_string2, False, WHITE)
+    bonus_text2 = renderText(display_font, bonus_string2, WHITE)
     bonus_rect2 = bonus_text2.get_rect(center=((SCREEN_SIZE[0] //2) - 20, (SCREEN_SIZE[1] //2) + 10))
 
+    env.timestep.reset() # Don't try to catch up on the time spent between waves
+    env.timer.mark("wave") # Time spent setting up the wave counts as part of the first frame
     while True:
-        screen.fill(BLACK)
-
-        if (timer >= threeSeconds):
-            return None
+        for tick in range(env.timestep.ticks()):
+            if (timer >= threeSeconds):
+                return None
 
-        screen.blit(current_wave_text, current_wave_rect)
-        screen.blit(bonus_text1, bonus_rect1)
-        screen.blit(bonus_text2, bonus_rect2)
+            # Input handling below this line
+            inputs = env.poll()
+            if (inputs & FLAP):
+                player.flap()
+            if (inputs & ESCAPE):
+                return -1
 
-        # Input handling below this line
-        for ev in pygame.event.get():
-            if ev.type == KEYDOWN:
-                if (ev.key == K_SPACE):
-                    player.flap()
-                if (ev.key == K_ESCAPE):
-                    return -1
-            if ev.type == QUIT:
-                pygame.quit()
-                sys.exit()
+            pressed = env.keys # Store player inputs
 
-        pressed = pygame.key.get_pressed() # Store player inputs
+            # Updates below this line
+            env.savePositions()
+            player.update(pressed, platformGroup) # Update the player
 
-        # Updates below this line
-        player.update(pressed, platformGroup) # Update the player
+            pointManager.update()
+            mainDisplay.update(player.points, player.lives)
 
-        pointManager.update()
-        mainDisplay.update(player.points, player.lives)
+            timer += 1
+        env.timer.mark("update")
 
         renderFrame(env, platformGroup)
-        
-        pygame.display.update()
-        clock.tick(FPS)
+        if (env.rendering):
+            canvas = env.canvas()
+            canvas.blit(current_wave_text, current_wave_rect)
+            canvas.blit(bonus_text1, bonus_rect1)
+            canvas.blit(bonus_text2, bonus_rect2)
+            Stats.count(Stats.BLIT, 3)
 
-        timer += 1
+        env.present()
 
 def genericWave(env, wave):
     """ The genericWave() function specifies the behavior of the game loop for any
@@ -269,9 +335,7 @@ def genericWave(env, wave):
     displayCurrentWave(env, wave)
 
     env.updatePlatforms(platforms[wave - 1])
-    platformGroup = pygame.sprite.Group()
-    for plat in env.activePlatforms:
-        platformGroup.add(plat)
+    platformGroup = env.platformGroup
 
     spawn_locations = env.getSpawnLocations()
     numSpawns = len(spawn_locations) - 1
@@ -285,46 +349,42 @@ def genericWave(env, wave):
     numberOfEnemies = len(enemySpawns)
     numSpawned = 0
 
-    counter = FPS
+    counter = TICK_RATE
 
+    env.timer.mark("wave")
     while True:
-        env.screen.fill(BLACK)
-
-        # Input handling below this line
-        for ev in pygame.event.get():
-            if ev.type == KEYDOWN:
-                if (ev.key == K_SPACE):
-                    player.flap()
-                if (ev.key == K_ESCAPE):
-                    return -1
-            if ev.type == QUIT:
-                pygame.quit()
-                sys.exit()
-
-        pressed = pygame.key.get_pressed() # Store player inputs
-
-        if (numSpawned < numberOfEnemies):
-            counter += 1
-            if (counter > (FPS * 3)):
-                # Spawn enemy
-                eType = enemySpawns[numSpawned]
-                spawnPos = spawn_locations[random.randint(0, numSpawns)]
-                env.addEnemy(eType, spawnPos)
-                numSpawned += 1
-                counter = 0
-        else:
-            # If no more enemies/eggs then the wave is over and we exit this function
-            if (len(eggGroup) + len(enemyGroup) == 0):
-                return 0
-
-        # Updates go below this line
-        updateFrame(env, platformGroup, pressed)
+        for tick in range(env.timestep.ticks()):
+            # Input handling below this line
+            inputs = env.poll()
+            if (inputs & FLAP):
+                player.flap()
+            if (inputs & ESCAPE):
+                return -1
+
+            pressed = env.keys # Store player inputs
+
+            if (numSpawned < numberOfEnemies):
+                counter += 1
+                if (counter > (TICK_RATE * 3)):
+                    # Spawn enemy
+                    eType = enemySpawns[numSpawned]
+                    spawnPos = spawn_locations[random.randint(0, numSpawns)]
+                    env.addEnemy(eType, spawnPos)
+                    numSpawned += 1
+                    counter = 0
+            else:
+                # If no more enemies/eggs then the wave is over and we exit this function
+                if (len(eggGroup) + len(enemyGroup) == 0):
+                    return 0
+
+            # Updates go below this line
+            if (updateFrame(env, platformGroup, pressed) == -1):
+                return -1
 
         # Rendering goes below this line
         renderFrame(env, platformGroup)
 
-        pygame.display.update()
-        env.clock.tick(FPS)
+        env.present()
     return None
 
 
@@ -342,9 +402,7 @@ def survivalWave(env, wave):
     displayCurrentWave(env, wave)
 
     env.updatePlatforms(platforms[wave - 1])
-    platformGroup = pygame.sprite.Group()
-    for plat in env.activePlatforms:
-        platformGroup.add(plat)
+    platformGroup = env.platformGroup
 
     spawn_locations = env.getSpawnLocations()
     numSpawns = len(spawn_locations) - 1
@@ -357,53 +415,49 @@ def survivalWave(env, wave):
     numberOfEnemies = len(enemySpawns)
     numSpawned = 0
 
-    counter = FPS
+    counter = TICK_RATE
 
     playerLostMount = False
     playerStartingLives = player.lives
+    env.timer.mark("wave")
     while True:
-        screen.fill(BLACK)
-
-        # Input handling below this line
-        for ev in pygame.event.get():
-            if ev.type == KEYDOWN:
-                if (ev.key == K_SPACE):
-                    player.flap()
-                if (ev.key == K_ESCAPE):
-                    return -1
-            if ev.type == QUIT:
-                pygame.quit()
-                sys.exit()
-
-        pressed = pygame.key.get_pressed() # Store player inputs
-
-        if (numSpawned < numberOfEnemies):
-            counter += 1
-            if (counter > (FPS * 3)):
-                # Spawn enemy
-                eType = enemySpawns[numSpawned]
-                spawnPos = spawn_locations[random.randint(0, numSpawns)]
-                env.addEnemy(eType, spawnPos)
-                numSpawned += 1
-                counter = 0
-        else:
-            # If no more enemies/eggs then the wave is over and we exit this function
-            if (len(eggGroup) + len(enemyGroup) == 0):
-                if playerLostMount == False:
-                    player.points += 3000
-                return 0
-
-        # Updates go below this line
-        updateFrame(env, platformGroup, pressed)
-
-        if player.lives < playerStartingLives:
-            playerLostMount = True
+        for tick in range(env.timestep.ticks()):
+            # Input handling below this line
+            inputs = env.poll()
+            if (inputs & FLAP):
+                player.flap()
+            if (inputs & ESCAPE):
+                return -1
+
+            pressed = env.keys # Store player inputs
+
+            if (numSpawned < numberOfEnemies):
+                counter += 1
+                if (counter > (TICK_RATE * 3)):
+                    # Spawn enemy
+                    eType = enemySpawns[numSpawned]
+                    spawnPos = spawn_locations[random.randint(0, numSpawns)]
+                    env.addEnemy(eType, spawnPos)
+                    numSpawned += 1
+                    counter = 0
+            else:
+                # If no more enemies/eggs then the wave is over and we exit this function
+                if (len(eggGroup) + len(enemyGroup) == 0):
+                    if playerLostMount == False:
+                        player.points += 3000
+                    return 0
+
+            # Updates go below this line
+            if (updateFrame(env, platformGroup, pressed) == -1):
+                return -1
+
+            if player.lives < playerStartingLives:
+                playerLostMount = True
 
         # Rendering goes below this line
         renderFrame(env, platformGroup)
 
-        pygame.display.update()
-        clock.tick(FPS)
+        env.present()
     return None
 
 
@@ -422,9 +476,7 @@ def eggWave(env, wave):
     displayCurrentWave(env, wave)
 
     env.updatePlatforms(platforms[wave - 1])
-    platformGroup = pygame.sprite.Group()
-    for plat in env.activePlatforms:
-        platformGroup.add(plat)
+    platformGroup = env.platformGroup
 
     spawn_locations = env.getSpawnLocations()
     numSpawns = len(spawn_locations) - 1
@@ -435,50 +487,97 @@ def eggWave(env, wave):
         loc = random.randint(0, 7)
         xpos, ypos = getRandomLocationOnPlatform(env.activePlatforms[loc])
         
-        e = EBJ((xpos, ypos), Vector2(), 0, platformGroup)
+        e = env.create(EBJ, (xpos, ypos), Vector2(), 0, platformGroup, env.pools)
         while (e.collideAny(eggGroup)): # This loop makes sure none of the eggs are on top of each other
+            env.recycle(e)
             loc = random.randint(0, 7)
             xpos, ypos = getRandomLocationOnPlatform(env.activePlatforms[loc])
-            e = EBJ((xpos, ypos), Vector2(), 0, platformGroup)
+            e = env.create(EBJ, (xpos, ypos), Vector2(), 0, platformGroup, env.pools)
         eggGroup.add(e)
 
+    env.timer.mark("wave")
     while True:
-        screen.fill(BLACK)
-
-        # Input handling below this line
-        for ev in pygame.event.get():
-            if ev.type == KEYDOWN:
-                if (ev.key == K_SPACE):
-                    player.flap()
-                if (ev.key == K_ESCAPE):
-                    return -1
-            if ev.type == QUIT:
-                pygame.quit()
-                sys.exit()
-
-        pressed = pygame.key.get_pressed() # Store player inputs
-
-        # Updates go below this line
-        # If no more enemies/eggs then the wave is over and we exit this function
-        if (len(eggGroup) + len(enemyGroup) == 0):
-            return 0
+        for tick in range(env.timestep.ticks()):
+            # Input handling below this line
+            inputs = env.poll()
+            if (inputs & FLAP):
+                player.flap()
+            if (inputs & ESCAPE):
+                return -1
+
+            pressed = env.keys # Store player inputs
+
+            # Updates go below this line
+            # If no more enemies/eggs then the wave is over and we exit this function
+            if (len(eggGroup) + len(enemyGroup) == 0):
+                return 0
         
-        updateFrame(env, platformGroup, pressed)
+            if (updateFrame(env, platformGroup, pressed) == -1):
+                return -1
 
         # Rendering goes below this line
         renderFrame(env, platformGroup)
 
-        pygame.display.update()
-        clock.tick(FPS)
+        env.present()
 
 
-def gameLoop(screen, clock):
-    """ This function manages the structure of the game by calling the appropriate
-        function for each wave. gameLoop() iterates through the different types
-        of waves until either the player has died, or the wave limit has been reached. 
+def stressWave(env, wave, count):
+    """ The stressWave() function specifies the behavior of the game loop for a
+        stress wave (see --stress in Joust_Clone.py).
+
+        A stress wave starts with 'count' Bounders spread over the screen. From
+        PHYSICS_BOUNDERS on they are moved by a physics core that simulates all of them at
+        once (see Physics.py) instead of one at a time, so there can be thousands of them.
+        The wave ends like a generic wave, when all of the enemy jousters have been
+        unseated with their eggs destroyed.
     """
-    screen.fill(BLACK) # Clear the previous screen display
+    screen, clock, player, enemyGroup, eggGroup, pointManager, mainDisplay = env.get()
+    pointManager.reset()
+
+    displayCurrentWave(env, wave)
+
+    env.updatePlatforms(platforms[wave - 1])
+    platformGroup = env.platformGroup
+
+    env.physics = None # The core of the previous stress wave is dropped
+    if (count >= PHYSICS_BOUNDERS):
+        from Physics import PhysicsCore, BounderView # NumPy is only needed for large stress waves
+        env.physics = PhysicsCore()
+    for i in range(count):
+        position = (random.randint(0, SCREEN_SIZE[0]), random.randint(30, 420))
+        if (env.physics is None):
+            enemyGroup.add(Bounder(position))
+        else:
+            enemyGroup.add(BounderView(position, env.physics))
+
+    env.timer.mark("wave")
+    while True:
+        for tick in range(env.timestep.ticks()):
+            # Input handling below this line
+            inputs = env.poll()
+            if (inputs & FLAP):
+                player.flap()
+            if (inputs & ESCAPE):
+                return -1
+
+            pressed = env.keys # Store player inputs
+
+            # Updates go below this line
+            # If no more enemies/eggs then the wave is over and we exit this function
+            if (len(eggGroup) + len(enemyGroup) == 0):
+                return 0
+
+            if (updateFrame(env, platformGroup, pressed) == -1):
+                return -1
+
+        # Rendering goes below this line
+        renderFrame(env, platformGroup)
+
+        env.present()
 
+
+def createPlatforms():
+    # Create the platforms for the level. Returns a list of all of the platforms
     Plat1 = Platform((SCREEN_SIZE[0] // 2 - 40, 200), (160, 8), PLATFORM1) # Top middle plat
     Plat2 = Platform((SCREEN_SIZE[0] - 20, 190), (110, 8), PLATFORM23) # Top right plat
     Plat3 = Platform((-40, 190), (80, 8), PLATFORM23) # Top left plat
@@ -495,13 +594,33 @@ def gameLoop(screen, clock):
     Plat4.setSpawn((25, 304))
     Plat1.setSpawn((234, 175))
 
-    listOfPlatforms = [Plat1, Plat2, Plat3, Plat4, Plat5, Plat6, Plat7, Plat8, Plat9]
+    return [Plat1, Plat2, Plat3, Plat4, Plat5, Plat6, Plat7, Plat8, Plat9]
+
+def gameLoop(screen, clock, startWave=1, numWaves=None, inputSource=None, render=True, fps=FPS, headless=False,
+             timeScale=1.0, interpolate=False, timer=None, stress=0, dirtyRects=True):
+    """ This function manages the structure of the game by calling the appropriate
+        function for each wave. gameLoop() iterates through the different types
+        of waves until either the player has died, or the wave limit has been reached. 
+
+        The optional arguments come from the command line (see Joust_Clone.py): the wave to
+        start on, how many waves to play, where the input comes from, whether to draw
+        anything, the frame rate cap, whether to skip the menus, how fast the simulation
+        runs relative to real time, whether to interpolate drawing, the frame timer
+        (see Environment.createFrameTimer()), the number of Bounders in each wave when
+        every wave is a stress wave (0 plays the normal waves), and whether to only redraw
+        the parts of the screen that changed (see DirtyRects.py). Returns the Env.
+    """
+    screen.fill(BLACK) # Clear the previous screen display
+
+    listOfPlatforms = createPlatforms()
 
     player = Player() # Create player
 
-    env = Env(listOfPlatforms, player, screen, clock)
+    env = Env(listOfPlatforms, player, screen, clock, inputSource, render, fps, headless, timeScale, interpolate, timer,
+              dirtyRects)
     
-    wave = 1
+    wave = startWave
+    wavesPlayed = 0
     
     # Survival waves: 2, 7, 12, 17...
     # Egg waves: 5, 10, 15, 20...
@@ -509,24 +628,31 @@ def gameLoop(screen, clock):
     # Normal wave: Anything in between
     while True:
         env.wave = wave
-        if (wave % 5 == 0):
+        Sampler.sampler.setWave(wave)
+        result = 0
+        if (stress > 0):
+            # Stress wave
+            result = stressWave(env, wave, stress)
+        elif (wave % 5 == 0):
             # Egg wave
-            if (eggWave(env, wave) == -1):
-                return None
+            result = eggWave(env, wave)
         elif ((wave - 2) % 5 == 0):
             # survival wave
-            if survivalWave(env, wave) == -1:
-                return None
+            result = survivalWave(env, wave)
         elif ((wave > 7) and(wave - 3) % 5 == 0):
             # pteradactyl wave
             pass
         else:
             # generic wave
-            if genericWave(env, wave) == -1:
-                return None
+            result = genericWave(env, wave)
 
-        if (wave > 20):
-            return None
+        Stats.stats.endWave(f"wave {wave}") # Operation counts are rolled up per wave
+        if (result == -1):
+            return env
+
+        wavesPlayed += 1
+        if (wave > 20 or wavesPlayed == numWaves):
+            return env
         wave += 1
 
-    return None
+    return env
@@ -1,11 +1,24 @@
 """ Simple pong clone
 
+    Run with --stats to count expensive operations (blits, collision tests, Rects, ...)
+    and print them per point when the game exits, or with --profile FILE to sample the
+    game for a flamegraph (see Common/Sampler.py). Points count as waves.
 """
 
+import argparse
+import atexit
+import os
 import pygame
 import sys
 import random
 
+# Pong is a single script; Common/ sits next to its directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from Common import Sampler, Stats
+from Common.Text import getFont, drawNumber
+from Common.Vector import Vector2 as vector2 # Vector2 class to make some calculations easier/more readable
+
 from pygame.locals import (
     K_UP,
     K_DOWN,
@@ -31,67 +44,6 @@ AISCORE = pygame.event.custom_type() # AI score event
 UPDATESPEED = pygame.event.custom_type() # Update ball speed event
 pygame.time.set_timer(UPDATESPEED, 3000)
 
-# Vector2 class to make some calculations easier/more readable
-class vector2:
-    def __init__(self, x=0, y=0):
-        self.x = x
-        self.y = y
-
-        self.vector = [x, y]
-
-        sqrMag = ((self.x**2) + (self.y**2))
-        self.magnitude = sqrMag**(1/2)
-        return
-
-    def __add__(self, other):
-        x = self.x + other.x
-        y = self.y + other.y
-        return (x, y)
-
-    def __sub__(self, other):
-        return vector2(self.x - other.x, self.y - other.y)
-
-    def __mul__(self, other):
-        if (isinstance(other, int)):
-            x = self.x * other
-            y = self.y * other
-            return vector2(x, y)
-        elif (isinstance(other, float)):
-            x = self.x * other
-            y = self.y * other
-            return vector2(x, y)
-        elif (isinstance(other, self.__class__)):
-            print("dot product")
-        return 
-
-    def getMagnitude(self):
-        sqrMag = ((self.x**2) + (self.y**2))
-        return sqrMag**(1/2)
-
-    def normalize(self):
-        self.magnitude = self.getMagnitude()
-        if (self.magnitude != 0):
-            invmag = 1 / self.magnitude
-        else:
-            invmag = 1
-        self.x = self.x * invmag
-        self.y = self.y * invmag
-        return self.__mul__(invmag)
-
-    def __str__(self):
-        return "({}, {})".format(self.x, self.y)
-
-    def update(self, x, y):
-        self.x = x
-        self.y = y
-        self.vector = [x, y]
-
-    def set(self, new):
-        self.x = new.x
-        self.y = new.y
-        return None
-
-
 class ball:
     def __init__(self):
         self.surf = pygame.Surface((10, 10))
@@ -108,7 +60,7 @@ class ball:
         # Update velocity based on speed
         magnitude = self.velocity.getMagnitude()
         coefficient = self.speed / magnitude
-        self.velocity = self.velocity * coefficient
+        self.velocity *= coefficient
         self.rect.move_ip(self.velocity.x, self.velocity.y)
 
         # Check for collision with top wall
@@ -190,7 +142,7 @@ class AI:
 # Background class manages the dashed lines and score displays
 class background:
     def __init__(self):
-        self.font = pygame.font.SysFont("Corbel", 75)
+        self.font = getFont("Corbel", 75)
 
         self.playerscore = 0
         self.AIscore = 0
@@ -202,20 +154,23 @@ class background:
             self.rectangles.append(pygame.Rect(SCREEN_SIZE[0] //2, y, 1, 12))
             y += 20
 
-    def update(self, board):
-        # Update scores
-        pScoreSurf = self.font.render(str(self.playerscore), True, WHITE)
-        aScoreSurf = self.font.render(str(self.AIscore), True, WHITE)
-
-        # Draw dashed lines
+        # The dashed line never changes, so it is drawn once onto a black surface
+        self.surf = pygame.Surface(SCREEN_SIZE)
+        self.surf.fill(BLACK)
         for rectangle in self.rectangles:
-            pygame.draw.rect(board, WHITE, rectangle)
+            pygame.draw.rect(self.surf, WHITE, rectangle)
 
+    def draw(self, board):
+        # Clear the board to the background
+        board.blit(self.surf, (0, 0))
+        Stats.count(Stats.BLIT)
+
+    def update(self, board):
         # Draw updated scores
         xpos = (SCREEN_SIZE[0] // 2) - (SCREEN_SIZE[0] // 4)
-        board.blit(aScoreSurf, (xpos, 50))
+        drawNumber(board, self.font, self.AIscore, WHITE, True, topleft=(xpos, 50))
         xpos = (SCREEN_SIZE[0] // 2) + (SCREEN_SIZE[0] // 4)
-        board.blit(pScoreSurf, (xpos, 50))
+        drawNumber(board, self.font, self.playerscore, WHITE, True, topleft=(xpos, 50))
 
 def lerp(a, b, f):
     return (1-f)*a + f*(b)
@@ -229,6 +184,7 @@ def collide(ball, player, AI):
     if (ball.position.x < AI.rect.left): # Player scored a point
         pygame.event.post(pygame.event.Event(PLAYERSCORE))
         return
+    Stats.count(Stats.COLLIDE)
     if (ball.rect.right >= player.rect.left):
         if ((ball.rect.top >= player.rect.top) and (ball.rect.bottom <= player.rect.bottom)):
             ball.rect.right = player.rect.left - 1
@@ -241,8 +197,9 @@ def collide(ball, player, AI):
             paddle2ball = ball.position - playerpos
 
             paddle2ball.normalize()
+            paddle2ball *= ball.speed
 
-            ball.velocity.set(paddle2ball * ball.speed)
+            ball.velocity.set(paddle2ball)
             return
     elif (ball.rect.left <= AI.rect.right):
         if ((ball.rect.top >= AI.rect.top) and (ball.rect.bottom <= AI.rect.bottom)): 
@@ -252,10 +209,22 @@ def collide(ball, player, AI):
             paddle2ball = ball.position - AIpos
 
             paddle2ball.normalize()
+            paddle2ball *= ball.speed
 
-            ball.velocity.set(paddle2ball * ball.speed)
+            ball.velocity.set(paddle2ball)
 
 def main():
+    parser = argparse.ArgumentParser(description="Pong")
+    parser.add_argument("--stats", action="store_true",
+                        help="count expensive operations (blits, collision tests, Rects, ...) and print them per point at exit")
+    Sampler.addArguments(parser)
+    args = parser.parse_args()
+    if (args.stats):
+        Stats.enable()
+        atexit.register(lambda: print(Stats.stats.report()))
+    Sampler.startFromOptions(args.profile, args.profileRange)
+    Sampler.sampler.setWave(1)
+
     screen = pygame.display.set_mode(SCREEN_SIZE)
     circle = ball()
     player_paddle = player()
@@ -269,13 +238,14 @@ def main():
     
     while True: # Game Loop
         # Refresh screen
-        screen.fill(BLACK)
+        bg.draw(screen)
 
         # Check for collisions between ball, player paddle, and AI paddle
         collide(circle, player_paddle, AI_paddle)
         
         for ob in all_objects: # Draw objects to the screen
             screen.blit(ob.surf, ob.rect)
+        Stats.count(Stats.BLIT, len(all_objects))
 
         for ev in pygame.event.get():
             if ev.type == UPDATESPEED: # Update ball speed event
@@ -284,13 +254,17 @@ def main():
                     AI_paddle.speed += 0.75
 
             elif ev.type == PLAYERSCORE: # Player score event
+                Stats.stats.endWave(f"point {bg.playerscore + bg.AIscore + 1}")
                 bg.playerscore += 1
+                Sampler.sampler.setWave(bg.playerscore + bg.AIscore + 1)
                 circle.rect.centerx = (SCREEN_SIZE[0] // 2)
                 circle.speed = 5
                 AI_paddle.speed = 3.5
 
             elif ev.type == AISCORE: # AI score event
+                Stats.stats.endWave(f"point {bg.playerscore + bg.AIscore + 1}")
                 bg.AIscore += 1
+                Sampler.sampler.setWave(bg.playerscore + bg.AIscore + 1)
                 circle.rect.centerx = (SCREEN_SIZE[0] // 2)
                 circle.speed = 5
                 AI_paddle.speed = 3.5
@@ -312,6 +286,9 @@ def main():
     
         pygame.display.update()
         clock.tick(FPS)
+        Stats.stats.endFrame()
+        Sampler.sampler.nextFrame()
     return None
 
-main()
+if __name__ == "__main__":
+    main()
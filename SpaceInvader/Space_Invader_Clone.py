@@ -1,11 +1,28 @@
 """ Space invader clone
 
+    Run with --timings to time each part of every frame and log slow frames, or
+    --overlay to also draw the timings on screen. --stats counts expensive operations
+    (image loads, blits, collision tests, ...) and --profile FILE samples the game for
+    a flamegraph (see Common/Sampler.py). Use --help to see all of the options.
 """
 
+import argparse
+import atexit
+import bisect
+import os
 import pygame
 import sys
 import random
 
+import numpy as np
+
+# Run as a script from SpaceInvader/, so add the repository root for Common/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from Common import Atlas, Sampler, Stats
+from Common.Text import getFont, renderText, drawNumber
+from Common.FrameTimer import FrameTimer
+
 from pygame.locals import (
     RLEACCEL, 
     K_UP,
@@ -36,152 +53,276 @@ PLAYER = "Art/Tank.png"
 E1 = "Art/Ghost.png"
 E2 = "Art/enemy2.png"
 E3 = "Art/enemy3.png"
+ENEMY_DEATH = "Art/enemy_death.png"
+
+BARRIER = "Art/Barrier.png"
+
+MISSILE = "Art/Missile.png"
+PLAYER_PROJECTILE = "Art/Player_Projectile.png"
+
+PLAYER_DEATH = ["Art/Player_death1.png", "Art/Player_death2.png", "Art/Player_death3.png"]
+
+# Colorkey used by each image (None = no colorkey)
+ASSET_COLORKEYS = {
+    PLAYER: WHITE,
+    E1: BLACK,
+    E2: BLACK,
+    E3: BLACK,
+    ENEMY_DEATH: None,
+    BARRIER: WHITE,
+    MISSILE: WHITE,
+    PLAYER_PROJECTILE: WHITE,
+    PLAYER_DEATH[0]: WHITE,
+    PLAYER_DEATH[1]: WHITE,
+    PLAYER_DEATH[2]: WHITE,
+}
+
+# Converted images shared by every sprite. Filled by load_assets()
+assets = {}
+
+# Times each part of a frame in level_1 (see Common/FrameTimer.py). Enabled from the command line
+FRAME_PHASES = ["wave", "input", "update", "render", "collision", "pause", "present", "wait"]
+IDLE_PHASES = ["pause", "wait"] # Hit animations and waiting for the frame rate cap
+frame_timer = FrameTimer(FRAME_PHASES, IDLE_PHASES, 1 / FPS)
+
+""" ================================================================ Assets ============================================= """
+def load_assets():
+    # Load and convert every image once. Must be called after pygame.display.set_mode()
+    # Images are cut from the packed atlas when one has been built (see Common/Atlas.py)
+    atlas = Atlas.load(ASSET_COLORKEYS, "Art")
+    for image, colorkey in ASSET_COLORKEYS.items():
+        if (atlas is not None and image in atlas):
+            assets[image] = atlas[image]
+            continue
+        surf = pygame.image.load(image).convert()
+        if (colorkey is not None):
+            surf.set_colorkey(colorkey, RLEACCEL)
+        assets[image] = surf
+
+def get_asset(image):
+    # Return the shared surface for an image. Shared surfaces must never be drawn on
+    if (image not in assets):
+        load_assets()
+    return assets[image]
 
 """ ================================================================ Enemy Class ======================================== """
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, image, position, projectiles, canshoot, score):
+    def __init__(self, image, grid, cell, projectiles, canshoot, score):
         super(Enemy, self).__init__()
-        self.surf = pygame.image.load(image).convert()
-        self.surf.set_colorkey(BLACK, RLEACCEL) # Enemy sprites have black background
-        self.rect = self.surf.get_rect(center=(position))
-        self.shootchance = 12
-        self.timer = random.randint(0, FPS)
+        self.surf = get_asset(image) # Enemy sprites have black background
+        self.grid = grid
+        self.cell = cell # Index of the enemy in the grid
+        self.shootchance = 12 # Chance (out of 101) of firing once a second, when the enemy can shoot
+        self.timer = random.randint(0, FPS) # When in each second the enemy may fire (see enemyGrid.fire())
         self.projectiles = projectiles
         self.canshoot = canshoot
         self.dead = False
         self.score = score
 
+    @property
+    def rect(self):
+        # Enemies never move on their own, so their rect comes from the grid layout
+        return self.grid.rect(self.cell)
+
     def death(self):
         # Change sprite to enemy death sprite
-        self.surf = pygame.image.load("Art/enemy_death.png").convert()
+        self.surf = get_asset(ENEMY_DEATH)
 
     def shoot(self):
         # Shoots a missile at the player if the enemy is able to shoot
         if (self.canshoot):
-            bullet = Projectile("Art/Missile.png", (self.rect.centerx, self.rect.centery), 7, 1)
-            self.projectiles.add(bullet)
-
-    def update(self):
-        # randomly fire
-        # Every 1 second, the enemy will have a 12% chance to shoot
-        if (self.timer == 0):
-            rng = random.randint(0, 100)
-            if (rng <= self.shootchance):
-                self.shoot()
-        self.timer = (self.timer + 1) % FPS
+            self.projectiles.add(ENEMY_SHOT, self.rect.center, 7)
 
 """ ============================================================ Barrier Class ================================================ """
+# Columns on each side of a projectile that are also destroyed when it hits a barrier
+BARRIER_BLAST = 2
+
+# Fully set masks, by size. Used to test and erase rectangular areas of the barrier masks
+filled_masks = {}
+
+def get_filled_mask(size):
+    if (size not in filled_masks):
+        filled_masks[size] = pygame.mask.Mask(size, fill=True)
+    return filled_masks[size]
+
 class Barrier(pygame.sprite.Sprite):
     def __init__(self, position):
         super(Barrier, self).__init__()
-        self.surf = pygame.image.load("Art/Barrier.png").convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
+        # Each barrier is drawn on as it is destroyed, so it needs its own copy of the image
+        self.surf = get_asset(BARRIER).copy()
         self.rect = self.surf.get_rect(center=(position))
 
-        self.leftcollider = pygame.Rect(0, 6, 12, 56)
-
-        self.midleftcollider = pygame.Rect(12, 2, 10, 58)
-
-        self.midcollider = pygame.Rect(22, 2, 20, 48)
-
-        self.midrightcollider = pygame.Rect(42, 2, 10, 58)
-
-        self.rightcollider = pygame.Rect(52, 6, 12, 56)
-
-        x = self.leftcollider.left
-        y = self.leftcollider.top
-
-        colors = [(255, 180, 180), (0, 0, 255), (255, 150, 10), (0, 255, 255), (255, 0, 255)]
-
-        i = 0
-
-        self.allcolliders = []
-
-        # Split the rect regions
-        cells = [self.leftcollider, self.midleftcollider, self.midcollider, self.midrightcollider, self.rightcollider]
-
-        # Split regions into cells. Create rects to represent breakable pieces of the barrier
-        j = 0
-        for c in cells:
-            x = c.left
-            y = c.top
-            while y <= c.bottom:
-                if (not((y +4) > c.bottom)):
-                    while x < c.right:
-                        tempRect = pygame.Rect(x, y, 4, 4)
-                        self.allcolliders.append(tempRect)
-                        i = (i + 1) % 5
-                        x += 4
-                y += 4
-                x= c.left
-            j += 1
-
-    def collision(self, proj):
-        # Get position of projectile relative to barrier
-        relativeleft = proj.rect.left - self.rect.left - 2
-        
-        # Create a rect encapsulating all possible cells to be hit
-        if (proj.y_velocity < 0):
-            r_coords = pygame.Rect(relativeleft - 2, 0, proj.rect.width + 4, self.rect.height)
+        # Pixels of the barrier that are still standing: everything that isn't transparent or
+        # part of the black outline. Erosion clears bits here and paints the same area black
+        self.mask = pygame.mask.from_surface(self.surf)
+        self.mask.erase(pygame.mask.from_threshold(self.surf, BLACK, (1, 1, 1, 255)), (0, 0))
+
+    def collision(self, rect, y_velocity):
+        """ Erode the barrier where a projectile (at 'rect', moving y_velocity pixels a frame)
+            hits it. The projectile's columns (plus BARRIER_BLAST on each side) are checked for
+            standing pixels: the whole height of the barrier for projectiles going up, and down
+            to one projectile length past the projectile for projectiles going down. The first
+            standing pixels the projectile reaches are destroyed to the depth of the projectile.
+            Returns the number of standing pixels that were in the way (0 if it missed)
+        """
+        left = rect.left - self.rect.left - BARRIER_BLAST
+        width = rect.width + 2 * BARRIER_BLAST
+        if (y_velocity < 0):
+            height = self.rect.height
         else:
-            r_coords = pygame.Rect(relativeleft - 2, 0, proj.rect.width + 4, proj.rect.bottom - self.rect.top + proj.rect.height)
-
-        # List of cells hit
-        hitlist = []
-
-
-        # Determine the top most/bottom most cells that can be hit by the projectile
-        minmax = [SCREEN_SIZE[1], 0]
-
-        for cell in self.allcolliders:
-            if (cell.colliderect(r_coords)):
-                hitlist.append(cell)
-                minmax[0] = min(minmax[0], cell.top)
-                minmax[1] = max(minmax[1], cell.bottom)
-
-        minmax[0] = minmax[0] + proj.rect.height
-        minmax[1] = minmax[1] - proj.rect.height
-
-        if (proj.y_velocity > 0):
+            height = min(rect.bottom - self.rect.top + rect.height, self.rect.height)
+        if (height <= 0):
+            return 0
+
+        Stats.count(Stats.COLLIDE)
+        path = get_filled_mask((width, height))
+        standing = self.mask.overlap_area(path, (left, 0))
+        if (standing == 0):
+            return 0
+
+        depth = rect.height
+        if (y_velocity > 0):
             # bullet traveling down, break top of barrier
-            index = 0
-            compareFN = lambda a, b: a <= b
-            pass
+            top = self.first_row(left, width, height, True)
         else:
             # bullet traveling up, break bottom of barrier
-            index = 1
-            compareFN = lambda a, b: a >= b
-            pass
-
-        # Destroy the affected cells
-        for c in hitlist:
-            if compareFN(c.bottom, minmax[index]):
-                # Remove cell from colliders
-                self.allcolliders.remove(c)
-                # Draw a black rectangle where the cell used to be
-                pygame.draw.rect(self.surf, BLACK, c)
-        
-        return len(hitlist)
-""" ====================================================== Projectile Class ==================================================== """
-class Projectile(pygame.sprite.Sprite):
-    def __init__(self, image_file, position, y_velocity, projectile_type):
-        super(Projectile, self).__init__()
-        self.surf = pygame.image.load(image_file).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
-        self.rect = self.surf.get_rect(center=(position[0], position[1]))
-        self.y_velocity = y_velocity
-        self.type = projectile_type
+            top = self.first_row(left, width, height, False) + 1 - depth
+
+        # Destroy the affected area in the mask and on the image at once
+        self.mask.erase(get_filled_mask((width, depth)), (left, top))
+        self.surf.fill(BLACK, (left, top, width, depth))
+        return standing
+
+    def first_row(self, left, width, height, from_top):
+        # Binary search for the topmost (or bottommost) row in columns left:left+width, above 'height', with a standing pixel
+        low = 0
+        high = height - 1
+        while (low < high):
+            if (from_top):
+                middle = (low + high) // 2
+                # Anything standing in rows 0 - middle?
+                if (self.mask.overlap_area(get_filled_mask((width, middle + 1)), (left, 0)) > 0):
+                    high = middle
+                else:
+                    low = middle + 1
+            else:
+                middle = (low + high + 1) // 2
+                # Anything standing in rows middle - height?
+                if (self.mask.overlap_area(get_filled_mask((width, height - middle)), (left, middle)) > 0):
+                    low = middle
+                else:
+                    high = middle - 1
+        return low
+""" ====================================================== Projectile Pool ===================================================== """
+# Types of projectiles, and the image for each
+PLAYER_SHOT = 0
+ENEMY_SHOT = 1
+PROJECTILE_IMAGES = [PLAYER_PROJECTILE, MISSILE]
+
+# Number of projectiles the pool has room for before it has to grow
+PROJECTILE_CAPACITY = 256
+
+# With at least this many projectiles on screen, the arrays are used to find the ones touching
+# the barriers and the player. With fewer, testing them one at a time is faster
+ARRAY_COLLISIONS = 64
+
+class ProjectilePool():
+    """ Every projectile on screen, stored in NumPy arrays instead of one sprite each, so they
+        can all be moved, culled, and tested against a rect at once. A projectile is an index
+        into the arrays. Indices of removed projectiles go on a free list and are reused
+    """
+    def __init__(self, capacity=PROJECTILE_CAPACITY):
+        self.sizes = [get_asset(image).get_size() for image in PROJECTILE_IMAGES]
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # (Re)create empty arrays
+        self.x = np.zeros(capacity, np.int32) # Top left corner
+        self.y = np.zeros(capacity, np.int32)
+        self.previous_y = np.zeros(capacity, np.int32) # Where the projectile was before its last move
+        self.width = np.zeros(capacity, np.int32)
+        self.height = np.zeros(capacity, np.int32)
+        self.y_velocity = np.zeros(capacity, np.int32)
+        self.type = np.zeros(capacity, np.int8)
+        self.alive = np.zeros(capacity, np.bool_)
+        self.free = list(range(capacity - 1, -1, -1)) # Unused indices. The lowest is used first
+        self.count = 0
+
+    def grow(self):
+        # Double the capacity, keeping every projectile where it is
+        capacity = len(self.alive)
+        for name in ["x", "y", "previous_y", "width", "height", "y_velocity", "type", "alive"]:
+            old = getattr(self, name)
+            new = np.zeros(capacity * 2, old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        self.free = list(range(capacity * 2 - 1, capacity - 1, -1)) + self.free
+
+    def __len__(self):
+        return self.count
+
+    def add(self, kind, center, y_velocity):
+        # Add a projectile of type 'kind' centered on 'center'. Returns its index
+        if (len(self.free) == 0):
+            self.grow()
+        i = self.free.pop()
+        width, height = self.sizes[kind]
+        self.x[i] = center[0] - width // 2
+        self.y[i] = center[1] - height // 2
+        self.previous_y[i] = self.y[i]
+        self.width[i] = width
+        self.height[i] = height
+        self.y_velocity[i] = y_velocity
+        self.type[i] = kind
+        self.alive[i] = True
+        self.count += 1
+        return i
+
+    def remove(self, i):
+        if (self.alive[i]):
+            self.alive[i] = False
+            self.free.append(i)
+            self.count -= 1
+
+    def clear(self):
+        self.allocate(len(self.alive))
+
+    def indices(self, kind=None):
+        # Indices of the projectiles on screen (of type 'kind', if given)
+        if (kind is None):
+            return np.flatnonzero(self.alive)
+        return np.flatnonzero(self.alive & (self.type == kind))
+
+    def rect(self, i):
+        return pygame.Rect(int(self.x[i]), int(self.y[i]), int(self.width[i]), int(self.height[i]))
+
+    def overlapping(self, rect):
+        # Indices of the projectiles whose path in their last move overlaps 'rect'
+        hits = (self.alive & (self.x < rect.right) & (self.x + self.width > rect.left)
+                & (np.minimum(self.y, self.previous_y) < rect.bottom)
+                & (np.maximum(self.y, self.previous_y) + self.height > rect.top))
+        return np.flatnonzero(hits)
 
     def update(self):
-        # Move the projectile up/down
-        self.rect.move_ip(0, self.y_velocity)
+        # Move every projectile and remove the ones that left the playing area
+        self.previous_y[:] = self.y
+        self.y += self.y_velocity
+        bottom = self.y + self.height
+        gone = self.alive & ((bottom <= 0) | (bottom >= SCREEN_SIZE[1] - 50))
+        for i in np.flatnonzero(gone):
+            self.remove(i)
+
+    def draw(self, screen):
+        live = self.indices()
+        surfs = [get_asset(image) for image in PROJECTILE_IMAGES]
+        screen.blits([(surfs[kind], (x, y)) for kind, x, y in
+                      zip(self.type[live].tolist(), self.x[live].tolist(), self.y[live].tolist())], False)
 
 """ ============================================================= Player Class ============================================= """
 class Player(pygame.sprite.Sprite):
     def __init__(self):
         super(Player, self).__init__()
-        self.surf = pygame.image.load(PLAYER).convert()
-        self.surf.set_colorkey(WHITE, RLEACCEL)
+        self.surf = get_asset(PLAYER)
         self.rect = self.surf.get_rect(center=(SCREEN_SIZE[0] //2, SCREEN_SIZE[1] - 80))
 
         self.save = self.surf
@@ -193,8 +334,7 @@ class Player(pygame.sprite.Sprite):
 
         self.anim_timer = 0
 
-        self.death_anim = ["Art/Player_death1.png", "Art/Player_death2.png",
-                           "Art/Player_death3.png"]
+        self.death_anim = PLAYER_DEATH
 
     def reset(self):
         # Reset player surface to default tank picture
@@ -203,8 +343,7 @@ class Player(pygame.sprite.Sprite):
     def death(self, screen, index):
         # draw player death animation onto the screen
         if (self.anim_timer == 0):
-            self.surf = pygame.image.load(self.death_anim[index])
-            self.surf.set_colorkey(WHITE, RLEACCEL)
+            self.surf = get_asset(self.death_anim[index])
             screen.blit(self.surf, self.rect)
             index = (index + 1) % len(self.death_anim)
         self.anim_timer = (self.anim_timer + 1) % (FPS // 8)
@@ -230,45 +369,75 @@ class Player(pygame.sprite.Sprite):
     def fire(self, proj_group):
         # Fire a projectile if allowed
         if (self.shot_timer >= (FPS // 2)):
-            bullet = Projectile("Art/Player_Projectile.png", (self.rect.centerx, self.rect.centery), -22, 0)
-            proj_group.add(bullet)
+            proj_group.add(PLAYER_SHOT, (self.rect.centerx, self.rect.centery), -22)
             self.shot_timer = 0
 
 """ ====================================================== Enemy Grid Class =================================================== """
 # Maintains the grid of enemies that move simultaneously
 class enemyGrid():
-    def __init__(self, proj_group):
+    def __init__(self, proj_group, cols=11):
         self.enemies = []
         self.proj_group = proj_group
         
         xpos = 66
         ypos = 60
+        self.spacing = 45 # Distance between the centers of neighbouring enemies
 
         types = [E1, E2, E2, E3, E3] # Types of enemies in each row
         scores = [30, 20, 20, 10, 10] # Points awarded for killing types of enemies
 
         self.rows = len(types)
-        self.cols = 11
+        self.cols = cols
+
+        # Where the enemies are: rows move right/left one at a time and the whole grid moves down,
+        # so the center of enemy (row, col) is (row_x[row] + col * spacing, origin_y + row * spacing)
+        self.row_x = [xpos] * self.rows
+        self.origin_y = ypos
+        self.sizes = [get_asset(image).get_size() for image in types] # Size of the enemies in each row
+        # Half the size of the largest enemy, so a lookup never misses an enemy that overlaps a rect
+        self.reach = max(max(size) for size in self.sizes) // 2 + 1
 
         # Populate the grid with enemies
         enemycanshoot = False
         for i in range(len(types)):
             if (i == 4):
                 enemycanshoot = True
-            for j in range(11):
-                tempEnemy = Enemy(types[i], (xpos, ypos), self.proj_group, enemycanshoot, scores[i])
+            for j in range(self.cols):
+                tempEnemy = Enemy(types[i], self, len(self.enemies), self.proj_group, enemycanshoot, scores[i])
                 self.enemies.append(tempEnemy)
-                xpos += 45
-            ypos += 45
-            xpos = 66
+
+        # Each row is drawn as a single surface holding all of its living enemies. A row's
+        # surface is only redrawn after one of its enemies dies (see draw()). The surfaces are
+        # in the display's format, and not RLE encoded since they keep being redrawn
+        self.row_surfs = []
+        for width, height in self.sizes:
+            surf = pygame.Surface(((self.cols - 1) * self.spacing + width, height)).convert()
+            surf.set_colorkey(BLACK)
+            self.row_surfs.append(surf)
+        self.dirty_rows = set(range(self.rows))
+
+        self.alive = (1 << len(self.enemies)) - 1 # Bit (row * cols + col) is set while that enemy is alive
+
+        # Kept up to date by kill(), so nothing has to be recounted or searched on every frame
+        self.column_counts = [self.rows] * self.cols # Enemies alive in each column
+        self.shooters = [(self.rows - 1) * self.cols + col for col in range(self.cols)] # Bottom enemy of each column
+        self.min_col = 0 # Leftmost column with an enemy that is still alive
+        self.max_col = self.cols - 1 # Rightmost column with an enemy that is still alive
+
+        # Only the shooters can fire, each on its own frame of every second. fire_frames[frame]
+        # holds the cells of the shooters that may fire on that frame
+        self.fire_frames = [[] for i in range(FPS)]
+        self.fire_frame = 0
+        for cell in self.shooters:
+            self.schedule(cell)
 
         self.timer = 1
         self.updatetime = (FPS // 6) # update every 1/6 of a second
         self.x_velocity = 5
         self.hasMovedDown = False
 
-        self.right_edge = self.enemies[-1].rect.right # Right most edge of grid
-        self.left_edge = self.enemies[0].rect.left # Left most edge of grid
+        self.right_edge = self.rect(len(self.enemies) - 1).right # Right most edge of grid
+        self.left_edge = self.rect(0).left # Left most edge of grid
 
         self.index = self.rows - 1
 
@@ -277,59 +446,111 @@ class enemyGrid():
 
     def move_down(self):
         # Move all enemies down
-        for e in self.enemies:
-            e.rect.move_ip(0, 16)
+        self.origin_y += 16
 
     def move(self, index):
         # Move enemies in specified row (index) right/left
-        offset = index * self.cols
-        for i in range(self.cols):
-            self.enemies[offset + i].rect.move_ip(self.x_velocity, 0)
+        self.row_x[index] += self.x_velocity
+
+    def rect(self, cell):
+        # Rect of the enemy in 'cell', worked out from the layout
+        row, col = divmod(cell, self.cols)
+        width, height = self.sizes[row]
+        return pygame.Rect(self.row_x[row] + col * self.spacing - width // 2,
+                           self.origin_y + row * self.spacing - height // 2, width, height)
+
+    def kill(self, enemy):
+        # Mark an enemy as dead. Dead enemies stay in the grid so the layout never changes
+        enemy.dead = True
+        self.alive &= ~(1 << enemy.cell)
+        row, col = divmod(enemy.cell, self.cols)
+        self.dirty_rows.add(row)
+        self.count -= 1
+        self.column_counts[col] -= 1
+
+        # The lowest enemy left in the column takes over shooting
+        if (self.shooters[col] == enemy.cell):
+            self.fire_frames[self.fire_time(enemy)].remove(enemy.cell)
+            self.shooters[col] = None
+            for cell in range(enemy.cell - self.cols, -1, -self.cols):
+                if (not self.enemies[cell].dead):
+                    self.enemies[cell].canshoot = True
+                    self.shooters[col] = cell
+                    self.schedule(cell)
+                    break
+
+        # Move the edges in past any columns that are now empty
+        if (self.column_counts[col] == 0 and self.count > 0):
+            while (self.column_counts[self.min_col] == 0):
+                self.min_col += 1
+            while (self.column_counts[self.max_col] == 0):
+                self.max_col -= 1
+
+    def fire_time(self, enemy):
+        # Frame of every second on which an enemy may fire
+        return -enemy.timer % FPS
+
+    def schedule(self, cell):
+        self.fire_frames[self.fire_time(self.enemies[cell])].append(cell)
+
+    def fire(self):
+        # Every shooter whose turn it is has a chance to fire. Replaces a timer and a roll on every enemy
+        for cell in self.fire_frames[self.fire_frame]:
+            e = self.enemies[cell]
+            if (random.randint(0, 100) <= e.shootchance):
+                e.shoot()
+        self.fire_frame = (self.fire_frame + 1) % FPS
+
+    def draw(self, screen):
+        # Draw every row that has enemies left, redrawing the surfaces of the rows that lost one
+        row_mask = (1 << self.cols) - 1
+        for row in self.dirty_rows:
+            surf = self.row_surfs[row]
+            surf.fill(BLACK)
+            for col in range(self.cols):
+                e = self.enemies[row * self.cols + col]
+                if (not e.dead):
+                    surf.blit(e.surf, (col * self.spacing, 0))
+            Stats.count(Stats.BLIT, self.cols)
+        self.dirty_rows.clear()
+
+        for row in range(self.rows):
+            if ((self.alive >> (row * self.cols)) & row_mask):
+                width, height = self.sizes[row]
+                screen.blit(self.row_surfs[row],
+                            (self.row_x[row] - width // 2, self.origin_y + row * self.spacing - height // 2))
+                Stats.count(Stats.BLIT)
+
+    def hits(self, rect):
+        """ Alive enemies that overlap 'rect', in grid order. The rows and columns that can
+            overlap it are worked out from the grid layout, so only those enemies are tested.
+            Returns the enemies and the number of rect tests
+        """
+        found = []
+        tests = 0
+        spacing = self.spacing
+        first_row = max((rect.top - self.reach - self.origin_y) // spacing, 0)
+        last_row = min((rect.bottom + self.reach - self.origin_y) // spacing, self.rows - 1)
+        for row in range(first_row, last_row + 1):
+            first_col = max((rect.left - self.reach - self.row_x[row]) // spacing, 0)
+            last_col = min((rect.right + self.reach - self.row_x[row]) // spacing, self.cols - 1)
+            for col in range(first_col, last_col + 1):
+                cell = row * self.cols + col
+                if (self.alive >> cell) & 1:
+                    tests += 1
+                    if (self.enemies[cell].rect.colliderect(rect)):
+                        found.append(self.enemies[cell])
+        return found, tests
 
     def updateEdges(self):
-        mincol = self.cols # leftmost column with an enemy that is still alive
-        maxcol = 0 # Rightmost column with an enemy that is still alive
-
-        # Iterate through each column in the grid
-        for i in range(self.cols):
-            for j in range(self.rows): # Iterate through each row in the current column
-                if (self.enemies[i + (j*self.cols)].dead == False): # If current enemy is alive
-                    if (i < mincol): # Update mincol as necessary
-                        mincol = i
-                    elif (i > maxcol): # Update maxol as necessary
-                        maxcol = i
-                    break
-        # Error cases
-        if (maxcol < mincol):
-            maxcol = mincol
-        elif (mincol > maxcol):
-            mincol = maxcol
-        # Update the right and left coordinates of the edge of the grid
-        self.right_edge = self.enemies[maxcol].rect.right
-        self.left_edge = self.enemies[mincol].rect.left
-        return (maxcol, mincol)
+        # Update the right and left coordinates of the edge of the grid, measured on the top row.
+        # kill() keeps track of the outermost columns with enemies left
+        width = self.sizes[0][0]
+        self.right_edge = self.row_x[0] + self.max_col * self.spacing - width // 2 + width
+        self.left_edge = self.row_x[0] + self.min_col * self.spacing - width // 2
+        return (self.max_col, self.min_col)
 
     def updateEnemies(self):
-        # Iterate through the rows bottom up to update which enemies can shoot. Only the bottom most
-        # enemy in each column should have the ability to shoot
-        offset = (self.rows - 1)
-        for i in range(self.cols):
-            if (self.enemies[offset * self.cols + i].dead == False):
-                self.enemies[offset * self.cols + i].canshoot = True
-                continue
-            else:
-                for j in range(offset, -1, -1):
-                    if (self.enemies[j*self.cols + i].dead == False):
-                        self.enemies[j*self.cols + i].canshoot = True
-                        break
-        # Count the number of enemies still alive
-        count = 0
-        for i in range(len(self.enemies)):
-            if (self.enemies[i].dead == False):
-                count += 1
-        if (count < self.count):
-            self.count = count
-
         # Update speed of grid movements based on number of enemies alive
         if (self.count <= self.kills_to_speedup):
             if (self.updatetime >= 5):
@@ -343,6 +564,9 @@ class enemyGrid():
                 self.x_velocity *= 3
 
     def update(self):
+        # Let the shooters whose turn it is fire
+        self.fire()
+
         # check timer if ready to move
         if (self.timer == 0):
             # Update the edges of the grid to find rightmost and leftmost enemies
@@ -368,65 +592,161 @@ class enemyGrid():
         self.timer = (self.timer + 1) % self.updatetime
 
 """ ========================================================= Check Collisions Function ========================================= """
-def check_collisions(proj_group, player, barriers, enemies, screen, clock):
+# Kinds of collision events, in the order they are resolved when they happen at the same time
+BARRIER_HIT = 0
+ENEMY_HIT = 1
+PROJECTILE_HIT = 2
+PLAYER_HIT = 3
+
+def entry_time(top, height, dy, target_top, target_height, target_dy=0):
+    """ Swept test along the y axis. A projectile with its top at 'top' before its last move
+        went 'dy' pixels, while the target went 'target_dy' from 'target_top'. Returns how far
+        through the move (0 to 1) the two started to overlap, or None if they never did
+    """
+    offset = top - target_top # Position relative to the target, which overlaps it while -height < offset < target_height
+    speed = dy - target_dy
+    if (speed == 0):
+        return 0.0 if (-height < offset < target_height) else None
+    if (speed > 0):
+        enter = (-height - offset) / speed
+        leave = (target_height - offset) / speed
+    else:
+        enter = (target_height - offset) / speed
+        leave = (-height - offset) / speed
+    if (enter >= 1 or leave <= 0):
+        return None
+    return max(enter, 0.0)
+
+def check_collisions(proj_group, player, barriers, enemies, grid, screen, clock):
+    """ Collisions between the projectiles and everything else. Each projectile is swept along
+        its last move rather than tested where it ended up, so a fast projectile can't skip
+        over anything, and every hit found is resolved in the order it happened during the
+        move. A projectile that is destroyed can't hit anything after that
+    """
     retval = 0
     enemies_hitlist = []
-    # Check collisions between projectiles and barriers
-    for b in barriers:
-        hit_list = pygame.sprite.spritecollide(b, proj_group, False)
-
-        for hit in hit_list:
-            if (b.collision(hit) > 0):
-                proj_group.remove(hit)
-
-    # Check collisions between projectiles and enemies
-    for e in enemies:
-        hit_list = pygame.sprite.spritecollide(e, proj_group, False)
-
-        for hit in hit_list:
-            if (hit.type == 0):
-                e.dead = True
-                enemies.remove(e)
-                proj_group.remove(hit)
+    # The tests below look at a few projectiles at a time, which is faster on plain lists
+    # than on the arrays. Removing a projectile only changes proj_group.alive
+    live = proj_group.indices().tolist()
+    used = live[-1] + 1 if len(live) > 0 else 0 # Everything past the last projectile is unused
+    xs, ys, previous_ys, widths, heights, velocities, types = (
+        a[:used].tolist() for a in (proj_group.x, proj_group.y, proj_group.previous_y, proj_group.width,
+                                    proj_group.height, proj_group.y_velocity, proj_group.type))
+    alive = proj_group.alive
+    shots = [i for i in live if types[i] == PLAYER_SHOT]
+    events = [] # (time, kind, projectile, what it hit)
+    player_was_hit = False
+
+    def path(i):
+        # Rect covering the projectile's last move
+        return pygame.Rect(xs[i], min(ys[i], previous_ys[i]), widths[i], heights[i] + abs(ys[i] - previous_ys[i]))
+
+    def hit_time(i, rect):
+        return entry_time(previous_ys[i], heights[i], ys[i] - previous_ys[i], rect.top, rect.height)
+
+    # Find the projectiles that passed through each barrier and the player
+    barrier_list = barriers.sprites()
+    if (len(live) >= ARRAY_COLLISIONS):
+        touching = [(i, b) for b in barrier_list for i in proj_group.overlapping(b.rect).tolist()]
+        near_player = proj_group.overlapping(player.rect).tolist()
+        Stats.count(Stats.COLLIDE, len(barrier_list) + 1) # One pass over the arrays per rect
+    else:
+        # The barriers and the player are at the bottom of the screen, so only the projectiles
+        # that reach below the highest of them are tested against them
+        barrier_rects = [b.rect for b in barrier_list]
+        top = min([rect.top for rect in barrier_rects] + [player.rect.top])
+        touching = []
+        near_player = []
+        for i in live:
+            if (max(ys[i], previous_ys[i]) + heights[i] > top):
+                rect = path(i)
+                Stats.count(Stats.COLLIDE, len(barrier_list) + 1)
+                index = rect.collidelist(barrier_rects) # The barriers don't overlap
+                if (index >= 0):
+                    touching.append((i, barrier_list[index]))
+                if (player.rect.colliderect(rect)):
+                    near_player.append(i)
+    for i, b in touching:
+        events.append((hit_time(i, b.rect), BARRIER_HIT, i, b))
+    for i in near_player:
+        if (types[i] == ENEMY_SHOT):
+            events.append((hit_time(i, player.rect), PLAYER_HIT, i, player))
+
+    # Player projectiles against enemies. Only the first enemy each projectile reaches can be
+    # hit, and the grid finds the enemies along the path instead of testing every enemy
+    for i in shots:
+        hit_list, tests = grid.hits(path(i))
+        Stats.count(Stats.COLLIDE, tests)
+        first = None
+        for e in hit_list:
+            time = hit_time(i, e.rect)
+            if (first is None or time < first[0]):
+                first = (time, ENEMY_HIT, i, e)
+        if (first is not None):
+            events.append(first)
+
+    # Player projectiles against other projectiles. The projectiles are sorted by their left
+    # edge, so each player projectile only looks at the ones within reach
+    if (len(shots) > 0):
+        order = sorted(live, key=xs.__getitem__)
+        lefts = [xs[j] for j in order]
+        reach = max(widths[j] for j in live)
+    for p in shots:
+        x = xs[p]
+        start = bisect.bisect_right(lefts, x - reach)
+        end = bisect.bisect_left(lefts, x + widths[p])
+        Stats.count(Stats.COLLIDE, end - start)
+        for j in order[start:end]:
+            if (j != p and xs[j] + widths[j] > x):
+                time = entry_time(previous_ys[p], heights[p], ys[p] - previous_ys[p],
+                                  previous_ys[j], heights[j], ys[j] - previous_ys[j])
+                if (time is not None):
+                    events.append((time, PROJECTILE_HIT, p, j))
+
+    # Resolve the hits in the order they happened
+    events.sort(key=lambda event: (event[0], event[1]))
+    for time, kind, i, other in events:
+        if (not alive[i]): # Already destroyed earlier in the move
+            continue
+        if (kind == BARRIER_HIT):
+            if (other.collision(pygame.Rect(xs[i], ys[i], widths[i], heights[i]), velocities[i]) > 0):
+                proj_group.remove(i)
+        elif (kind == ENEMY_HIT):
+            if (not other.dead):
+                grid.kill(other)
+                enemies.remove(other)
+                proj_group.remove(i)
                 retval = 2
-                enemies_hitlist.append(e)
-
-    # Check collisions between projectiles and other projectiles
-    for p in proj_group:
-        if (p.type == 0):
-            hit_list = pygame.sprite.spritecollide(p, proj_group, False)
-
-            for hit in hit_list:
-                if hit is not p:
-                    randint = random.randint(0, 100)
-                    if (randint > 40):
-                        proj_group.remove(hit)
-            if (len(hit_list)) > 1:
-                proj_group.remove(p)
-
-    # Check collisions between projectiles and player
-    hit_list = pygame.sprite.spritecollide(player, proj_group, False)
-    for hit in hit_list:
-        if (hit.type == 1):
+                enemies_hitlist.append(other)
+        elif (kind == PROJECTILE_HIT):
+            if (alive[other]):
+                randint = random.randint(0, 100)
+                if (randint > 40):
+                    proj_group.remove(other)
+                proj_group.remove(i)
+        elif (kind == PLAYER_HIT):
             print("player is hit")
             player.lives -= 1
-            proj_group.remove(hit)
-            retval = 1
+            proj_group.remove(i)
+            player_was_hit = True
+
+    if (player_was_hit):
+        retval = 1
     return retval, enemies_hitlist
 """ ========================================================= Game Over Function =============================================== """
 def game_over(screen, clock):
     # This function displays the game over screen
     
-    title_font = pygame.font.SysFont("Corbel", 48)
-    prompt_font = pygame.font.SysFont("Corbel", 32)
+    title_font = getFont("Corbel", 48)
+    prompt_font = getFont("Corbel", 32)
 
-    title_text = title_font.render("Game Over", False, RED)
+    title_text = renderText(title_font, "Game Over", RED)
     title_rect = title_text.get_rect(center=(SCREEN_SIZE[0] // 2, 25))
 
-    title_text1 = title_font.render("Game Over", False, WHITE)
+    title_text1 = renderText(title_font, "Game Over", WHITE)
     title_rect1 = title_text.get_rect(center=((SCREEN_SIZE[0] // 2) + 2, 25 + 2))
 
-    prompt_text = prompt_font.render("Hit enter to play", False, WHITE)
+    prompt_text = renderText(prompt_font, "Hit enter to play", WHITE)
     prompt_rect = prompt_text.get_rect(center=(SCREEN_SIZE[0] // 2, 250))
 
     while True:
@@ -501,18 +821,18 @@ def player_hit(screen, clock, player):
 def level_1(screen, clock):
     score = 0
 
-    # Pygame sprite group to store all projectiles
-    projectiles = pygame.sprite.Group()
+    # Every projectile on screen
+    projectiles = ProjectilePool()
 
     # Create player
     player = Player()
 
     # Variables used to display information on screen
-    lives_font = pygame.font.SysFont("Corbel", 30)
-    temp_surf = lives_font.render("3", False, GREEN)
+    lives_font = getFont("Corbel", 30)
+    temp_surf = renderText(lives_font, "3", GREEN)
     lives_rect = temp_surf.get_rect()
 
-    score_surf = lives_font.render("{:04}".format(score), False, GREEN)
+    score_label = renderText(lives_font, "Score: ", GREEN)
     score_rect = temp_surf.get_rect()
 
     # Initialize barriers
@@ -540,6 +860,9 @@ def level_1(screen, clock):
     # Currently unused
     difficulty = 1
 
+    frame_timer.reset() # Don't count the time spent in the menus
+    Sampler.sampler.setWave(difficulty)
+
     running = True
     while running:
         # Reset the screen to all black for next frame
@@ -547,6 +870,7 @@ def level_1(screen, clock):
 
         # Draw green line between playing area and display area at bottom of screen
         pygame.draw.line(screen, (0, 255, 0), (0, SCREEN_SIZE[1] - 50), (SCREEN_SIZE[0], SCREEN_SIZE[1] - 50), 3)
+        frame_timer.mark("render")
 
         # Event handling
         for ev in pygame.event.get():
@@ -559,6 +883,7 @@ def level_1(screen, clock):
             elif ev.type == QUIT:
                 pygame.quit()
                 sys.exit()
+        frame_timer.mark("input")
 
         # Player destroyed all enemies => start next wave
         if (e_grid.count <= 0):
@@ -581,37 +906,36 @@ def level_1(screen, clock):
                 e.shootchance += (difficulty * 8)
             e_grid.x_velocity += difficulty
             difficulty += 1
+            Stats.stats.endWave(f"wave {difficulty - 1}")
+            Sampler.sampler.setWave(difficulty)
+            frame_timer.mark("wave")
 
         # Get keyboard inputs
         pressed_keys = pygame.key.get_pressed()
+        frame_timer.mark("input")
 
         # Update player
         player.update(pressed_keys)
 
-        # Update projectiles
+        # Update projectiles. The ones that left the playing area are removed
         projectiles.update()
 
-        # Update enemies
-        enemies.update()
-
         # Update enemy grid
         e_grid.update()
+        frame_timer.mark("update")
 
         # Draw barriers to the screen
         for b in barriers:
             screen.blit(b.surf, b.rect)
+        Stats.count(Stats.BLIT, len(barriers) + len(projectiles))
 
         # Draw projectiles to the screen
-        for p in projectiles:
-            screen.blit(p.surf, p.rect)
-
-            if (p.rect.bottom <= 0):
-                projectiles.remove(p)
-            elif (p.rect.bottom >= (SCREEN_SIZE[1] - 50)):
-                projectiles.remove(p)
+        projectiles.draw(screen)
+        frame_timer.mark("render")
 
         # Collision check for all objects
-        sprite_was_hit, hit_enemies = check_collisions(projectiles, player, barriers, enemies, screen, clock)
+        sprite_was_hit, hit_enemies = check_collisions(projectiles, player, barriers, enemies, e_grid, screen, clock)
+        frame_timer.mark("collision")
 
         if (player.lives == 0): # Game over
             game_over(screen, clock)
@@ -627,46 +951,56 @@ def level_1(screen, clock):
             xpos += 35
 
         # Write number of player lives 
-        lives_text = lives_font.render(str(player.lives), False, GREEN)
-        screen.blit(lives_text, (lives_rect.width, SCREEN_SIZE[1] - (lives_rect.height) - 10))
+        drawNumber(screen, lives_font, player.lives, GREEN,
+                   topleft=(lives_rect.width, SCREEN_SIZE[1] - (lives_rect.height) - 10))
 
         # Write Score
-        score_text = lives_font.render("Score: {:04}".format(score), False, GREEN)
-        screen.blit(score_text, (400, SCREEN_SIZE[1] - (score_rect.height) - 10))
+        score_pos = (400, SCREEN_SIZE[1] - (score_rect.height) - 10)
+        screen.blit(score_label, score_pos)
+        drawNumber(screen, lives_font, score, GREEN, digits=4,
+                   topleft=(score_pos[0] + score_label.get_width(), score_pos[1]))
 
         # Draw player (tank) on the screen
         screen.blit(player.surf, player.rect)
 
         # Draw all enemies on the screen
-        for e in enemies:
-            screen.blit(e.surf, e.rect)
+        e_grid.draw(screen)
+        Stats.count(Stats.BLIT, max(player.lives - 1, 0) + 2)
+        frame_timer.mark("render")
 
         # Player was hit by a projectile
         if (sprite_was_hit == 1):
             player_hit(screen, clock, player)
-            for p in projectiles:
-                projectiles.remove(p)
+            projectiles.clear()
 
         # An enemy was hit by a projectile
         elif (sprite_was_hit == 2):
             for enemy in hit_enemies:
                 enemy_hit(screen, clock, enemy)
-            
+        frame_timer.mark("pause")
+
+        frame_timer.drawOverlay(screen)
         pygame.display.update()
+        frame_timer.mark("present")
         clock.tick(FPS)
+        frame_timer.mark("wait")
+        frame_timer.endFrame(lambda: {"enemies": len(enemies), "projectiles": len(projectiles),
+                                      "barriers": len(barriers)})
+        Stats.stats.endFrame()
+        Sampler.sampler.nextFrame()
     return
 
 """ ========================================================== Main Menu Function =============================================== """
 def main_menu(screen, clock):
     # This function displays the main menu
     screen.fill(BLACK)
-    title_font = pygame.font.SysFont("Corbel", 48)
-    prompt_font = pygame.font.SysFont("Corbel", 32)
+    title_font = getFont("Corbel", 48)
+    prompt_font = getFont("Corbel", 32)
 
-    title_text = title_font.render("Space Invader", False, WHITE)
+    title_text = renderText(title_font, "Space Invader", WHITE)
     title_rect = title_text.get_rect(center=(SCREEN_SIZE[0] // 2, 100))
 
-    prompt_text = prompt_font.render("Hit enter to play", False, WHITE)
+    prompt_text = renderText(prompt_font, "Hit enter to play", WHITE)
     prompt_rect = prompt_text.get_rect(center=(SCREEN_SIZE[0] // 2, 250))
 
     while True:
@@ -687,8 +1021,32 @@ def main_menu(screen, clock):
     return
 
 """ ================================================ Main ============================================== """
+def parse_args():
+    parser = argparse.ArgumentParser(description="Space Invader")
+    parser.add_argument("--timings", action="store_true",
+                        help="time each part of every frame, log slow frames to stderr, and print percentiles at exit")
+    parser.add_argument("--overlay", action="store_true", help="draw the frame timings on screen (implies --timings)")
+    parser.add_argument("--hitch", type=float, default=1000 / FPS, metavar="MS",
+                        help=f"log frames that spend more than MS milliseconds working (default: {1000 / FPS:.1f})")
+    parser.add_argument("--stats", action="store_true",
+                        help="count expensive operations (image loads, blits, collision tests, ...) and print them per wave at exit")
+    Sampler.addArguments(parser)
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    frame_timer.enabled = args.timings or args.overlay
+    frame_timer.overlay = args.overlay
+    frame_timer.budget = args.hitch / 1000
+    if (frame_timer.enabled):
+        atexit.register(lambda: print(frame_timer.summary()))
+    if (args.stats):
+        Stats.enable()
+        atexit.register(lambda: print(Stats.stats.report()))
+    Sampler.startFromOptions(args.profile, args.profileRange)
+
     screen = pygame.display.set_mode(SCREEN_SIZE)
+    load_assets()
     clock = pygame.time.Clock()
     
     main_menu(screen, clock)